@@ -1,10 +1,15 @@
 from flask import Flask
 from flask_cors import CORS
 from .routes.search import search_bp
+from .routes.imports import import_bp
+from .routes.metrics import metrics_bp
+from .services.db_service import get_db_service
+from .utils.logging_setup import setup_logging
+from hydro_find.instrumentation import tracing
 import logging
 import os
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -28,10 +33,18 @@ class App:
         self._initialize_middleware()
         self._register_blueprints()
         self._register_error_handlers()
+        tracing.configure("hydrofind-api")
+        self._warm_up()
 
         App._initialized = True
         logger.info("FlaskApp initialized")
 
+    def _warm_up(self):
+        """Фоновая загрузка индексов артикулов и подсказок (в тестах — по первому запросу)"""
+        if self.testing or os.getenv("INDEX_WARMUP", "true").lower() != "true":
+            return
+        get_db_service().warm_up()
+
     def _configure_app(self, config_class):
         from .config import Config, DevelopmentConfig, ProductionConfig
 
@@ -65,6 +78,9 @@ class App:
     def _register_blueprints(self):
         # Регистрация blueprint с префиксом /api — ТОЛЬКО ЗДЕСЬ!
         self.app.register_blueprint(search_bp, url_prefix='/api')
+        self.app.register_blueprint(import_bp, url_prefix='/api')
+        # /metrics — без префикса, по соглашению Prometheus
+        self.app.register_blueprint(metrics_bp)
 
     def _register_error_handlers(self):
         @self.app.errorhandler(404)
@@ -86,16 +102,16 @@ class App:
         if debug is None:
             debug = self.app.config.get('DEBUG', False)
 
-        logger.info(f"Starting HydroFind API on http://{host}:{port}")
-        logger.info(f"Environment: {self.app.config.get('ENV', 'production')}")
-        logger.info(f"Debug mode: {debug}")
+        logger.info("Starting HydroFind API on http://%s:%s", host, port)
+        logger.info("Environment: %s", self.app.config.get('ENV', 'production'))
+        logger.info("Debug mode: %s", debug)
 
         # === ОПЦИОНАЛЬНО: вывод всех маршрутов для диагностики ===
         with self.app.app_context():
             logger.info("=== Registered routes ===")
             for rule in self.app.url_map.iter_rules():
                 methods = ', '.join(sorted(rule.methods - {'HEAD', 'OPTIONS'}))
-                logger.info(f"{rule.endpoint:30} [{methods}] → {rule.rule}")
+                logger.info("%-30s [%s] → %s", rule.endpoint, methods, rule.rule)
             logger.info("=========================")
 
         self.app.run(
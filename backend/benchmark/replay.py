@@ -0,0 +1,283 @@
+# backend/benchmark/replay.py
+"""
+Воспроизведение журнала запросов (QUERY_LOG_PATH) через конвейер воркера.
+
+OpenRouter подменяется записанными ответами (с исходной или масштабированной
+задержкой), БД и Redis — те, что указаны в окружении/аргументах. Запросы
+подаются с заданной частотой (открытая модель нагрузки), по итогам выводятся
+пропускная способность и перцентили задержки по этапам.
+
+    python -m backend.benchmark.replay logs/queries.jsonl --qps 5 --concurrency 8
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from hydro_find.instrumentation import timing
+
+logger = logging.getLogger(__name__)
+
+_PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def load_log(path: str) -> List[Dict[str, Any]]:
+    """Записи журнала запросов (битые строки пропускаются)"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+    return records
+
+
+class RecordedResponses:
+    """Записанные ответы AI: (отпечаток системного промпта, сообщение пользователя) → ответы"""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self._responses: Dict[Tuple[str, str], List[Tuple[Optional[str], float]]] = defaultdict(list)
+        self._cursor: Counter = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        for record in records:
+            for call in record.get("llm_calls") or []:
+                key = (call.get("prompt"), call.get("input"))
+                self._responses[key].append((call.get("output"), float(call.get("ms") or 0)))
+
+    def __len__(self):
+        return len(self._responses)
+
+    def lookup(self, prompt: str, user_query: str) -> Tuple[Optional[str], float]:
+        """Ответ и его исходная задержка (мс); повторные запросы получают записи по кругу"""
+        key = (prompt, user_query)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.misses += 1
+                return None, 0.0
+            self.hits += 1
+            index = self._cursor[key] % len(responses)
+            self._cursor[key] += 1
+            return responses[index]
+
+
+class _StubStream:
+    """Поток ответа в формате chat.completions (stream=True)"""
+
+    def __init__(self, text: Optional[str]):
+        self._text = text or ""
+
+    def __iter__(self):
+        # Ответ отдаётся кусками — проверяется и ранняя остановка потока
+        for start in range(0, len(self._text), 8):
+            delta = SimpleNamespace(content=self._text[start:start + 8])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def close(self):
+        pass
+
+
+class StubOpenAI:
+    """Замена клиента OpenAI: ответы из журнала вместо запросов к OpenRouter"""
+
+    def __init__(self, responses: RecordedResponses, latency: str = "recorded", latency_scale: float = 1.0):
+        self.responses = responses
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _text(content) -> str:
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content or ""
+
+    def _create(self, **kwargs):
+        from hydro_find.ai.client import prompt_fingerprint
+
+        messages = kwargs.get("messages") or []
+        system_prompt = self._text(messages[0]["content"]) if messages else ""
+        user_query = self._text(messages[-1]["content"]) if messages else ""
+
+        text, recorded_ms = self.responses.lookup(prompt_fingerprint(system_prompt), user_query)
+        if self.latency == "recorded" and recorded_ms:
+            time.sleep(recorded_ms * self.latency_scale / 1000)
+
+        if kwargs.get("stream"):
+            return _StubStream(text)
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {
+        f"p{int(q * 100)}": round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+        for q in _PERCENTILES
+    }
+    summary["mean"] = round(sum(ordered) / len(ordered), 2)
+    summary["count"] = len(ordered)
+    return summary
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Перцентили общей задержки и задержки по этапам"""
+    stages = defaultdict(list)
+    for sample in samples:
+        for name, ms in (sample.get("stages_ms") or {}).items():
+            stages[name].append(ms)
+    return {
+        "total_ms": _percentiles([s["total_ms"] for s in samples if s.get("total_ms") is not None]),
+        "stages_ms": {name: _percentiles(values) for name, values in sorted(stages.items())},
+        "status": dict(Counter(s.get("status") for s in samples if s.get("status"))),
+    }
+
+
+class ReplayRunner:
+    """Подача записанных запросов в воркер с заданной частотой"""
+
+    def __init__(self, worker, records: List[Dict[str, Any]], qps: float, concurrency: int):
+        self.worker = worker
+        self.records = records
+        self.qps = qps
+        self.concurrency = concurrency
+        self._samples: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _message(self, record: Dict[str, Any], scheduled: float) -> Dict[str, Any]:
+        return {
+            "task_id": str(uuid.uuid4()),
+            "query": record["query"],
+            "priority": record.get("priority") or 5,
+            "metadata": record.get("metadata") or {},
+            # Время «отправки» — плановое: ожидание свободного исполнителя попадает в queue_wait
+            "timestamp": scheduled,
+        }
+
+    def _run_one(self, record: Dict[str, Any], scheduled: float):
+        message = self._message(record, scheduled)
+        with timing.collect() as timings:
+            result = self.worker.process_message(message)
+        sample = {
+            "status": result.get("status"),
+            "total_ms": (time.time() - scheduled) * 1000,
+            **timings.to_dict(),
+        }
+        with self._lock:
+            self._samples.append(sample)
+
+    def run(self) -> Dict[str, Any]:
+        interval = 1.0 / self.qps if self.qps > 0 else 0.0
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i, record in enumerate(self.records):
+                scheduled = start + i * interval
+                delay = scheduled - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._run_one, record, scheduled)
+
+        elapsed = time.time() - start
+        report = summarize(self._samples)
+        report.update({
+            "requests": len(self._samples),
+            "elapsed_s": round(elapsed, 2),
+            "target_qps": self.qps,
+            "throughput_qps": round(len(self._samples) / elapsed, 2) if elapsed else 0.0,
+            "concurrency": self.concurrency,
+        })
+        return report
+
+
+def build_worker(responses: RecordedResponses, latency: str, latency_scale: float,
+                 use_db: bool = True, use_cache: bool = True):
+    """Воркер с подменённым OpenRouter; БД и Redis — из окружения"""
+    # Ключ не используется, но нужен клиенту OpenAI; rate limiter не нужен без провайдера
+    os.environ.setdefault("API_OPEN_ROUTER", "replay")
+    os.environ.setdefault("AI_RATE_LIMITER", "off")
+    # Повторные прогоны не пишем в рабочий журнал
+    os.environ.pop("QUERY_LOG_PATH", None)
+
+    from backend.messaging.worker import RMQWorker
+    from backend.services.ai_service import AIService
+
+    ai_service = AIService()
+    ai_service._ai.client._client = StubOpenAI(responses, latency, latency_scale)
+
+    worker = RMQWorker(ai_service=ai_service, enable_cache=use_cache)
+    if not use_db:
+        worker._db_service = None
+    if not use_cache:
+        worker._cache_service = None
+    return worker
+
+
+def main():
+    """CLI воспроизведения журнала запросов"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Воспроизведение журнала запросов через воркер')
+    parser.add_argument('log', help='JSONL журнал запросов (QUERY_LOG_PATH)')
+    parser.add_argument('--qps', type=float, default=2.0, help='Целевая частота запросов')
+    parser.add_argument('--concurrency', type=int, default=4, help='Число параллельных обработчиков')
+    parser.add_argument('--limit', type=int, default=None, help='Ограничить число запросов')
+    parser.add_argument('--repeat', type=int, default=1, help='Повторить журнал N раз')
+    parser.add_argument('--latency', choices=['recorded', 'none'], default='recorded',
+                        help='Задержка ответов AI: как в журнале или без задержки')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='Множитель записанной задержки')
+    parser.add_argument('--database-url', default=None, help='БД для поиска (sqlite:///... или postgresql://...)')
+    parser.add_argument('--no-db', action='store_true', help='Без поиска в БД')
+    parser.add_argument('--no-cache', action='store_true', help='Без Redis')
+    parser.add_argument('--output', default=None, help='Сохранить отчёт в JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    records = load_log(args.log)
+    worker_records = [r for r in records if r.get("source") == "worker" and r.get("query")]
+    if not worker_records:
+        print("❌ В журнале нет записей воркера")
+        return
+
+    responses = RecordedResponses(worker_records)
+    replay = (worker_records * args.repeat)[:args.limit] if args.limit else worker_records * args.repeat
+    worker = build_worker(responses, args.latency, args.latency_scale,
+                          use_db=not args.no_db, use_cache=not args.no_cache)
+
+    report = ReplayRunner(worker, replay, args.qps, args.concurrency).run()
+    report["stub"] = {"recorded_prompts": len(responses), "hits": responses.hits, "misses": responses.misses}
+    report["recorded"] = {
+        "api": summarize([r for r in records if r.get("source") == "api"]),
+        "worker": summarize(worker_records),
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
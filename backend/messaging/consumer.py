@@ -6,7 +6,12 @@ import time
 import signal
 import sys
 from typing import Optional, Dict, Any, Callable
-from contextlib import contextmanager
+
+from backend.messaging.queues import declare_queue
+from backend.services.failed_queries import get_failed_query_sink
+from backend.utils.logging_setup import task_context
+from hydro_find.instrumentation import tracing
+from hydro_find.instrumentation.metrics import FAILURES, RETRIES
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +56,10 @@ class RMQConsumer:
         self.should_reconnect = True
         self.consumer_tag: Optional[str] = None
 
+        # Остановка во время обработки сообщения откладывается до её завершения
+        self._processing = False
+        self._stop_requested = False
+
         # Настройка обработчиков сигналов
         self._setup_signal_handlers()
 
@@ -64,30 +73,23 @@ class RMQConsumer:
 
     def _signal_handler(self, signum, frame):
         """Обработчик сигналов для graceful shutdown"""
-        logger.info(f"Получен сигнал {signum}, выполняется graceful shutdown...")
+        logger.info("Получен сигнал %s, выполняется graceful shutdown...", signum)
         self.should_reconnect = False
+        if self._processing:
+            # Дорабатываем текущее сообщение (ack/nack), затем останавливаемся
+            self._stop_requested = True
+            return
         self.stop()
 
-    @contextmanager
-    def _logging_context(self, task_id: str = "unknown"):
-        """
-        Контекстный менеджер для логирования с task_id.
-
-        Args:
-            task_id: Идентификатор задачи для логирования
-        """
-        old_factory = logging.getLogRecordFactory()
-
-        def record_factory(*args, **kwargs):
-            record = old_factory(*args, **kwargs)
-            record.task_id = task_id
-            return record
-
-        logging.setLogRecordFactory(record_factory)
-        try:
-            yield
-        finally:
-            logging.setLogRecordFactory(old_factory)
+    @staticmethod
+    def _sent_timestamp(properties) -> Optional[float]:
+        """Время постановки в очередь из заголовков (после повтора — время повторной отправки)"""
+        headers = properties.headers or {}
+        for header in ('x-retry-timestamp', 'x-sent-timestamp'):
+            value = headers.get(header)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+        return None
 
     def _connect(self):
         """Установка соединения с RabbitMQ"""
@@ -104,42 +106,14 @@ class RMQConsumer:
             )
             self.channel = self.connection.channel()
 
-            # Пробуем объявить очередь
-            try:
-                if self.recreate_queue:
-                    # Пытаемся удалить старую очередь
-                    try:
-                        self.channel.queue_delete(self.queue_name)
-                        logger.info(f"Очередь {self.queue_name} удалена для пересоздания")
-                    except:
-                        pass
-
-                # Объявляем очередь
-                self.channel.queue_declare(
-                    queue=self.queue_name,
-                    durable=True
-                )
-
-                logger.info(f"Подключено к RabbitMQ {self.host}:{self.port}")
-                return
-
-            except pika.exceptions.ChannelClosedByBroker as e:
-                if "PRECONDITION_FAILED" in str(e):
-                    logger.warning(f"Очередь {self.queue_name} уже существует с другими параметрами")
-                    # Пробуем использовать пассивное объявление
-                    self.channel = self.connection.channel()
-                    self.channel.queue_declare(
-                        queue=self.queue_name,
-                        durable=True,
-                        passive=True  # Только проверяем существование
-                    )
-                    logger.info(f"Используем существующую очередь {self.queue_name}")
-                    return
-                else:
-                    raise
+            # Объявляем приоритетную очередь (параметры общие с продюсером)
+            self.channel = declare_queue(
+                self.connection, self.channel, self.queue_name, recreate=self.recreate_queue
+            )
+            logger.info("Подключено к RabbitMQ %s:%s", self.host, self.port)
 
         except Exception as e:
-            logger.error(f"Неожиданная ошибка подключения: {e}")
+            logger.error("Неожиданная ошибка подключения: %s", e)
             raise
 
     def _reconnect(self):
@@ -160,7 +134,7 @@ class RMQConsumer:
             logger.info("Переподключение успешно")
             return True
         except Exception as e:
-            logger.error(f"Ошибка переподключения: {e}")
+            logger.error("Ошибка переподключения: %s", e)
             return False
 
     def _validate_message(self, message: Dict[str, Any]) -> Optional[str]:
@@ -221,15 +195,25 @@ class RMQConsumer:
                         from backend.messaging.worker import RMQWorker
                         return RMQWorker()
                     except ImportError as e:
-                        logger.error(f"Не удалось импортировать worker: {e}")
+                        logger.error("Не удалось импортировать worker: %s", e)
                         raise
 
         except Exception as e:
-            logger.error(f"Ошибка создания worker: {e}")
+            logger.error("Ошибка создания worker: %s", e)
             raise
 
     def _callback(self, ch, method, properties, body):
         """Callback функция для обработки сообщений из очереди"""
+        self._processing = True
+        try:
+            self._handle_delivery(ch, method, properties, body)
+        finally:
+            self._processing = False
+            if self._stop_requested:
+                self.stop()
+
+    def _handle_delivery(self, ch, method, properties, body):
+        """Обработка одного сообщения: валидация, worker, ack/nack и повтор"""
         task_id = "unknown"
 
         try:
@@ -242,14 +226,27 @@ class RMQConsumer:
             message = json.loads(body)
             task_id = message.get('task_id', 'unknown')
 
-            # Используем контекст для логирования
-            with self._logging_context(task_id):
-                logger.info(f"Начало обработки задачи")
+            # Ожидание в очереди воркер считает от времени отправки из заголовков
+            sent_at = self._sent_timestamp(properties)
+            if sent_at is not None and isinstance(message, dict):
+                message['timestamp'] = sent_at
+
+            # Продолжаем трассировку, начатую в API: ожидание в очереди и обработка
+            trace_parent = tracing.extract(properties.headers)
+            if sent_at is not None:
+                tracing.record_span("queue_wait", sent_at, parent=trace_parent, queue=self.queue_name)
+
+            # Контекст задачи для журнала (task_id в каждой записи)
+            with task_context(task_id), tracing.start_span(
+                    f"consume {self.queue_name}", kind="consumer", parent=trace_parent, task_id=task_id
+            ):
+                logger.info("Начало обработки задачи")
 
                 # Валидация сообщения
                 validation_error = self._validate_message(message)
                 if validation_error:
-                    logger.error(f"Ошибка валидации сообщения: {validation_error}")
+                    FAILURES.inc(failure_class="validation")
+                    logger.error("Ошибка валидации сообщения: %s", validation_error)
                     ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
                     return
 
@@ -260,16 +257,17 @@ class RMQConsumer:
 
                 # Проверяем максимальное количество попыток
                 if retry_count >= 3:
-                    logger.error(f"Задача превысила максимальное количество попыток ({retry_count})")
+                    FAILURES.inc(failure_class="retries_exhausted")
+                    logger.error("Задача превысила максимальное количество попыток (%s)", retry_count)
                     ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
                     return
 
                 # Создаем worker
                 try:
                     worker = self._create_worker()
-                    logger.info(f"Worker создан для задачи {task_id}")
+                    logger.info("Worker создан для задачи %s", task_id)
                 except Exception as e:
-                    logger.error(f"Ошибка создания worker: {e}")
+                    logger.error("Ошибка создания worker: %s", e)
                     ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
                     time.sleep(5)
                     return
@@ -280,26 +278,26 @@ class RMQConsumer:
                     result = worker.process_message(message)
                     processing_time = time.time() - start_time
 
-                    logger.info(f"Задача обработана за {processing_time:.2f} секунд")
+                    logger.info("Задача обработана за %.2f секунд", processing_time)
 
                 except Exception as e:
-                    logger.exception(f"Ошибка обработки сообщения: {e}")
+                    logger.exception("Ошибка обработки сообщения: %s", e)
                     ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
                     time.sleep(10)
                     return
 
                 # Обработка результата
                 if result.get('status') == 'completed':
-                    logger.info(f"Задача успешно завершена")
+                    logger.info("Задача успешно завершена")
                     ch.basic_ack(delivery_tag=method.delivery_tag)
 
                 elif result.get('status') == 'partial':
-                    logger.warning(f"Задача завершена частично: {result.get('error', 'No error info')}")
+                    logger.warning("Задача завершена частично: %s", result.get('error', 'No error info'))
                     ch.basic_ack(delivery_tag=method.delivery_tag)
 
                 elif result.get('status') == 'error':
                     error_msg = result.get('error', 'Неизвестная ошибка')
-                    logger.error(f"Ошибка обработки задачи: {error_msg}")
+                    logger.error("Ошибка обработки задачи: %s", error_msg)
 
                     # Проверяем тип ошибки
                     error_lower = error_msg.lower()
@@ -311,26 +309,27 @@ class RMQConsumer:
                         'type component not determined',
                         'компонент не определен'
                     ]):
-                        logger.warning(f"AI не смог определить тип компонента. Удаляем сообщение из очереди.")
+                        logger.warning("AI не смог определить тип компонента. Удаляем сообщение из очереди.")
                         ch.basic_ack(delivery_tag=method.delivery_tag)  # Подтверждаем и удаляем
 
-                        # Дополнительно: можно сохранить статистику проблемных запросов
+                        # Запрос — пример для обучения классификатора
                         self._log_failed_query(message.get('query', ''), error_msg)
 
                     # Ошибки AI или подключения - повторяем с задержкой
                     elif "ai" in error_lower or "connection" in error_lower or "timeout" in error_lower:
-                        logger.info(f"Ошибка AI/подключения. Повтор через 30 секунд")
+                        logger.info("Ошибка AI/подключения. Повтор через 30 секунд")
 
                         # Обновляем headers
                         new_headers = properties.headers.copy() if properties.headers else {}
                         new_headers['x-retry-count'] = retry_count + 1
                         new_headers['x-last-error'] = error_msg
-                        new_headers['x-retry-timestamp'] = int(time.time())
+                        new_headers['x-retry-timestamp'] = time.time()
 
                         # Создаем новые свойства
                         new_properties = pika.BasicProperties(
                             delivery_mode=properties.delivery_mode,
                             content_type=properties.content_type,
+                            priority=properties.priority,  # Сохраняем полосу приоритета
                             headers=new_headers,
                             timestamp=int(time.time())
                         )
@@ -348,36 +347,28 @@ class RMQConsumer:
 
                         # Подтверждаем оригинальное сообщение
                         ch.basic_ack(delivery_tag=method.delivery_tag)
+                        RETRIES.inc(kind="queue")
 
                     else:
                         # Другие ошибки - не повторяем
-                        logger.error(f"Критическая ошибка. Удаляем сообщение из очереди.")
+                        logger.error("Критическая ошибка. Удаляем сообщение из очереди.")
                         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
         except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON: {e}")
+            FAILURES.inc(failure_class="decode")
+            logger.error("Ошибка декодирования JSON: %s", e)
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
         except Exception as e:
-            logger.exception(f"Неожиданная ошибка при обработке задачи {task_id}: {e}")
+            logger.exception("Неожиданная ошибка при обработке задачи %s: %s", task_id, e)
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
             time.sleep(10)
 
     def _log_failed_query(self, query: str, error: str):
-        """Логирование неудачных запросов для анализа"""
-        try:
-            # Сохраняем в файл для последующего анализа
-            log_file = "failed_queries.log"
-            with open(log_file, 'a', encoding='utf-8') as f:
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                f.write(f"[{timestamp}] Query: {query}\n")
-                f.write(f"[{timestamp}] Error: {error}\n")
-                f.write("-" * 80 + "\n")
-
-            logger.info(f"Неудачный запрос сохранен в {log_file}")
-
-        except Exception as e:
-            logger.error(f"Ошибка сохранения неудачного запроса: {e}")
+        """Неудачный запрос в фоновый приёмник (без записи на диск в потоке consumer'а)"""
+        sink = get_failed_query_sink()
+        if sink is not None:
+            sink.submit("unclassified", query, error=error)
 
     def start_consuming(self):
         """Запуск потребления сообщений из очереди"""
@@ -398,18 +389,18 @@ class RMQConsumer:
             )
 
             self.is_consuming = True
-            logger.info(f"Начато потребление из очереди '{self.queue_name}'")
+            logger.info("Начато потребление из очереди '%s'", self.queue_name)
 
             # Запускаем бесконечный цикл
             self.channel.start_consuming()
 
         except pika.exceptions.ChannelClosedByBroker as e:
-            logger.error(f"Канал закрыт брокером: {e}")
+            logger.error("Канал закрыт брокером: %s", e)
             if self.should_reconnect:
                 self._reconnect()
                 self.start_consuming()
         except Exception as e:
-            logger.error(f"Ошибка запуска consumer: {e}")
+            logger.error("Ошибка запуска consumer: %s", e)
             raise
 
     def stop(self):
@@ -422,10 +413,10 @@ class RMQConsumer:
             # Отменяем consumer
             if self.channel and self.channel.is_open and self.consumer_tag:
                 self.channel.basic_cancel(self.consumer_tag)
-                logger.info(f"Consumer {self.consumer_tag} отменен")
+                logger.info("Consumer %s отменен", self.consumer_tag)
 
         except Exception as e:
-            logger.error(f"Ошибка отмены consumer: {e}")
+            logger.error("Ошибка отмены consumer: %s", e)
 
         try:
             # Закрываем канал
@@ -433,7 +424,7 @@ class RMQConsumer:
                 self.channel.close()
 
         except Exception as e:
-            logger.error(f"Ошибка закрытия канала: {e}")
+            logger.error("Ошибка закрытия канала: %s", e)
 
         try:
             # Закрываем соединение
@@ -442,7 +433,7 @@ class RMQConsumer:
                 logger.info("Соединение закрыто")
 
         except Exception as e:
-            logger.error(f"Ошибка закрытия соединения: {e}")
+            logger.error("Ошибка закрытия соединения: %s", e)
 
         logger.info("Consumer остановлен")
 
@@ -457,22 +448,6 @@ class RMQConsumer:
             logger.info("Consumer прерван пользователем")
             self.stop()
         except Exception as e:
-            logger.error(f"Consumer завершился с ошибкой: {e}")
+            logger.error("Consumer завершился с ошибкой: %s", e)
             self.stop()
             raise
-
-        def _log_failed_query(self, query: str, error: str):
-            """Логирование неудачных запросов для анализа"""
-            try:
-                # Сохраняем в файл для последующего анализа
-                log_file = "failed_queries.log"
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                    f.write(f"[{timestamp}] Query: {query}\n")
-                    f.write(f"[{timestamp}] Error: {error}\n")
-                    f.write("-" * 80 + "\n")
-
-                logger.info(f"Неудачный запрос сохранен в {log_file}")
-
-            except Exception as e:
-                logger.error(f"Ошибка сохранения неудачного запроса: {e}")
\ No newline at end of file
@@ -9,6 +9,9 @@ from typing import Optional, Dict, Any, List, Union
 from dataclasses import dataclass, asdict
 from contextlib import contextmanager
 
+from backend.messaging.queues import MAX_PRIORITY, PRIORITY_DEFAULT, declare_queue
+from hydro_find.instrumentation import tracing
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,7 +20,7 @@ class Message:
     """Датакласс для структурированных сообщений"""
     task_id: str
     query: str
-    priority: int = 5
+    priority: int = PRIORITY_DEFAULT
     metadata: Optional[Dict[str, Any]] = None
     timestamp: Optional[float] = None
 
@@ -27,8 +30,8 @@ class Message:
             self.timestamp = time.time()
         if self.metadata is None:
             self.metadata = {}
-        if not isinstance(self.priority, int) or self.priority < 0 or self.priority > 10:
-            raise ValueError("Priority must be an integer between 0 and 10")
+        if not isinstance(self.priority, int) or self.priority < 0 or self.priority > MAX_PRIORITY:
+            raise ValueError(f"Priority must be an integer between 0 and {MAX_PRIORITY}")
 
     def to_dict(self) -> Dict[str, Any]:
         """Преобразование в словарь"""
@@ -43,7 +46,7 @@ class RMQProducer:
             host: Optional[str] = None,
             port: Optional[int] = None,
             queue_name: str = 'search_queue',
-            default_priority: int = 5,
+            default_priority: int = PRIORITY_DEFAULT,
             max_retries: int = 3,
             recreate_queue: bool = False  # Флаг для пересоздания очереди
     ):
@@ -77,7 +80,7 @@ class RMQProducer:
         import atexit
         atexit.register(self.close)
 
-        logger.info(f"Продюсер инициализирован для очереди '{queue_name}'")
+        logger.info("Продюсер инициализирован для очереди '%s'", queue_name)
 
     def _connect(self):
         """Подключение к RabbitMQ"""
@@ -106,40 +109,15 @@ class RMQProducer:
 
                 self._channel = self._connection.channel()
 
-                # Объявляем очередь (без dead-letter параметров для совместимости)
-                try:
-                    if self.recreate_queue:
-                        # Пытаемся удалить старую очередь
-                        try:
-                            self._channel.queue_delete(self.queue_name)
-                            logger.info(f"Очередь {self.queue_name} удалена для пересоздания")
-                        except:
-                            pass
-
-                    # Создаем очередь с минимальными параметрами
-                    self._channel.queue_declare(
-                        queue=self.queue_name,
-                        durable=True
-                    )
+                # Объявляем приоритетную очередь (параметры общие с consumer'ом)
+                self._channel = declare_queue(
+                    self._connection, self._channel, self.queue_name, recreate=self.recreate_queue
+                )
 
-                except pika.exceptions.ChannelClosedByBroker as e:
-                    # Если очередь уже существует с другими параметрами,
-                    # используем пассивное объявление
-                    if "PRECONDITION_FAILED" in str(e):
-                        logger.warning(f"Очередь {self.queue_name} уже существует с другими параметрами")
-                        self._channel = self._connection.channel()
-                        self._channel.queue_declare(
-                            queue=self.queue_name,
-                            durable=True,
-                            passive=True  # Только проверка существования
-                        )
-                    else:
-                        raise
-
-                logger.info(f"Успешно подключено к RabbitMQ {self.host}:{self.port}")
+                logger.info("Успешно подключено к RabbitMQ %s:%s", self.host, self.port)
 
             except Exception as e:
-                logger.error(f"Ошибка подключения к RabbitMQ: {e}")
+                logger.error("Ошибка подключения к RabbitMQ: %s", e)
                 raise
 
     def _reconnect(self):
@@ -148,7 +126,7 @@ class RMQProducer:
             self._connect()
             return True
         except Exception as e:
-            logger.error(f"Ошибка переподключения: {e}")
+            logger.error("Ошибка переподключения: %s", e)
             return False
 
     def validate_message(self, message: Union[Dict[str, Any], Message]) -> List[str]:
@@ -192,8 +170,8 @@ class RMQProducer:
             priority = message_dict['priority']
             if not isinstance(priority, int):
                 errors.append("priority должен быть целым числом")
-            elif priority < 0 or priority > 10:
-                errors.append("priority должен быть в диапазоне от 0 до 10")
+            elif priority < 0 or priority > MAX_PRIORITY:
+                errors.append(f"priority должен быть в диапазоне от 0 до {MAX_PRIORITY}")
 
         if 'metadata' in message_dict and not isinstance(message_dict['metadata'], dict):
             errors.append("metadata должен быть словарем")
@@ -204,7 +182,7 @@ class RMQProducer:
             self,
             query: str,
             task_id: Optional[str] = None,
-            priority: int = 5,
+            priority: int = PRIORITY_DEFAULT,
             metadata: Optional[Dict[str, Any]] = None
     ) -> Message:
         """
@@ -281,12 +259,14 @@ class RMQProducer:
             content_encoding='utf-8',
             timestamp=int(time.time()),
             priority=full_message['priority'],
-            headers={
-                'x-sent-timestamp': int(time.time()),
+            # traceparent продолжает трассировку запроса в consumer'е
+            headers=tracing.inject({
+                # Дробные секунды — для точного замера ожидания в очереди
+                'x-sent-timestamp': time.time(),
                 'x-task-id': full_message['task_id'],
                 'x-priority': full_message['priority'],
                 'x-retry-count': 0
-            }
+            })
         )
 
         # Попытки отправки
@@ -311,7 +291,7 @@ class RMQProducer:
                 )
 
                 logger.info(
-                    f"Сообщение отправлено в очередь '{queue_name}'",
+                    "Сообщение отправлено в очередь '%s'", queue_name,
                     extra={
                         'task_id': full_message['task_id'],
                         'queue': queue_name,
@@ -324,8 +304,8 @@ class RMQProducer:
             except (pika.exceptions.AMQPConnectionError, pika.exceptions.StreamLostError) as e:
                 wait_time = min(30, 2 ** attempt)
                 logger.warning(
-                    f"Ошибка подключения при отправке сообщения {full_message['task_id']}. "
-                    f"Попытка {attempt + 1}/{max_attempts}. Ожидание {wait_time} секунд..."
+                    "Ошибка подключения при отправке сообщения %s. Попытка %s/%s. Ожидание %s секунд...",
+                    full_message['task_id'], attempt + 1, max_attempts, wait_time
                 )
 
                 if attempt < max_attempts - 1:
@@ -333,13 +313,14 @@ class RMQProducer:
                     self._reconnect()
                 else:
                     logger.error(
-                        f"Не удалось отправить сообщение {full_message['task_id']} после {max_attempts} попыток"
+                        "Не удалось отправить сообщение %s после %s попыток",
+                        full_message['task_id'], max_attempts
                     )
                     return False
 
             except Exception as e:
                 logger.exception(
-                    f"Неожиданная ошибка при отправке сообщения {full_message['task_id']}: {e}"
+                    "Неожиданная ошибка при отправке сообщения %s: %s", full_message['task_id'], e
                 )
                 if attempt == max_attempts - 1:
                     return False
@@ -356,14 +337,14 @@ class RMQProducer:
                 self._channel.close()
                 logger.debug("Канал закрыт")
         except Exception as e:
-            logger.error(f"Ошибка закрытия канала: {e}")
+            logger.error("Ошибка закрытия канала: %s", e)
 
         try:
             if self._connection and self._connection.is_open:
                 self._connection.close()
                 logger.debug("Соединение закрыто")
         except Exception as e:
-            logger.error(f"Ошибка закрытия соединения: {e}")
+            logger.error("Ошибка закрытия соединения: %s", e)
 
         logger.info("Ресурсы продюсера закрыты")
 
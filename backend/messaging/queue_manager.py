@@ -5,6 +5,8 @@ import logging
 import time
 from typing import List, Dict, Any
 
+from backend.messaging.queues import declare_queue, queue_arguments
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +25,7 @@ class QueueManager:
             pika.ConnectionParameters(self.host, self.port)
         )
         self.channel = self.connection.channel()
-        logger.info(f"Подключено к RabbitMQ {self.host}:{self.port}")
+        logger.info("Подключено к RabbitMQ %s:%s", self.host, self.port)
 
     def get_queue_stats(self, queue_name: str = 'search_queue') -> Dict[str, Any]:
         """Получение статистики очереди"""
@@ -42,7 +44,7 @@ class QueueManager:
                 'unacked_messages': getattr(result.method, 'messages_unacknowledged', 0)
             }
         except Exception as e:
-            logger.error(f"Ошибка получения статистики очереди: {e}")
+            logger.error("Ошибка получения статистики очереди: %s", e)
             return {}
 
     def peek_messages(self, queue_name: str = 'search_queue', count: int = 10) -> List[Dict[str, Any]]:
@@ -78,7 +80,7 @@ class QueueManager:
                     break
 
         except Exception as e:
-            logger.error(f"Ошибка просмотра сообщений: {e}")
+            logger.error("Ошибка просмотра сообщений: %s", e)
 
         return messages
 
@@ -86,10 +88,10 @@ class QueueManager:
         """Полная очистка очереди"""
         try:
             result = self.channel.queue_purge(queue=queue_name)
-            logger.info(f"Очередь {queue_name} очищена. Удалено сообщений: {result.method.message_count}")
+            logger.info("Очередь %s очищена. Удалено сообщений: %s", queue_name, result.method.message_count)
             return result.method.message_count
         except Exception as e:
-            logger.error(f"Ошибка очистки очереди: {e}")
+            logger.error("Ошибка очистки очереди: %s", e)
             return 0
 
     def remove_specific_messages(self, queue_name: str = 'search_queue',
@@ -110,7 +112,7 @@ class QueueManager:
             queue_stats = self.get_queue_stats(queue_name)
             total_messages = queue_stats['message_count']
 
-            logger.info(f"Начало фильтрации очереди {queue_name} ({total_messages} сообщений)")
+            logger.info("Начало фильтрации очереди %s (%s сообщений)", queue_name, total_messages)
 
             for i in range(total_messages):
                 method_frame, header_frame, body = self.channel.basic_get(
@@ -138,7 +140,7 @@ class QueueManager:
                     # Подтверждаем и удаляем
                     self.channel.basic_ack(method_frame.delivery_tag)
                     removed_count += 1
-                    logger.debug(f"Удалено сообщение {i + 1}/{total_messages}")
+                    logger.debug("Удалено сообщение %s/%s", i + 1, total_messages)
                 else:
                     # Возвращаем обратно в очередь
                     self.channel.basic_nack(method_frame.delivery_tag, requeue=True)
@@ -147,10 +149,10 @@ class QueueManager:
                 if i % 100 == 0:
                     time.sleep(0.1)
 
-            logger.info(f"Фильтрация завершена. Удалено {removed_count} из {total_messages} сообщений")
+            logger.info("Фильтрация завершена. Удалено %s из %s сообщений", removed_count, total_messages)
 
         except Exception as e:
-            logger.error(f"Ошибка фильтрации очереди: {e}")
+            logger.error("Ошибка фильтрации очереди: %s", e)
 
         return removed_count
 
@@ -188,6 +190,72 @@ class QueueManager:
 
         return self.remove_specific_messages(queue_name, ai_failed_filter)
 
+    def ensure_queue(self, queue_name: str = 'search_queue'):
+        """Объявление очереди с теми же параметрами, что у продюсера и consumer'а"""
+        self.channel = declare_queue(self.connection, self.channel, queue_name)
+
+    def _move_messages(self, source: str, target: str) -> int:
+        """
+        Перенос всех сообщений из одной очереди в другую с сохранением свойств.
+        Канал должен быть в режиме подтверждений (confirm_delivery): исходное
+        сообщение подтверждается только после того, как брокер принял копию.
+
+        Raises:
+            pika.exceptions.NackError, pika.exceptions.UnroutableError: Брокер не принял
+                сообщение; оно возвращено в исходную очередь
+        """
+        moved = 0
+        while True:
+            method_frame, header_frame, body = self.channel.basic_get(queue=source, auto_ack=False)
+            if not method_frame:
+                break
+
+            try:
+                self.channel.basic_publish(
+                    exchange='',
+                    routing_key=target,
+                    body=body,
+                    properties=header_frame,
+                    mandatory=True
+                )
+            except Exception:
+                self.channel.basic_nack(method_frame.delivery_tag, requeue=True)
+                logger.error("Брокер не подтвердил перенос сообщения в %s, перенос остановлен", target)
+                raise
+            self.channel.basic_ack(method_frame.delivery_tag)
+            moved += 1
+        return moved
+
+    def migrate_to_priority_queue(self, queue_name: str = 'search_queue') -> int:
+        """
+        Пересоздание очереди с x-max-priority без потери сообщений.
+        Consumer'ы и продюсеры на время миграции должны быть остановлены.
+        Публикации подтверждаются брокером; после сбоя повторный запуск
+        продолжает с сообщениями, оставшимися во временной очереди.
+
+        Args:
+            queue_name: Имя очереди
+
+        Returns:
+            int: Количество перенесённых сообщений
+        """
+        temp_queue = f"{queue_name}_migrating"
+        self.channel.confirm_delivery()
+        self.channel.queue_declare(queue=temp_queue, durable=True, arguments=queue_arguments())
+
+        moved = self._move_messages(queue_name, temp_queue)
+        logger.info("Во временную очередь перенесено %s сообщений", moved)
+
+        # if_empty: очередь, в которую успели что-то опубликовать, не удаляется
+        self.channel.queue_delete(queue=queue_name, if_empty=True)
+        self.channel.queue_declare(queue=queue_name, durable=True, arguments=queue_arguments())
+
+        restored = self._move_messages(temp_queue, queue_name)
+        self.channel.queue_delete(queue=temp_queue, if_empty=True)
+
+        logger.info("Очередь %s пересоздана с приоритетами, восстановлено %s сообщений", queue_name, restored)
+        return restored
+
     def close(self):
         """Закрытие соединения"""
         if self.connection and not self.connection.is_closed:
@@ -219,6 +287,9 @@ def main():
     # Удаление проблемных
     clean_parser = subparsers.add_parser('clean', help='Удаление проблемных сообщений')
 
+    # Пересоздание очереди с приоритетами
+    migrate_parser = subparsers.add_parser('migrate', help='Пересоздать очередь с поддержкой приоритетов')
+
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO)
@@ -264,11 +335,19 @@ def main():
             else:
                 print("Операция отменена.")
 
+        elif args.command == 'migrate':
+            confirm = input(f"⚠️  Остановите consumer'ы и продюсеры. Пересоздать очередь '{args.queue}'? (yes/no): ")
+            if confirm.lower() == 'yes':
+                count = manager.migrate_to_priority_queue(args.queue)
+                print(f"✅ Очередь пересоздана с приоритетами. Перенесено {count} сообщений.")
+            else:
+                print("❌ Операция отменена.")
+
         else:
             parser.print_help()
 
     except Exception as e:
-        logger.error(f"Ошибка: {e}")
+        logger.error("Ошибка: %s", e)
     finally:
         manager.close()
 
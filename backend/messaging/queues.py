@@ -0,0 +1,76 @@
+# messaging/queues.py
+import pika
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Максимальный приоритет очереди (совпадает с валидацией Message.priority)
+MAX_PRIORITY = 10
+
+# Полосы приоритета: одиночные запросы из UI обгоняют пакетный импорт
+PRIORITY_INTERACTIVE = 8
+PRIORITY_DEFAULT = 5
+PRIORITY_BULK = 2
+
+
+def queue_arguments() -> Dict[str, Any]:
+    """Аргументы объявления очереди — одинаковые для продюсера, consumer'а и QueueManager"""
+    return {'x-max-priority': MAX_PRIORITY}
+
+
+def declare_queue(connection, channel, queue_name: str, recreate: bool = False):
+    """
+    Объявление приоритетной очереди.
+
+    Args:
+        connection: Соединение pika
+        channel: Канал pika
+        queue_name: Имя очереди
+        recreate: Удалить очередь перед объявлением (если параметры не совпадают)
+
+    Returns:
+        Канал, пригодный для дальнейшей работы (после ошибки брокер закрывает исходный)
+    """
+    if recreate:
+        try:
+            channel.queue_delete(queue_name)
+            logger.info("Очередь %s удалена для пересоздания", queue_name)
+        except Exception:
+            pass
+
+    try:
+        channel.queue_declare(
+            queue=queue_name,
+            durable=True,
+            arguments=queue_arguments()
+        )
+        return channel
+
+    except pika.exceptions.ChannelClosedByBroker as e:
+        if "PRECONDITION_FAILED" not in str(e):
+            raise
+
+        # Очередь создана раньше без x-max-priority: работаем с ней,
+        # но приоритеты брокер учитывать не будет
+        logger.warning(
+            "Очередь %s уже существует с другими параметрами — приоритеты сообщений "
+            "игнорируются. Пересоздайте её: python -m backend.messaging.queue_manager --queue %s migrate",
+            queue_name, queue_name
+        )
+        channel = connection.channel()
+        channel.queue_declare(
+            queue=queue_name,
+            durable=True,
+            passive=True  # Только проверка существования
+        )
+        return channel
+
+
+def clamp_priority(priority: Any, default: int = PRIORITY_DEFAULT) -> int:
+    """Приведение приоритета из запроса к диапазону 0..MAX_PRIORITY"""
+    try:
+        value = int(priority)
+    except (TypeError, ValueError):
+        return default
+    return max(0, min(MAX_PRIORITY, value))
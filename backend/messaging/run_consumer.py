@@ -6,22 +6,26 @@ import logging
 # Добавляем корневую директорию в PYTHONPATH
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Настройка логирования (без поля task_id для глобальных логов)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
 from consumer import RMQConsumer
+from backend.utils.logging_setup import setup_logging
+from hydro_find.instrumentation import tracing
+from hydro_find.instrumentation.metrics import start_metrics_server
 
 
 def main():
     """Запуск consumer"""
+    # Вне задачи поле task_id в записи — «-»
+    setup_logging()
     logger = logging.getLogger(__name__)
 
     try:
         logger.info("Запуск RabbitMQ Consumer...")
+        tracing.configure("hydrofind-worker")
+
+        # Sidecar с метриками воркера (METRICS_PORT=0 — выключен)
+        metrics_port = int(os.getenv("METRICS_PORT", 9100))
+        if metrics_port:
+            start_metrics_server(metrics_port)
 
         # Создаем consumer с настройками
         consumer = RMQConsumer(
@@ -39,7 +43,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Consumer остановлен пользователем")
     except Exception as e:
-        logger.error(f"Ошибка запуска consumer: {e}")
+        logger.error("Ошибка запуска consumer: %s", e)
         sys.exit(1)
 
 
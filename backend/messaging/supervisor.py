@@ -0,0 +1,384 @@
+# messaging/supervisor.py
+"""
+Супервизор процессов-воркеров: запускает и останавливает RMQConsumer'ы
+в зависимости от глубины очереди, времени ожидания в ней и задержки AI.
+
+    python -m backend.messaging.supervisor --min 1 --max 8
+
+Каждый воркер отдаёт метрики на своём порту (--metrics-base-port + номер слота),
+супервизор читает из них queue_wait и llm.* и снимает глубину очереди через
+QueueManager. Лишние воркеры получают SIGTERM и дорабатывают текущее сообщение.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from hydro_find.instrumentation.metrics import REGISTRY, parse_text
+
+logger = logging.getLogger(__name__)
+
+WORKERS = REGISTRY.gauge("hydrofind_supervisor_workers", "Число запущенных процессов-воркеров")
+DESIRED_WORKERS = REGISTRY.gauge("hydrofind_supervisor_desired_workers", "Целевое число воркеров")
+
+_STAGE_SUM = "hydrofind_stage_duration_seconds_sum"
+_STAGE_COUNT = "hydrofind_stage_duration_seconds_count"
+
+
+@dataclass
+class QueueSample:
+    """Состояние очереди и воркеров за интервал опроса"""
+    depth: int
+    consumers: int = 0
+    queue_wait: Optional[float] = None  # среднее ожидание в очереди, с
+    llm_latency: Optional[float] = None  # средняя длительность вызова AI, с
+
+
+@dataclass
+class ScalingPolicy:
+    """
+    Правила масштабирования.
+
+    Args:
+        min_workers / max_workers: Границы числа воркеров
+        backlog_per_worker: Сообщений в очереди на одного воркера
+        max_queue_wait: Допустимое среднее ожидание в очереди, с
+        llm_latency_ceiling: При задержке AI выше порога новые воркеры не добавляются —
+            провайдер перегружен, дополнительные запросы её только увеличат
+        scale_up_cooldown / scale_down_cooldown: Пауза после изменения числа воркеров, с
+        max_step: Наибольшее число воркеров, добавляемых за один шаг
+    """
+    min_workers: int = 1
+    max_workers: int = 4
+    backlog_per_worker: int = 20
+    max_queue_wait: float = 10.0
+    llm_latency_ceiling: float = 30.0
+    scale_up_cooldown: float = 15.0
+    scale_down_cooldown: float = 60.0
+    max_step: int = 2
+
+    def __post_init__(self):
+        if self.min_workers < 0 or self.max_workers < max(1, self.min_workers):
+            raise ValueError("Нужно 0 <= min_workers <= max_workers и max_workers >= 1")
+
+    def desired(self, current: int, sample: QueueSample) -> int:
+        """Целевое число воркеров по текущему состоянию (без учёта пауз)"""
+        by_backlog = math.ceil(sample.depth / self.backlog_per_worker) if sample.depth else 0
+        target = by_backlog
+
+        # Очередь ждёт дольше допустимого — добавляем воркер, даже если она неглубокая
+        if sample.queue_wait is not None and sample.queue_wait > self.max_queue_wait and sample.depth:
+            target = max(target, current + 1)
+
+        if target > current:
+            if sample.llm_latency is not None and sample.llm_latency > self.llm_latency_ceiling:
+                target = current
+            else:
+                target = min(target, current + self.max_step)
+        elif target < current:
+            # Уменьшаем по одному: очередь может снова вырасти
+            target = current - 1
+
+        return max(self.min_workers, min(self.max_workers, target))
+
+
+class _StageRates:
+    """Средние длительности этапов по разнице счётчиков между опросами"""
+
+    def __init__(self):
+        self._previous: Dict[Tuple[int, str], Tuple[float, float]] = {}
+
+    def update(self, scrapes: Dict[int, str]) -> Tuple[Optional[float], Optional[float]]:
+        totals = {"queue_wait": [0.0, 0.0], "llm": [0.0, 0.0]}
+        current = {}
+        for slot, text in scrapes.items():
+            stages: Dict[str, List[float]] = {}
+            for name, labels, value in parse_text(text):
+                if name in (_STAGE_SUM, _STAGE_COUNT):
+                    stage = labels.get("stage", "")
+                    stages.setdefault(stage, [0.0, 0.0])[name == _STAGE_COUNT] = value
+            for stage, (seconds, count) in stages.items():
+                group = "queue_wait" if stage == "queue_wait" else "llm" if stage.startswith("llm.") else None
+                if group is None:
+                    continue
+                previous_seconds, previous_count = self._previous.get((slot, stage), (0.0, 0.0))
+                if count < previous_count:
+                    # Процесс перезапущен — счётчики начались заново
+                    previous_seconds, previous_count = 0.0, 0.0
+                totals[group][0] += seconds - previous_seconds
+                totals[group][1] += count - previous_count
+                current[(slot, stage)] = (seconds, count)
+        self._previous = current
+
+        average = lambda pair: pair[0] / pair[1] if pair[1] else None
+        return average(totals["queue_wait"]), average(totals["llm"])
+
+
+def scrape_metrics(ports: Dict[int, int], host: str = "127.0.0.1", timeout: float = 2.0) -> Dict[int, str]:
+    """Тексты /metrics воркеров по слотам (недоступные пропускаются)"""
+    import requests
+
+    scrapes = {}
+    for slot, port in ports.items():
+        try:
+            response = requests.get(f"http://{host}:{port}/metrics", timeout=timeout)
+            if response.ok:
+                scrapes[slot] = response.text
+        except requests.RequestException:
+            continue
+    return scrapes
+
+
+def _worker_main(slot: int, metrics_port: int, queue_name: str):
+    """Точка входа процесса-воркера"""
+    from backend.messaging.consumer import RMQConsumer
+    from backend.utils.logging_setup import setup_logging
+    from hydro_find.instrumentation import tracing
+    from hydro_find.instrumentation.metrics import start_metrics_server
+
+    # Номер слота — для файлов, которые процессы не могут делить (журнал неудачных запросов)
+    os.environ["WORKER_SLOT"] = str(slot)
+    setup_logging()
+    tracing.configure("hydrofind-worker")
+    if metrics_port:
+        start_metrics_server(metrics_port, host="127.0.0.1")
+    logging.getLogger(__name__).info("Воркер %s запущен (pid %s)", slot, os.getpid())
+    RMQConsumer(queue_name=queue_name).run()
+
+
+class WorkerSupervisor:
+    """Запуск и остановка процессов-воркеров по ScalingPolicy"""
+
+    def __init__(
+            self,
+            policy: ScalingPolicy,
+            queue_stats: Callable[[], Dict[str, Any]],
+            process_factory: Optional[Callable[[int, int], Any]] = None,
+            metrics_source: Optional[Callable[[Dict[int, int]], Dict[int, str]]] = None,
+            queue_name: str = 'search_queue',
+            metrics_base_port: int = 9101,
+            drain_timeout: float = 120.0,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            policy: Правила масштабирования
+            queue_stats: Статистика очереди (формат QueueManager.get_queue_stats)
+            process_factory: (слот, порт метрик) → объект процесса (start/terminate/join/is_alive/kill);
+                по умолчанию multiprocessing.Process с RMQConsumer
+            metrics_source: Порты метрик по слотам → тексты /metrics
+            queue_name: Очередь воркеров
+            metrics_base_port: Порт метрик слота 0 (0 — метрики воркеров не читаются)
+            drain_timeout: Сколько ждать завершения текущего сообщения при остановке, с
+            clock: Источник времени (для тестов)
+        """
+        self.policy = policy
+        self.queue_stats = queue_stats
+        self.process_factory = process_factory or self._spawn_process
+        self.metrics_source = metrics_source if metrics_source is not None else scrape_metrics
+        self.queue_name = queue_name
+        self.metrics_base_port = metrics_base_port
+        self.drain_timeout = drain_timeout
+        self.clock = clock
+
+        self.workers: Dict[int, Any] = {}
+        self._retiring: List[Tuple[int, Any, float]] = []
+        self._rates = _StageRates()
+        self._last_scale_up = float("-inf")
+        self._last_scale_down = float("-inf")
+        self._running = False
+
+    def _spawn_process(self, slot: int, metrics_port: int):
+        # spawn: дочерний процесс не наследует потоки и соединения супервизора
+        context = multiprocessing.get_context("spawn")
+        return context.Process(
+            target=_worker_main, args=(slot, metrics_port, self.queue_name),
+            name=f"hydrofind-worker-{slot}", daemon=False
+        )
+
+    def _metrics_port(self, slot: int) -> int:
+        return self.metrics_base_port + slot if self.metrics_base_port else 0
+
+    def _start_worker(self):
+        # Слот останавливаемого воркера занят, пока тот не освободит порт метрик
+        busy = set(self.workers) | {slot for slot, _, _ in self._retiring}
+        slot = next(i for i in range(len(busy) + 1) if i not in busy)
+        process = self.process_factory(slot, self._metrics_port(slot))
+        process.start()
+        self.workers[slot] = process
+        logger.info("Запущен воркер %s", slot)
+
+    def _retire_worker(self):
+        slot = max(self.workers)
+        process = self.workers.pop(slot)
+        # SIGTERM: RMQConsumer дорабатывает текущее сообщение и останавливается
+        process.terminate()
+        self._retiring.append((slot, process, self.clock() + self.drain_timeout))
+        logger.info("Воркер %s остановлен (ожидание завершения сообщения)", slot)
+
+    def _reap(self):
+        """Упавшие воркеры убираются из списка; зависшие при остановке — завершаются принудительно"""
+        for slot, process in list(self.workers.items()):
+            if not process.is_alive():
+                logger.warning("Воркер %s завершился (код %s)", slot, getattr(process, "exitcode", None))
+                del self.workers[slot]
+
+        still_retiring = []
+        for slot, process, deadline in self._retiring:
+            if not process.is_alive():
+                process.join(0)
+            elif self.clock() >= deadline:
+                logger.warning("Воркер %s не остановился за %s с, принудительное завершение", slot, self.drain_timeout)
+                process.kill()
+                process.join(0)
+            else:
+                still_retiring.append((slot, process, deadline))
+        self._retiring = still_retiring
+
+    def sample(self) -> Optional[QueueSample]:
+        """Глубина очереди из брокера, ожидание и задержка AI из метрик воркеров; None — брокер недоступен"""
+        stats = self.queue_stats()
+        if not stats:
+            return None
+        queue_wait = llm_latency = None
+        if self.metrics_base_port:
+            ports = {slot: self._metrics_port(slot) for slot in self.workers}
+            queue_wait, llm_latency = self._rates.update(self.metrics_source(ports))
+        return QueueSample(
+            depth=int(stats.get('message_count', 0)),
+            consumers=int(stats.get('consumer_count', 0)),
+            queue_wait=queue_wait,
+            llm_latency=llm_latency,
+        )
+
+    def step(self) -> Optional[QueueSample]:
+        """Один цикл: уборка процессов, замер, масштабирование"""
+        self._reap()
+        sample = self.sample()
+        current = len(self.workers)
+        if sample is None:
+            # Без статистики очереди только поддерживаем минимум
+            logger.warning("Статистика очереди недоступна, число воркеров не меняется")
+            target = max(current, self.policy.min_workers)
+        else:
+            target = self.policy.desired(current, sample)
+        # Меньше минимума (воркер упал) — восстанавливаем без паузы
+        if current < self.policy.min_workers:
+            target = max(target, self.policy.min_workers)
+        DESIRED_WORKERS.set(target)
+
+        now = self.clock()
+        if target > current and (current < self.policy.min_workers
+                                 or now - self._last_scale_up >= self.policy.scale_up_cooldown):
+            logger.info("Масштабирование %s → %s (%s)", current, target, sample)
+            for _ in range(target - current):
+                self._start_worker()
+            self._last_scale_up = now
+        elif target < current and now - max(self._last_scale_up, self._last_scale_down) >= self.policy.scale_down_cooldown:
+            logger.info("Масштабирование %s → %s (%s)", current, target, sample)
+            for _ in range(current - target):
+                self._retire_worker()
+            self._last_scale_down = now
+
+        WORKERS.set(len(self.workers))
+        return sample
+
+    def run(self, interval: float = 5.0):
+        """Цикл супервизора до SIGINT/SIGTERM"""
+        self._running = True
+
+        def _stop(signum, frame):
+            logger.info("Получен сигнал %s, остановка воркеров...", signum)
+            self._running = False
+
+        signal.signal(signal.SIGINT, _stop)
+        signal.signal(signal.SIGTERM, _stop)
+
+        while self._running:
+            try:
+                self.step()
+            except Exception as e:
+                logger.error("Ошибка цикла супервизора: %s", e)
+            time.sleep(interval)
+        self.shutdown()
+
+    def shutdown(self):
+        """Остановка всех воркеров с ожиданием текущих сообщений"""
+        while self.workers:
+            self._retire_worker()
+        for _, process, deadline in self._retiring:
+            process.join(max(0.0, deadline - self.clock()))
+            if process.is_alive():
+                process.kill()
+                process.join(0)
+        self._retiring = []
+        WORKERS.set(0)
+
+
+def _queue_stats_source(host: str, port: int, queue_name: str) -> Callable[[], Dict[str, Any]]:
+    """Статистика очереди через QueueManager с переподключением при обрыве"""
+    from backend.messaging.queue_manager import QueueManager
+
+    manager = QueueManager(host, port)
+
+    def stats() -> Dict[str, Any]:
+        if manager.connection is None or manager.connection.is_closed:
+            manager.connect()
+        result = manager.get_queue_stats(queue_name)
+        if not result:
+            manager.connection = None
+        return result
+
+    return stats
+
+
+def main():
+    """CLI супервизора воркеров"""
+    import argparse
+
+    from backend.utils.logging_setup import setup_logging
+    from hydro_find.instrumentation.metrics import start_metrics_server
+
+    parser = argparse.ArgumentParser(description='Автомасштабирование процессов-воркеров')
+    parser.add_argument('--queue', default=os.getenv("RABBITMQ_QUEUE", "search_queue"), help='Имя очереди')
+    parser.add_argument('--min', type=int, default=int(os.getenv("WORKERS_MIN", 1)), help='Минимум воркеров')
+    parser.add_argument('--max', type=int, default=int(os.getenv("WORKERS_MAX", 4)), help='Максимум воркеров')
+    parser.add_argument('--backlog-per-worker', type=int, default=20, help='Сообщений в очереди на воркер')
+    parser.add_argument('--max-queue-wait', type=float, default=10.0, help='Допустимое ожидание в очереди, с')
+    parser.add_argument('--llm-latency-ceiling', type=float, default=30.0,
+                        help='Задержка AI, выше которой воркеры не добавляются, с')
+    parser.add_argument('--interval', type=float, default=5.0, help='Период опроса, с')
+    parser.add_argument('--metrics-base-port', type=int, default=9101,
+                        help='Порт метрик первого воркера (0 — не читать метрики воркеров)')
+    parser.add_argument('--drain-timeout', type=float, default=120.0, help='Ожидание остановки воркера, с')
+    args = parser.parse_args()
+
+    setup_logging()
+    metrics_port = int(os.getenv("METRICS_PORT", 9100))
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+    policy = ScalingPolicy(
+        min_workers=args.min,
+        max_workers=args.max,
+        backlog_per_worker=args.backlog_per_worker,
+        max_queue_wait=args.max_queue_wait,
+        llm_latency_ceiling=args.llm_latency_ceiling,
+    )
+    stats = _queue_stats_source(
+        os.getenv("RABBITMQ_HOST", "localhost"), int(os.getenv("RABBITMQ_PORT", 5672)), args.queue
+    )
+    supervisor = WorkerSupervisor(
+        policy, stats, queue_name=args.queue,
+        metrics_base_port=args.metrics_base_port, drain_timeout=args.drain_timeout,
+    )
+    supervisor.run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,16 @@ from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, asdict
 import json
 
+from backend.services.db_service import pagination_for
+from backend.services.failed_queries import get_failed_query_sink
+from backend.services.fast_path import looks_like_article
+from backend.services.query_log import get_query_recorder
+from backend.utils.logging_setup import task_context
+from hydro_find.ai.schemas import validate_params
+from hydro_find.database.models import CATEGORY_TO_MODEL
+from hydro_find.instrumentation import timing, tracing
+from hydro_find.instrumentation.metrics import CACHE_REQUESTS, FAILURES, TASKS
+
 logger = logging.getLogger(__name__)
 
 
@@ -69,14 +79,16 @@ class RMQWorker:
         # AI Service - ОБЯЗАТЕЛЬНО должен быть передан или создан
         if ai_service is None:
             try:
-                from backend.services.ai_service import AIService
-                self._ai_service = AIService()
+                # Общий на процесс: consumer создаёт worker на каждое сообщение,
+                # а статистика моделей и лимиты запросов должны переживать сообщения
+                from backend.services.ai_service import get_ai_service
+                self._ai_service = get_ai_service()
                 logger.info("AI сервис создан")
             except ImportError as e:
-                logger.error(f"Ошибка импорта AI сервиса: {e}")
+                logger.error("Ошибка импорта AI сервиса: %s", e)
                 raise
             except Exception as e:
-                logger.error(f"Ошибка создания AI сервиса: {e}")
+                logger.error("Ошибка создания AI сервиса: %s", e)
                 raise
         else:
             self._ai_service = ai_service
@@ -85,15 +97,17 @@ class RMQWorker:
         # DB Service
         if db_service is None:
             try:
-                from backend.services.db_service import DBService
-                self._db_service = DBService()
+                # Общий на процесс: consumer создаёт worker на каждое сообщение,
+                # а подключение и индекс артикулов должны переживать сообщения
+                from backend.services.db_service import get_db_service
+                self._db_service = get_db_service()
                 logger.info("DB сервис создан")
             except ImportError as e:
-                logger.error(f"Ошибка импорта DB сервиса: {e}")
+                logger.error("Ошибка импорта DB сервиса: %s", e)
                 # Не падаем, так как возможна работа без БД
                 self._db_service = None
             except Exception as e:
-                logger.error(f"Ошибка создания DB сервиса: {e}")
+                logger.error("Ошибка создания DB сервиса: %s", e)
                 self._db_service = None
         else:
             self._db_service = db_service
@@ -105,11 +119,11 @@ class RMQWorker:
                 self._cache_service = CacheService()
                 logger.info("Cache сервис создан")
             except ImportError as e:
-                logger.error(f"Ошибка импорта Cache сервиса: {e}")
+                logger.error("Ошибка импорта Cache сервиса: %s", e)
                 # Не падаем, так как возможна работа без кэша
                 self._cache_service = None
             except Exception as e:
-                logger.error(f"Ошибка создания Cache сервиса: {e}")
+                logger.error("Ошибка создания Cache сервиса: %s", e)
                 self._cache_service = None
         else:
             self._cache_service = cache_service
@@ -172,14 +186,18 @@ class RMQWorker:
 
         try:
             cache_key = self._generate_cache_key(query, **kwargs)
-            cached_result = self.cache.get_cached_search_result(cache_key)
+            with timing.stage("cache_lookup"):
+                cached_result = self.cache.get_cached_search_result(cache_key)
 
             if cached_result:
-                logger.debug(f"Кэш попадание для запроса: {query[:50]}...")
+                CACHE_REQUESTS.inc(layer="worker", result="hit")
+                logger.debug("Кэш попадание для запроса: %s...", query[:50])
                 return cached_result
+            CACHE_REQUESTS.inc(layer="worker", result="miss")
 
         except Exception as e:
-            logger.warning(f"Ошибка доступа к кэшу: {e}")
+            CACHE_REQUESTS.inc(layer="worker", result="error")
+            logger.warning("Ошибка доступа к кэшу: %s", e)
 
         return None
 
@@ -190,23 +208,25 @@ class RMQWorker:
 
         try:
             cache_key = self._generate_cache_key(query, **kwargs)
-            self.cache.cache_search_result(cache_key, result, ttl=self.cache_ttl)
-            logger.debug(f"Результат сохранен в кэш")
+            with timing.stage("cache_store"):
+                self.cache.cache_search_result(cache_key, result, ttl=self.cache_ttl)
+            logger.debug("Результат сохранен в кэш")
 
         except Exception as e:
-            logger.error(f"Ошибка сохранения в кэш: {e}")
+            logger.error("Ошибка сохранения в кэш: %s", e)
 
     def _process_ai_query(self, query: str) -> Dict[str, Any]:
         """Обработка запроса с помощью AI"""
         try:
-            logger.info(f"Отправка запроса к AI: {query[:100]}...")
+            logger.info("Отправка запроса к AI: %s...", query[:100])
 
             # Вызываем AI сервис
-            ai_result = self.ai.process_single(query)
+            with timing.stage("ai"):
+                ai_result = self.ai.process_single(query)
 
             if not ai_result.get("success", False):
                 error_msg = ai_result.get("error", "AI обработка не удалась")
-                logger.error(f"AI обработка не удалась: {error_msg}")
+                logger.error("AI обработка не удалась: %s", error_msg)
 
                 # Определяем тип ошибки
                 error_lower = error_msg.lower()
@@ -217,36 +237,134 @@ class RMQWorker:
                 else:
                     raise RuntimeError(f"AI сервис ошибка: {error_msg}")
 
-            logger.info(f"AI обработка завершена успешно. Тип: {ai_result.get('component_type')}")
+            logger.info("AI обработка завершена успешно. Тип: %s", ai_result.get('component_type'))
+            self._log_low_confidence(query, ai_result)
             return ai_result
 
         except ValueError as e:
             # Это ошибка "не удалось определить тип компонента" - прокидываем дальше
+            FAILURES.inc(failure_class="ai_classification")
             raise
         except Exception as e:
-            logger.exception(f"Исключение в AI обработке: {e}")
+            FAILURES.inc(failure_class="ai")
+            logger.exception("Исключение в AI обработке: %s", e)
             raise
 
+    @staticmethod
+    def _log_low_confidence(query: str, ai_result: Dict[str, Any]):
+        """Запрос, в котором локальный классификатор не уверен, — пример для дообучения"""
+        prediction = ai_result.get("local_prediction")
+        if not prediction:
+            return
+        sink = get_failed_query_sink()
+        if sink is not None:
+            sink.submit(
+                "low_confidence", query,
+                component_type=ai_result.get("component_type"),
+                local_label=prediction.get("label"),
+                local_confidence=prediction.get("confidence"),
+            )
+
+    def _lookup_article(self, query: str) -> List[Dict[str, Any]]:
+        """Компоненты с точным артикулом (индекс артикулов); пустой список — нужен AI"""
+        if self._db_service is None or not looks_like_article(query):
+            return []
+        try:
+            with timing.stage("article_lookup"):
+                return self.db.find_by_article(query.strip())
+        except Exception as e:
+            logger.warning("Ошибка поиска по артикулу: %s", e)
+            return []
+
+    def _search_unified(self, query: str) -> List[Dict[str, Any]]:
+        """Поиск по всем категориям сразу — тип не определён или у него нет таблицы"""
+        if self._db_service is None:
+            return []
+        try:
+            with timing.stage("db_search_unified"):
+                return self.db.search_all(query)
+        except Exception as e:
+            FAILURES.inc(failure_class="db")
+            logger.exception("Ошибка общего поиска в БД: %s", e)
+            return []
+
+    def _search_candidates(self, candidates: List[Dict[str, Any]], search_params: Dict[str, Any],
+                           ai_result: Dict[str, Any], query: str) -> List[Dict[str, Any]]:
+        """Одновременный поиск по основному и близким типам (неоднозначный запрос) с общим ранжированием"""
+        param_sets = []
+        for candidate in candidates:
+            component_type = candidate["component_type"]
+            if component_type == search_params["component_type"]:
+                params = search_params
+            else:
+                # Параметры основного типа переносим на кандидата по его схеме
+                _, typed = validate_params(component_type, ai_result.get("extracted_data"))
+                params = {"component_type": component_type, "original_query": query, **typed}
+            param_sets.append((params, candidate.get("score", 0.0)))
+
+        logger.info("Неоднозначный тип, поиск по кандидатам: %s", [c["component_type"] for c in candidates])
+        return self.db.search_candidates(param_sets)
+
+    @staticmethod
+    def _typed_search_params(ai_result: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Параметры поиска по типу: типизированные (id значений Enum) приоритетнее текстовых"""
+        typed_params = ai_result.get("search_params")
+        return {
+            "component_type": ai_result.get("component_type", ""),
+            "original_query": query,
+            **(typed_params if typed_params is not None else ai_result.get("extracted_data", {}))
+        }
+
+    @staticmethod
+    def _valid_candidates(ai_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Типы-кандидаты неоднозначного запроса, у которых есть таблица"""
+        return [c for c in ai_result.get("candidates") or [] if c.get("component_type") in CATEGORY_TO_MODEL]
+
+    def _pagination(self, ai_result: Dict[str, Any], query: str,
+                    matches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Продолжение выдачи через GET /api/task/<id>/matches — только для поиска
+        по одному типу: его совпадения, в отличие от поиска по артикулу,
+        кандидатам и общего поиска, не содержат component_type.
+        """
+        if not matches or "component_type" in matches[0] \
+                or ai_result.get("component_type") not in CATEGORY_TO_MODEL:
+            return None
+        return pagination_for(self._typed_search_params(ai_result, query), matches)
+
     def _search_database(self, ai_result: Dict[str, Any], query: str) -> List[Dict[str, Any]]:
-        """Поиск в базе данных"""
+        """
+        Поиск в базе данных. Неоднозначный тип — одновременный поиск по кандидатам.
+        Общий поиск по всем категориям вместо поиска по типу, если у типа нет
+        таблицы (например, banjo-bolt), и вместо пустого результата, если
+        локальный классификатор не был уверен в типе.
+        """
         if self._db_service is None:
             logger.warning("DB сервис недоступен, пропускаем поиск в БД")
             return []
 
-        try:
-            search_params = {
-                "component_type": ai_result.get("component_type", ""),
-                "original_query": query,
-                **ai_result.get("extracted_data", {})
-            }
+        if ai_result.get("component_type") not in CATEGORY_TO_MODEL:
+            logger.info("Нет таблицы для типа %s, общий поиск", ai_result.get("component_type"))
+            return self._search_unified(query)
 
-            logger.debug(f"Поиск в БД с параметрами: {search_params}")
-            matches = self.db.search_by_ai_params(search_params)
+        try:
+            search_params = self._typed_search_params(ai_result, query)
+            candidates = self._valid_candidates(ai_result)
+            logger.debug("Поиск в БД с параметрами: %s", search_params)
+            with timing.stage("db_search"):
+                if len(candidates) > 1:
+                    matches = self._search_candidates(candidates, search_params, ai_result, query)
+                else:
+                    matches = self.db.search_by_ai_params(search_params)
 
+            if not matches and ai_result.get("local_prediction"):
+                logger.info("Тип определён неуверенно и ничего не найдено, общий поиск")
+                return self._search_unified(query)
             return matches
 
         except Exception as e:
-            logger.exception(f"Ошибка поиска в БД: {e}")
+            FAILURES.inc(failure_class="db")
+            logger.exception("Ошибка поиска в БД: %s", e)
             return []
 
     def _prepare_final_result(
@@ -271,24 +389,168 @@ class RMQWorker:
             "timestamp": time.time()
         }
 
+        if ai_result.get("candidates"):
+            result["ai_result"]["candidates"] = ai_result["candidates"]
+
+        pagination = self._pagination(ai_result, query, matches)
+        if pagination is not None:
+            result["pagination"] = pagination
+
         if db_error:
             result["db_error"] = db_error
             result["partial"] = True
 
         return result
 
+    def _unified_result(self, task_id: str, query: str, start_time: float) -> Optional[Dict[str, Any]]:
+        """Результат общего поиска, когда тип не определён; None — ничего не найдено"""
+        matches = self._search_unified(query)
+        if not matches:
+            return None
+
+        logger.info("Тип не определён, общий поиск нашёл %s совпадений", len(matches))
+        final_result = self._prepare_final_result(query, {
+            "component_type": None,
+            "extracted_data": {},
+            "confidence": 0.0,
+            "success": False,
+        }, matches)
+        final_result["resolved_by"] = "unified"
+        self._save_to_cache(query, final_result)
+        self._update_task_status(task_id, 'completed', final_result)
+        return ProcessingResult(
+            task_id=task_id,
+            status='completed',
+            query=query,
+            result=final_result,
+            processing_time=time.time() - start_time
+        ).to_dict()
+
     def _update_task_status(self, task_id: str, status: str, data: Dict[str, Any]):
         """Обновление статуса задачи в кэше"""
         if self._cache_service is None:
             return
 
         try:
-            self.cache.set_task_status(task_id, status, data)
-            logger.debug(f"Статус задачи {task_id} обновлен: {status}")
+            with timing.stage("status_update"):
+                self.cache.set_task_status(task_id, status, data)
+            logger.debug("Статус задачи %s обновлен: %s", task_id, status)
         except Exception as e:
-            logger.warning(f"Не удалось обновить статус задачи {task_id}: {e}")
+            logger.warning("Не удалось обновить статус задачи %s: %s", task_id, e)
+
+    def _process_batch_message(
+            self,
+            task_id: str,
+            query: str,
+            metadata: Dict[str, Any],
+            start_time: float
+    ) -> Dict[str, Any]:
+        """
+        Обработка пакета уже разделённых строк (импорт заказа).
+
+        Args:
+            task_id: Идентификатор задачи
+            query: Текст пакета
+            metadata: Метаданные сообщения (lines, quantities, import_id, chunk_index)
+            start_time: Время начала обработки
+
+        Returns:
+            Dict: Результат обработки
+        """
+        lines = metadata['lines']
+        quantities = metadata.get('quantities') or [None] * len(lines)
+
+        logger.info("Обработка пакета импорта из %s строк", len(lines))
+        with timing.stage("ai"):
+            ai_result = self.ai.process_batch(query, lines=lines)
+
+        if not ai_result.get("success", False):
+            error_msg = f"AI обработка не удалась: {ai_result.get('error', 'неизвестная ошибка')}"
+            logger.error(error_msg)
+            self._update_task_status(task_id, 'error', {"error": error_msg})
+            return ProcessingResult(
+                task_id=task_id,
+                status='error',
+                query=query,
+                error=error_msg,
+                processing_time=time.time() - start_time
+            ).to_dict()
+
+        items = []
+        for line, quantity, line_result in zip(lines, quantities, ai_result.get("results", [])):
+            item = {
+                "query": line,
+                "quantity": quantity if quantity is not None else line_result.get("quantity"),
+            }
+            if line_result.get("success"):
+                matches = self._search_database(line_result, line)
+                item.update({
+                    "component_type": line_result.get("component_type"),
+                    "extracted_data": line_result.get("extracted_data", {}),
+                    "matches": matches,
+                    "match_count": len(matches),
+                })
+            else:
+                item["error"] = line_result.get("error")
+            items.append(item)
+
+        processed = sum(1 for item in items if "error" not in item)
+        final_result = {
+            "query": query,
+            "batch": True,
+            "import_id": metadata.get("import_id"),
+            "chunk_index": metadata.get("chunk_index"),
+            "items": items,
+            "total_items": len(items),
+            "processed_items": processed,
+            "timestamp": time.time()
+        }
+
+        # Неудачные строки не повторяем всем пакетом — возвращаем частичный результат
+        status = 'completed' if processed == len(items) else 'partial'
+        error = None if status == 'completed' else f"Обработано {processed} из {len(items)} строк"
+        self._update_task_status(task_id, status, final_result)
+
+        processing_time = time.time() - start_time
+        logger.info("Пакет обработан за %.2f секунд: %s/%s", processing_time, processed, len(items))
+
+        return ProcessingResult(
+            task_id=task_id,
+            status=status,
+            query=query,
+            result=final_result,
+            error=error,
+            partial=status == 'partial',
+            processing_time=processing_time
+        ).to_dict()
 
     def process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Обработка сообщения с замером этапов и записью в журнал запросов.
+
+        Args:
+            message: Входящее сообщение из RabbitMQ
+
+        Returns:
+            Dict: Результат обработки
+        """
+        task_id = message.get('task_id', 'unknown') if isinstance(message, dict) else 'unknown'
+        with task_context(task_id), timing.collect() as timings, \
+                tracing.start_span("worker.process_message", task_id=task_id):
+            # Время в очереди — от отправки продюсером до начала обработки
+            sent_at = message.get('timestamp') if isinstance(message, dict) else None
+            if isinstance(sent_at, (int, float)):
+                timing.observe("queue_wait", max(0.0, time.time() - sent_at))
+
+            result = self._process_message(message)
+        TASKS.inc(status=result.get('status') or 'unknown')
+
+        recorder = get_query_recorder()
+        if recorder is not None and isinstance(message, dict):
+            recorder.record_worker(message, result, timings)
+        return result
+
+    def _process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
         Основной метод обработки сообщения.
 
@@ -302,23 +564,14 @@ class RMQWorker:
         task_id = message.get('task_id', 'unknown')
         query = message.get('query', '').strip()
 
-        # Создаем контекст для логгирования
-        old_factory = logging.getLogRecordFactory()
-
-        def record_factory(*args, **kwargs):
-            record = old_factory(*args, **kwargs)
-            record.task_id = task_id
-            return record
-
-        logging.setLogRecordFactory(record_factory)
-
         try:
-            logger.info(f"Начало обработки задачи")
+            logger.info("Начало обработки задачи")
 
             # 1. Валидация сообщения
             validation_error = self._validate_message(message)
             if validation_error:
                 error_msg = f"Ошибка валидации: {validation_error}"
+                FAILURES.inc(failure_class="validation")
                 logger.error(error_msg)
 
                 result = ProcessingResult(
@@ -333,10 +586,15 @@ class RMQWorker:
                     self._update_task_status(task_id, 'error', {"error": error_msg})
                 return result.to_dict()
 
+            # Пакет строк из импорта Excel/CSV — отдельный путь без кэша запроса
+            metadata = message.get('metadata') or {}
+            if metadata.get('lines'):
+                return self._process_batch_message(task_id, query, metadata, start_time)
+
             # 2. Проверка кэша
             cached_result = self._get_cached_result(query)
             if cached_result:
-                logger.info(f"Результат найден в кэше")
+                logger.info("Результат найден в кэше")
 
                 result = ProcessingResult(
                     task_id=task_id,
@@ -351,11 +609,49 @@ class RMQWorker:
                     self._update_task_status(task_id, 'completed', cached_result)
                 return result.to_dict()
 
-            # 3. Обработка AI
-            logger.info(f"Отправка запроса к AI сервису...")
+            # 3. Точный артикул — без AI
+            article_matches = self._lookup_article(query)
+            if article_matches:
+                logger.info("Найден компонент по артикулу")
+                final_result = self._prepare_final_result(query, {
+                    "component_type": article_matches[0].get("component_type"),
+                    "extracted_data": {},
+                    "confidence": 1.0,
+                    "success": True,
+                }, article_matches)
+                final_result["resolved_by"] = "article"
+                self._save_to_cache(query, final_result)
+                self._update_task_status(task_id, 'completed', final_result)
+                return ProcessingResult(
+                    task_id=task_id,
+                    status='completed',
+                    query=query,
+                    result=final_result,
+                    processing_time=time.time() - start_time
+                ).to_dict()
+
+            # 4. Обработка AI
+            logger.info("Отправка запроса к AI сервису...")
             try:
                 ai_result = self._process_ai_query(query)
-                logger.info(f"AI обработка завершена: {ai_result.get('component_type')}")
+                logger.info("AI обработка завершена: %s", ai_result.get('component_type'))
+
+            except ValueError:
+                # Тип не определён — ответ общим поиском без повторных запросов к AI
+                unified_result = self._unified_result(task_id, query, start_time)
+                if unified_result is not None:
+                    return unified_result
+                error_msg = "AI обработка не удалась: AI не смог определить тип компонента"
+                logger.error(error_msg)
+                if self._cache_service:
+                    self._update_task_status(task_id, 'error', {"error": error_msg})
+                return ProcessingResult(
+                    task_id=task_id,
+                    status='error',
+                    query=query,
+                    error=error_msg,
+                    processing_time=time.time() - start_time
+                ).to_dict()
 
             except Exception as e:
                 error_msg = f"AI обработка не удалась: {str(e)}"
@@ -373,39 +669,39 @@ class RMQWorker:
                     self._update_task_status(task_id, 'error', {"error": error_msg})
                 return result.to_dict()
 
-            # 4. Поиск в БД
+            # 5. Поиск в БД
             db_error = None
             try:
                 matches = self._search_database(ai_result, query)
-                logger.info(f"Найдено {len(matches)} совпадений в БД")
+                logger.info("Найдено %s совпадений в БД", len(matches))
 
             except Exception as e:
                 db_error = f"Ошибка поиска в БД: {str(e)}"
                 matches = []
                 logger.error(db_error)
 
-            # 5. Подготовка результата
+            # 6. Подготовка результата
             final_result = self._prepare_final_result(query, ai_result, matches, db_error)
 
-            # 6. Сохранение в кэш (только если нет ошибки БД)
+            # 7. Сохранение в кэш (только если нет ошибки БД)
             if db_error is None:
                 self._save_to_cache(query, final_result)
 
-            # 7. Определение статуса результата
+            # 8. Определение статуса результата
             status = 'completed'
             partial = False
 
             if db_error and self.enable_partial_results:
                 status = 'partial'
                 partial = True
-                logger.warning(f"Частичный результат из-за ошибки БД: {db_error}")
+                logger.warning("Частичный результат из-за ошибки БД: %s", db_error)
 
-            # 8. Обновление статуса задачи
+            # 9. Обновление статуса задачи
             self._update_task_status(task_id, status, final_result)
 
-            # 9. Возврат результата
+            # 10. Возврат результата
             processing_time = time.time() - start_time
-            logger.info(f"Обработка завершена за {processing_time:.2f} секунд")
+            logger.info("Обработка завершена за %.2f секунд", processing_time)
 
             result = ProcessingResult(
                 task_id=task_id,
@@ -420,7 +716,8 @@ class RMQWorker:
 
         except Exception as e:
             error_msg = f"Неожиданная ошибка: {str(e)}"
-            logger.exception(f"Неожиданная ошибка обработки: {e}")
+            FAILURES.inc(failure_class="unexpected")
+            logger.exception("Неожиданная ошибка обработки: %s", e)
 
             result = ProcessingResult(
                 task_id=task_id,
@@ -438,10 +735,6 @@ class RMQWorker:
 
             return result.to_dict()
 
-        finally:
-            # Восстанавливаем factory по умолчанию
-            logging.setLogRecordFactory(old_factory)
-
     def health_check(self) -> Dict[str, Any]:
         """
         Проверка здоровья worker'а и его зависимостей.
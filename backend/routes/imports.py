@@ -0,0 +1,87 @@
+from flask import Blueprint, request
+import uuid
+import logging
+
+from hydro_find.tabular import is_supported
+from ..services.import_service import OrderImportService
+from ..utils.responses import SuccessResponse, ErrorResponse
+from .search import get_cache_service, get_producer
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+import_bp = Blueprint('imports', __name__)
+
+
+@import_bp.route('/import', methods=['POST'])
+def import_order():
+    """Потоковый импорт заказа из Excel/CSV"""
+    try:
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return ErrorResponse("Требуется файл в поле 'file'", 400).to_response()
+
+        if not is_supported(upload.filename):
+            return ErrorResponse(
+                message="Неподдерживаемый формат файла",
+                status_code=400,
+                details={"filename": upload.filename, "supported": ["xlsx", "csv"]}
+            ).to_response()
+
+        import_id = str(uuid.uuid4())
+        chunk_size = request.form.get('chunk_size', 50, type=int)
+
+        service = OrderImportService(
+            producer=get_producer(),
+            cache_service=get_cache_service(),
+            chunk_size=max(1, min(chunk_size, 500))
+        )
+
+        logger.info("Импорт файла", extra={'import_id': import_id, 'upload_filename': upload.filename})
+        summary = service.import_file(upload.stream, upload.filename, import_id=import_id)
+
+        if summary["status"] == "error":
+            return ErrorResponse(
+                message="Не удалось импортировать ни одной строки",
+                status_code=422,
+                request_id=import_id,
+                details=summary
+            ).to_response()
+
+        return SuccessResponse({
+            **summary,
+            "check_status_url": f"/api/import/{import_id}"
+        }, request_id=import_id).to_response()
+
+    except ValueError as e:
+        return ErrorResponse(f"Ошибка чтения файла: {e}", 400).to_response()
+    except Exception as e:
+        logger.exception("Ошибка импорта файла: %s", e)
+        return ErrorResponse(
+            message="Ошибка импорта файла",
+            status_code=500,
+            details={"error": str(e)}
+        ).to_response()
+
+
+@import_bp.route('/import/<import_id>', methods=['GET'])
+def get_import_status(import_id):
+    """Получение прогресса импорта"""
+    try:
+        uuid.UUID(import_id)
+    except ValueError:
+        return ErrorResponse(
+            message="Некорректный идентификатор импорта",
+            status_code=400,
+            details={"import_id": import_id}
+        ).to_response()
+
+    status = get_cache_service().get_import_status(import_id)
+    if not status:
+        return ErrorResponse(
+            message=f"Импорт {import_id} не найден",
+            status_code=404,
+            details={"import_id": import_id}
+        ).to_response()
+
+    return SuccessResponse(status, request_id=import_id).to_response()
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+
+from hydro_find.instrumentation.metrics import CONTENT_TYPE, REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Метрики процесса API в текстовом формате Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
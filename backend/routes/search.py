@@ -4,8 +4,16 @@ import uuid
 import logging
 from typing import Dict, Any
 
+from hydro_find.database.adapter_graph import parse_port
+from hydro_find.instrumentation import timing, tracing
+from hydro_find.instrumentation.metrics import CACHE_REQUESTS, FAILURES, FAST_PATH
+
 from ..services.cache_service import CacheService
+from ..services.db_service import get_db_service
+from ..services.fast_path import get_fast_path
+from ..services.query_log import get_query_recorder
 from ..messaging.producer import RMQProducer
+from ..messaging.queues import PRIORITY_INTERACTIVE, clamp_priority
 from ..utils.responses import SuccessResponse, ErrorResponse
 
 # Настройка логирования
@@ -43,6 +51,40 @@ def get_producer() -> RMQProducer:
 @search_bp.route('/', methods=['POST'])
 def search():
     """Обработка поискового запроса"""
+    # Трассировка начинается здесь (или продолжает traceparent клиента)
+    with timing.collect(), tracing.start_span(
+            "POST /api/", kind="server", parent=tracing.extract(request.headers)
+    ):
+        return _search()
+
+
+def _record_query(task_id: str, query: str, cached: bool):
+    """Запись запроса с таймингами этапов в журнал (если включён)"""
+    recorder = get_query_recorder()
+    timings = timing.current()
+    if recorder is not None and timings is not None:
+        recorder.record_api(task_id, query, timings, cached)
+
+
+def _fast_path_response(task_id: str, query: str, query_hash: str, resolved: Dict[str, Any],
+                        cache_service: CacheService):
+    """Ответ быстрого пути: результат сразу в ответе POST, задача сразу завершена"""
+    cache_service.cache_search_result(query_hash, resolved["matches"])
+    cache_service.set_task_status(task_id, "completed", resolved)
+    logger.info("Запрос обработан без очереди (%s)", resolved.get("resolved_by"), extra={'task_id': task_id})
+    _record_query(task_id, query, cached=False)
+    return SuccessResponse({
+        "task_id": task_id,
+        "status": "completed",
+        "source": "fast_path",
+        "resolved_by": resolved.get("resolved_by"),
+        "matches": resolved["matches"],
+        "result": resolved,
+        "cached": False
+    }, request_id=task_id).to_response()
+
+
+def _search():
     try:
         data = request.get_json()
         if not data:
@@ -54,11 +96,14 @@ def search():
 
         # Генерация идентификаторов
         task_id = str(uuid.uuid4())
+        span = tracing.current_span()
+        if span is not None:
+            span.set_attribute("task_id", task_id)
 
         # Используем SHA256 вместо MD5 для безопасности
         query_hash = hashlib.sha256(query.encode()).hexdigest()
 
-        logger.info(f"Обработка запроса", extra={
+        logger.info("Обработка запроса", extra={
             'task_id': task_id,
             'query_length': len(query),
             'query_hash': query_hash[:16]  # Только первые 16 символов для логов
@@ -68,9 +113,12 @@ def search():
         cache_service = get_cache_service()
 
         # Проверка кэша
-        cached_result = cache_service.get_cached_search_result(query_hash)
+        with timing.stage("cache_lookup"):
+            cached_result = cache_service.get_cached_search_result(query_hash)
+        CACHE_REQUESTS.inc(layer="api", result="hit" if cached_result else "miss")
         if cached_result:
-            logger.info(f"Результат найден в кэше", extra={'task_id': task_id})
+            logger.info("Результат найден в кэше", extra={'task_id': task_id})
+            _record_query(task_id, query, cached=True)
             return SuccessResponse({
                 "task_id": task_id,
                 "source": "cache",
@@ -78,12 +126,22 @@ def search():
                 "cached": True
             }, request_id=task_id).to_response()
 
+        # Быстрый путь: артикул или запрос, разобранный без AI, — ответ без очереди
+        fast_path = get_fast_path()
+        if fast_path is not None:
+            with timing.stage("fast_path"):
+                resolved = fast_path.resolve(query)
+            FAST_PATH.inc(result="resolved" if resolved else "enqueued")
+            if resolved is not None:
+                return _fast_path_response(task_id, query, query_hash, resolved, cache_service)
+
         # Подготовка сообщения
         message = {
             "task_id": task_id,
             "query": query,
             "quantity": data.get('quantity', 1),
-            "priority": data.get('priority', 5)
+            # Одиночные запросы идут в интерактивной полосе приоритета
+            "priority": clamp_priority(data.get('priority', PRIORITY_INTERACTIVE), PRIORITY_INTERACTIVE)
         }
 
         # Добавляем опциональные поля
@@ -95,10 +153,12 @@ def search():
         # Отправка задачи в RabbitMQ
         try:
             producer = get_producer()
-            success = producer.send_message(message)
+            with timing.stage("enqueue"):
+                success = producer.send_message(message)
 
             if not success:
-                logger.error(f"Не удалось отправить сообщение в RabbitMQ", extra={'task_id': task_id})
+                FAILURES.inc(failure_class="enqueue")
+                logger.error("Не удалось отправить сообщение в RabbitMQ", extra={'task_id': task_id})
                 return ErrorResponse(
                     message="Не удалось создать задачу обработки",
                     status_code=500,
@@ -106,7 +166,8 @@ def search():
                 ).to_response()
 
         except Exception as e:
-            logger.exception(f"Ошибка при отправке в RabbitMQ: {e}", extra={'task_id': task_id})
+            FAILURES.inc(failure_class="enqueue")
+            logger.exception("Ошибка при отправке в RabbitMQ: %s", e, extra={'task_id': task_id})
             return ErrorResponse(
                 message=f"Ошибка создания задачи: {str(e)}",
                 status_code=500,
@@ -119,7 +180,8 @@ def search():
             "created_at": task_id  # Используем timestamp из UUID
         })
 
-        logger.info(f"Задача создана", extra={'task_id': task_id})
+        logger.info("Задача создана", extra={'task_id': task_id})
+        _record_query(task_id, query, cached=False)
 
         return SuccessResponse({
             "task_id": task_id,
@@ -129,7 +191,7 @@ def search():
         }, request_id=task_id).to_response()
 
     except Exception as e:
-        logger.exception(f"Неожиданная ошибка в обработчике поиска: {e}")
+        logger.exception("Неожиданная ошибка в обработчике поиска: %s", e)
         return ErrorResponse(
             message="Внутренняя ошибка сервера",
             status_code=500,
@@ -155,7 +217,7 @@ def get_task_status(task_id):
         task_status = cache_service.get_task_status(task_id)
 
         if not task_status:
-            logger.warning(f"Задача не найдена", extra={'task_id': task_id})
+            logger.warning("Задача не найдена", extra={'task_id': task_id})
             return ErrorResponse(
                 message=f"Задача {task_id} не найдена",
                 status_code=404,
@@ -165,7 +227,7 @@ def get_task_status(task_id):
                 }
             ).to_response()
 
-        logger.debug(f"Статус задачи получен", extra={
+        logger.debug("Статус задачи получен", extra={
             'task_id': task_id,
             'status': task_status.get('status')
         })
@@ -184,7 +246,7 @@ def get_task_status(task_id):
         return SuccessResponse(response_data, request_id=task_id).to_response()
 
     except Exception as e:
-        logger.exception(f"Ошибка при получении статуса задачи {task_id}: {e}")
+        logger.exception("Ошибка при получении статуса задачи %s: %s", task_id, e)
         return ErrorResponse(
             message="Ошибка при получении статуса задачи",
             status_code=500,
@@ -192,6 +254,195 @@ def get_task_status(task_id):
         ).to_response()
 
 
+@search_bp.route('/task/<task_id>/matches', methods=['GET'])
+def get_task_matches(task_id):
+    """Следующие страницы совпадений задачи: ?cursor=<next_cursor>&limit=<n>"""
+    try:
+        uuid.UUID(task_id)
+    except ValueError:
+        return ErrorResponse(
+            message="Некорректный идентификатор задачи",
+            status_code=400,
+            details={"task_id": task_id}
+        ).to_response()
+    cursor = request.args.get('cursor') or None
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return ErrorResponse("Параметр limit должен быть числом", 400).to_response()
+
+    try:
+        task_status = get_cache_service().get_task_status(task_id)
+        if not task_status:
+            return ErrorResponse(
+                message=f"Задача {task_id} не найдена",
+                status_code=404,
+                details={"task_id": task_id}
+            ).to_response()
+
+        result = task_status.get("result") or {}
+        pagination = result.get("pagination")
+        if pagination is None:
+            # Выдача без продолжения (артикул, кандидаты, общий поиск) — одна страница
+            if cursor:
+                return ErrorResponse("У результата задачи нет следующих страниц", 400,
+                                     details={"task_id": task_id}).to_response()
+            page = {"matches": result.get("matches", []), "next_cursor": None}
+        else:
+            with timing.stage("db_search_page"):
+                page = get_db_service().search_page(pagination["params"], limit, cursor)
+
+        return SuccessResponse({
+            "task_id": task_id,
+            "matches": page["matches"],
+            "match_count": len(page["matches"]),
+            "next_cursor": page["next_cursor"]
+        }, request_id=task_id).to_response()
+
+    except ValueError as e:
+        return ErrorResponse(str(e), 400, details={"task_id": task_id, "cursor": cursor}).to_response()
+    except Exception as e:
+        logger.exception("Ошибка получения совпадений задачи %s: %s", task_id, e)
+        return ErrorResponse(
+            message="Ошибка получения совпадений задачи",
+            status_code=500,
+            details={"task_id": task_id, "error": str(e)}
+        ).to_response()
+
+
+@search_bp.route('/article/<path:article>', methods=['GET'])
+def get_by_article(article):
+    """Компоненты с точным артикулом во всех категориях"""
+    try:
+        article = article.strip()
+        if not article:
+            return ErrorResponse("Артикул не может быть пустым", 400).to_response()
+
+        with timing.stage("article_lookup"):
+            items = get_db_service().find_by_article(article)
+
+        if not items:
+            return ErrorResponse(
+                message=f"Артикул {article} не найден",
+                status_code=404,
+                details={"article": article}
+            ).to_response()
+
+        return SuccessResponse({
+            "article": article,
+            "matches": items,
+            "match_count": len(items)
+        }).to_response()
+
+    except Exception as e:
+        logger.exception("Ошибка поиска по артикулу %s: %s", article, e)
+        return ErrorResponse(
+            message="Ошибка поиска по артикулу",
+            status_code=500,
+            details={"article": article, "error": str(e)}
+        ).to_response()
+
+
+@search_bp.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    """Подсказки по префиксу артикула, названия или s_key"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return ErrorResponse("Параметр q не может быть пустым", 400).to_response()
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return ErrorResponse("Параметр limit должен быть числом", 400).to_response()
+
+    try:
+        index = get_db_service().autocomplete
+        with timing.stage("autocomplete"):
+            suggestions = index.suggest(query, limit)
+
+        return SuccessResponse({
+            "query": query,
+            "suggestions": suggestions,
+            "ready": index.ready
+        }).to_response()
+
+    except Exception as e:
+        logger.exception("Ошибка подсказок для %s: %s", query, e)
+        return ErrorResponse(
+            message="Ошибка получения подсказок",
+            status_code=500,
+            details={"query": query, "error": str(e)}
+        ).to_response()
+
+
+@search_bp.route('/adapters/chain', methods=['GET'])
+def adapter_chain():
+    """Цепочки переходников от одного присоединения к другому: ?from=BSP 1/2&to=JIC 3/4 гайка"""
+    source_text = request.args.get('from', '').strip()
+    target_text = request.args.get('to', '').strip()
+    source, target = parse_port(source_text), parse_port(target_text)
+    if source is None or target is None:
+        return ErrorResponse(
+            message="Укажите присоединения в виде «стандарт резьба [арматура]», например BSP 1/2",
+            status_code=400,
+            details={"from": source_text, "to": target_text}
+        ).to_response()
+    try:
+        max_length = min(int(request.args.get('max_length', 3)), 4)
+        limit = min(int(request.args.get('limit', 5)), 20)
+    except ValueError:
+        return ErrorResponse("Параметры max_length и limit должны быть числами", 400).to_response()
+
+    try:
+        with timing.stage("adapter_chain"):
+            chains = get_db_service().adapters.find_chains(source, target, max(1, max_length), max(1, limit))
+
+        return SuccessResponse({
+            "from": source.label(),
+            "to": target.label(),
+            "chains": chains,
+            "chain_count": len(chains)
+        }).to_response()
+
+    except Exception as e:
+        logger.exception("Ошибка поиска цепочки переходников %s → %s: %s", source_text, target_text, e)
+        return ErrorResponse(
+            message="Ошибка поиска цепочки переходников",
+            status_code=500,
+            details={"from": source_text, "to": target_text, "error": str(e)}
+        ).to_response()
+
+
+@search_bp.route('/facets/<component_type>', methods=['GET'])
+def facets(component_type):
+    """Счётчики по значениям фасетов типа под фильтрами: ?standard=BSP&thread=1/2&thread=3/4"""
+    filters = {name: request.args.getlist(name) for name in request.args}
+    try:
+        with timing.stage("facets"):
+            result = get_db_service().facets.counts(component_type, filters)
+
+        return SuccessResponse({
+            "component_type": component_type,
+            "filters": filters,
+            **result
+        }).to_response()
+
+    except KeyError:
+        return ErrorResponse(
+            message=f"Неизвестный тип компонента: {component_type}",
+            status_code=404,
+            details={"component_type": component_type}
+        ).to_response()
+    except ValueError as e:
+        return ErrorResponse(str(e), 400, details={"filters": filters}).to_response()
+    except Exception as e:
+        logger.exception("Ошибка подсчёта фасетов %s: %s", component_type, e)
+        return ErrorResponse(
+            message="Ошибка подсчёта фасетов",
+            status_code=500,
+            details={"component_type": component_type, "error": str(e)}
+        ).to_response()
+
+
 @search_bp.route('/health', methods=['GET'])
 def health_check():
     """Проверка здоровья поискового сервиса"""
@@ -204,7 +455,7 @@ def health_check():
             cache_service._redis.ping()
             cache_ok = True
         except Exception as e:
-            logger.error(f"Ошибка подключения к Redis: {e}")
+            logger.error("Ошибка подключения к Redis: %s", e)
 
         # Проверяем соединение с RabbitMQ
         rabbitmq_ok = False
@@ -214,7 +465,7 @@ def health_check():
             test_message = producer.create_message("health_check", priority=0)
             rabbitmq_ok = True
         except Exception as e:
-            logger.error(f"Ошибка подключения к RabbitMQ: {e}")
+            logger.error("Ошибка подключения к RabbitMQ: %s", e)
 
         health_status = "healthy" if cache_ok and rabbitmq_ok else "degraded"
 
@@ -228,7 +479,7 @@ def health_check():
         }).to_response()
 
     except Exception as e:
-        logger.exception(f"Ошибка health check: {e}")
+        logger.exception("Ошибка health check: %s", e)
         return ErrorResponse(
             message="Ошибка проверки здоровья",
             status_code=500
@@ -1,5 +1,8 @@
 # backend/services/ai_service.py
 
+import threading
+from typing import Optional
+
 from hydro_find.ai.service import AIProcessingService
 
 class AIService:
@@ -9,5 +12,22 @@ class AIService:
     def process_single(self, query: str) -> dict:
         return self._ai.process_single(query)
 
-    def process_batch(self, text: str) -> dict:
-        return self._ai.process_batch(text)
\ No newline at end of file
+    def process_batch(self, text: str, lines: list = None) -> dict:
+        return self._ai.process_batch(text, lines=lines)
+
+
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """
+    Общий AIService процесса воркера: статистика и хеджирование роутера,
+    rate limiter, учёт токенов и локальный классификатор живут дольше одного сообщения
+    """
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
@@ -5,8 +5,20 @@ import logging
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 
+from hydro_find.database.generation import GENERATION_KEY
+from hydro_find.instrumentation import timing
+
 logger = logging.getLogger(__name__)
 
+# Запись результата поиска с текущим поколением каталога за одно обращение к Redis.
+# ARGV[1] — JSON-объект без поколения: поле generation дописывается перед закрывающей скобкой.
+_CACHE_SEARCH_SCRIPT = """
+local generation = tonumber(redis.call('GET', KEYS[2])) or 0
+local payload = string.sub(ARGV[1], 1, -2) .. ',"generation":' .. string.format('%d', generation) .. '}'
+redis.call('SET', KEYS[1], payload, 'EX', ARGV[2])
+return 1
+"""
+
 
 class CacheService:
     """Сервис кэширования с использованием Redis"""
@@ -48,16 +60,17 @@ class CacheService:
             )
 
             self._redis = redis.Redis(connection_pool=self.connection_pool)
+            self._cache_search = self._redis.register_script(_CACHE_SEARCH_SCRIPT)
 
             # Проверяем подключение
             self._redis.ping()
-            logger.info(f"Успешно подключено к Redis {self.host}:{self.port} (db:{self.db})")
+            logger.info("Успешно подключено к Redis %s:%s (db:%s)", self.host, self.port, self.db)
 
         except redis.exceptions.ConnectionError as e:
-            logger.error(f"Ошибка подключения к Redis {self.host}:{self.port}: {e}")
+            logger.error("Ошибка подключения к Redis %s:%s: %s", self.host, self.port, e)
             raise
         except Exception as e:
-            logger.error(f"Неожиданная ошибка при подключении к Redis: {e}")
+            logger.error("Неожиданная ошибка при подключении к Redis: %s", e)
             raise
 
     def set_task_status(
@@ -88,21 +101,23 @@ class CacheService:
                 "ttl": ttl
             }
 
-            success = self._redis.setex(key, ttl, json.dumps(value))
+            with timing.stage("serialization"):
+                payload = json.dumps(value)
+            success = self._redis.setex(key, ttl, payload)
 
             if success:
-                logger.debug(f"Статус задачи сохранен", extra={
+                logger.debug("Статус задачи сохранен", extra={
                     'task_id': task_id,
                     'status': status,
                     'ttl': ttl
                 })
             else:
-                logger.error(f"Не удалось сохранить статус задачи", extra={'task_id': task_id})
+                logger.error("Не удалось сохранить статус задачи", extra={'task_id': task_id})
 
             return bool(success)
 
         except Exception as e:
-            logger.exception(f"Ошибка сохранения статуса задачи {task_id}: {e}")
+            logger.exception("Ошибка сохранения статуса задачи %s: %s", task_id, e)
             return False
 
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -133,10 +148,10 @@ class CacheService:
             return None
 
         except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON для задачи {task_id}: {e}")
+            logger.error("Ошибка декодирования JSON для задачи %s: %s", task_id, e)
             return None
         except Exception as e:
-            logger.exception(f"Ошибка получения статуса задачи {task_id}: {e}")
+            logger.exception("Ошибка получения статуса задачи %s: %s", task_id, e)
             return None
 
     def cache_search_result(
@@ -146,7 +161,8 @@ class CacheService:
             ttl: int = 600
     ) -> bool:
         """
-        Кэширование результата поиска.
+        Кэширование результата поиска. Результат помечается текущим
+        поколением каталога и перестаёт отдаваться, когда каталог изменится.
 
         Args:
             query_hash: Хэш запроса
@@ -164,21 +180,24 @@ class CacheService:
                 "result_count": len(result)
             }
 
-            success = self._redis.setex(key, ttl, json.dumps(value))
+            with timing.stage("serialization"):
+                payload = json.dumps(value)
+            # Поколение читается в Redis вместе с записью — без отдельного GET перед ней
+            success = self._cache_search(keys=[key, GENERATION_KEY], args=[payload, ttl])
 
             if success:
-                logger.debug(f"Результат поиска закэширован", extra={
+                logger.debug("Результат поиска закэширован", extra={
                     'query_hash': query_hash[:16],  # Только первые 16 символов для логов
                     'result_count': len(result),
                     'ttl': ttl
                 })
             else:
-                logger.warning(f"Не удалось закэшировать результат поиска", extra={'query_hash': query_hash[:16]})
+                logger.warning("Не удалось закэшировать результат поиска", extra={'query_hash': query_hash[:16]})
 
             return bool(success)
 
         except Exception as e:
-            logger.exception(f"Ошибка кэширования результата поиска: {e}")
+            logger.exception("Ошибка кэширования результата поиска: %s", e)
             return False
 
     def get_cached_search_result(self, query_hash: str) -> Optional[List[Dict[str, Any]]]:
@@ -193,10 +212,14 @@ class CacheService:
         """
         try:
             key = f"search:{query_hash}"
-            data = self._redis.get(key)
+            # Запись и поколение каталога — за одно обращение
+            data, generation = self._redis.mget(key, GENERATION_KEY)
 
             if data:
                 cached_data = json.loads(data)
+                if cached_data.get("generation", 0) != int(generation or 0):
+                    logger.debug("Кэш поиска устарел: каталог изменился", extra={'query_hash': query_hash[:16]})
+                    return None
 
                 # Обновляем TTL при чтении
                 remaining_ttl = self._redis.ttl(key)
@@ -204,7 +227,7 @@ class CacheService:
                     new_ttl = min(600, remaining_ttl + 60)  # Добавляем 1 минуту, но не более 10 минут
                     self._redis.expire(key, new_ttl)
 
-                logger.debug(f"Кэш попадание для запроса", extra={
+                logger.debug("Кэш попадание для запроса", extra={
                     'query_hash': query_hash[:16],
                     'result_count': cached_data.get('result_count', 0)
                 })
@@ -213,13 +236,55 @@ class CacheService:
             return None
 
         except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON для кэша поиска {query_hash[:16]}: {e}")
+            logger.error("Ошибка декодирования JSON для кэша поиска %s: %s", query_hash[:16], e)
             return None
         except Exception as e:
-            logger.exception(f"Ошибка получения кэшированного результата: {e}")
+            logger.exception("Ошибка получения кэшированного результата: %s", e)
             return None
 
 
+    def set_import_status(self, import_id: str, data: Dict[str, Any], ttl: int = 86400) -> bool:
+        """
+        Сохранение прогресса импорта Excel/CSV.
+
+        Args:
+            import_id: Идентификатор импорта
+            data: Сводка импорта
+            ttl: Время жизни в секундах
+
+        Returns:
+            bool: Успешность операции
+        """
+        try:
+            key = f"excel:{import_id}"
+            value = {**data, "updated_at": datetime.now().isoformat()}
+            return bool(self._redis.setex(key, ttl, json.dumps(value)))
+
+        except Exception as e:
+            logger.exception("Ошибка сохранения статуса импорта %s: %s", import_id, e)
+            return False
+
+    def get_import_status(self, import_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение прогресса импорта Excel/CSV.
+
+        Args:
+            import_id: Идентификатор импорта
+
+        Returns:
+            Optional[Dict]: Сводка импорта
+        """
+        try:
+            data = self._redis.get(f"excel:{import_id}")
+            return json.loads(data) if data else None
+
+        except json.JSONDecodeError as e:
+            logger.error("Ошибка декодирования JSON для импорта %s: %s", import_id, e)
+            return None
+        except Exception as e:
+            logger.exception("Ошибка получения статуса импорта %s: %s", import_id, e)
+            return None
+
     def delete_task(self, task_id: str) -> bool:
         """
         Удаление задачи из кэша.
@@ -238,7 +303,7 @@ class CacheService:
             ]
 
             deleted_count = self._redis.delete(*keys)
-            logger.info(f"Задача удалена из кэша", extra={
+            logger.info("Задача удалена из кэша", extra={
                 'task_id': task_id,
                 'deleted_keys': deleted_count
             })
@@ -246,7 +311,7 @@ class CacheService:
             return deleted_count > 0
 
         except Exception as e:
-            logger.exception(f"Ошибка удаления задачи {task_id} из кэша: {e}")
+            logger.exception("Ошибка удаления задачи %s из кэша: %s", task_id, e)
             return False
 
     def cleanup_old_tasks(self, pattern: str = "task:*", batch_size: int = 100) -> int:
@@ -289,12 +354,12 @@ class CacheService:
                     break
 
             if deleted_count > 0:
-                logger.info(f"Очищено старых задач: {deleted_count}")
+                logger.info("Очищено старых задач: %s", deleted_count)
 
             return deleted_count
 
         except Exception as e:
-            logger.exception(f"Ошибка очистки старых задач: {e}")
+            logger.exception("Ошибка очистки старых задач: %s", e)
             return 0
 
     def health_check(self) -> Dict[str, Any]:
@@ -320,7 +385,7 @@ class CacheService:
             }
 
         except Exception as e:
-            logger.error(f"Ошибка health check Redis: {e}")
+            logger.error("Ошибка health check Redis: %s", e)
             return {
                 "status": "unhealthy",
                 "error": str(e)
@@ -332,7 +397,7 @@ class CacheService:
             self.connection_pool.disconnect()
             logger.info("Соединения Redis закрыты")
         except Exception as e:
-            logger.error(f"Ошибка закрытия соединений Redis: {e}")
+            logger.error("Ошибка закрытия соединений Redis: %s", e)
 
     def __del__(self):
         """Деструктор"""
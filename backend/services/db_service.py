@@ -1,12 +1,184 @@
 # backend/services/db_service.py
 
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from hydro_find.instrumentation import timing
+from hydro_find.database.adapter_graph import AdapterGraph
+from hydro_find.database.article_index import ArticleIndex
+from hydro_find.database.autocomplete import AutocompleteIndex
 from hydro_find.database.connection import DatabaseConnection
-from hydro_find.database.repository import ComponentRepository
+from hydro_find.database.facets import FacetIndex
+from hydro_find.database.generation import CatalogGeneration
+from hydro_find.database.repository import MAX_PAGE_SIZE, ComponentRepository, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def get_page_size() -> int:
+    """Число совпадений на странице результата (SEARCH_PAGE_SIZE)"""
+    try:
+        return max(1, min(int(os.getenv("SEARCH_PAGE_SIZE", 10)), MAX_PAGE_SIZE))
+    except ValueError:
+        return 10
+
+
+def pagination_for(params: dict, matches: list) -> dict:
+    """
+    Продолжение выдачи первой страницы поиска по одному типу: параметры
+    поиска и курсор (когда страница заполнена целиком).
+    """
+    next_cursor = None
+    if matches and len(matches) >= get_page_size():
+        last = matches[-1]
+        if isinstance(last.get("score"), int) and "id" in last:
+            next_cursor = encode_cursor(last["score"], last["id"])
+    return {"params": params, "next_cursor": next_cursor}
+
 
 class DBService:
     def __init__(self):
         self._db = DatabaseConnection()
+        try:
+            self._db.upgrade_schema()
+        except Exception as e:
+            # Без updated_at запросы к компонентам падают — причина должна быть видна сразу
+            logger.error("Не удалось обновить схему БД: %s", e)
         self._repo = ComponentRepository(self._db)
+        self._articles = ArticleIndex(self._repo, ttl=float(os.getenv("ARTICLE_INDEX_TTL", 300)))
+        self._autocomplete = AutocompleteIndex(
+            self._repo,
+            ttl=float(os.getenv("AUTOCOMPLETE_TTL", 3600)),
+            refresh_interval=float(os.getenv("AUTOCOMPLETE_REFRESH_INTERVAL", 60)),
+        )
+        self._adapters = AdapterGraph(self._repo, ttl=float(os.getenv("ADAPTER_GRAPH_TTL", 600)))
+        self._facets = FacetIndex(self._repo, ttl=float(os.getenv("FACETS_TTL", 600)))
+        # Поиск по нескольким типам одновременно — каждый запрос в своей сессии из пула
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("DB_SEARCH_CONCURRENCY", 4)), thread_name_prefix="db-search"
+        )
+        # Поколение каталога: синхронизация и массовая загрузка увеличивают его в Redis
+        self._generation = CatalogGeneration()
+        self._generation_seen: Optional[int] = None
+        self._generation_checked = 0.0
+        self._generation_interval = float(os.getenv("CATALOG_CHECK_INTERVAL", 5))
+
+    @property
+    def repository(self) -> ComponentRepository:
+        return self._repo
+
+    @property
+    def articles(self) -> ArticleIndex:
+        self.check_catalog()
+        return self._articles
+
+    @property
+    def autocomplete(self) -> AutocompleteIndex:
+        self.check_catalog()
+        return self._autocomplete
+
+    @property
+    def adapters(self) -> AdapterGraph:
+        self.check_catalog()
+        return self._adapters
+
+    @property
+    def facets(self) -> FacetIndex:
+        self.check_catalog()
+        return self._facets
+
+    def check_catalog(self) -> bool:
+        """
+        Сброс индексов в памяти, если поколение каталога изменилось.
+        Поколение читается не чаще раза в CATALOG_CHECK_INTERVAL секунд.
+
+        Returns:
+            bool: Индексы сброшены
+        """
+        now = time.monotonic()
+        if now - self._generation_checked < self._generation_interval:
+            return False
+        self._generation_checked = now
+        generation = self._generation.current()
+        previous, self._generation_seen = self._generation_seen, generation
+        if previous is None or generation == previous:
+            return False
+        logger.info("Каталог изменился (поколение %s → %s), индексы перестраиваются", previous, generation)
+        self.invalidate_indexes()
+        return True
+
+    def invalidate_indexes(self):
+        """Перестроить индексы после изменения каталога; до перестроения отвечают прежние"""
+        if self._articles.ready:
+            self._articles.refresh_async()
+        if self._autocomplete.ready:
+            self._autocomplete.refresh_async(full=True)
+        self._adapters.invalidate()
+        self._facets.invalidate()
+
+    def warm_up(self):
+        """Фоновая загрузка индексов при старте процесса"""
+        self._articles.refresh_async()
+        self._autocomplete.refresh_async(full=True)
 
     def search_by_ai_params(self, params: dict) -> list:
-        return self._repo.search(params)
\ No newline at end of file
+        return self._repo.search(params, get_page_size())
+
+    def search_page(self, params: dict, limit: Optional[int] = None, cursor: Optional[str] = None) -> dict:
+        """Страница поиска по параметрам: {"matches", "next_cursor"}"""
+        matches, next_cursor = self._repo.search_page(params, limit or get_page_size(), cursor)
+        return {"matches": matches, "next_cursor": next_cursor}
+
+    def search_candidates(self, candidates: List[Tuple[dict, float]], limit: int = 10) -> list:
+        """
+        Одновременный поиск по нескольким типам с общим ранжированием.
+
+        Args:
+            candidates: (параметры поиска с component_type, оценка типа)
+            limit: Число результатов после слияния
+
+        Returns:
+            Компоненты с полями component_type, relevance (оценка совпадения с
+            текстом запроса из БД) и score = оценка типа × (1 + relevance) / (1 + лучшая relevance).
+            Слова запроса у всех кандидатов одни, поэтому relevance сравнима между типами:
+            точное совпадение менее вероятного типа обходит слабое совпадение более вероятного.
+        """
+        futures = [self._executor.submit(timing.bind(self._repo.search), params, limit)
+                   for params, _ in candidates]
+        merged = []
+        for (params, type_score), future in zip(candidates, futures):
+            for item in future.result():
+                item["component_type"] = params["component_type"]
+                item["relevance"] = item.get("score", 0)
+                merged.append((type_score, item))
+        best = max((item["relevance"] for _, item in merged), default=0)
+        for type_score, item in merged:
+            item["score"] = round(type_score * (1 + item["relevance"]) / (1 + best), 4)
+        # Сортировка устойчива: при равной оценке первым остаётся более вероятный тип и порядок выдачи БД
+        matches = [item for _, item in merged]
+        matches.sort(key=lambda item: item["score"], reverse=True)
+        return matches[:limit]
+
+    def search_all(self, query: str, limit: int = 10) -> list:
+        return self._repo.search_all(query, limit)
+
+    def find_by_article(self, article: str) -> list:
+        return self.articles.find(article)
+
+
+_db_service: Optional[DBService] = None
+_db_service_lock = threading.Lock()
+
+
+def get_db_service() -> DBService:
+    """Общий DBService процесса API (одно подключение, индексы артикулов и подсказок)"""
+    global _db_service
+    if _db_service is None:
+        with _db_service_lock:
+            if _db_service is None:
+                _db_service = DBService()
+    return _db_service
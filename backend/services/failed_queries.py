@@ -0,0 +1,201 @@
+# backend/services/failed_queries.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.utils.logging_setup import current_task_id
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlRotatingWriter:
+    """
+    Запись JSONL с ротацией по размеру: path → path.1 → ... → path.N.
+    Файл пишет только один процесс: размер проверяется по своему дескриптору,
+    и после ротации другим процессом запись ушла бы в переименованный файл.
+    Воркеры супервизора пишут каждый в свой файл (process_path).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        self.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, records: List[Dict[str, Any]]):
+        if self._file is None:
+            self._open()
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RedisStreamWriter:
+    """Запись в Redis stream (XADD) с ограничением длины"""
+
+    def __init__(self, client, stream: str = "failed_queries", maxlen: int = 100000):
+        self.client = client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def write(self, records: List[Dict[str, Any]]):
+        pipe = self.client.pipeline(transaction=False)
+        for record in records:
+            pipe.xadd(self.stream, {"data": json.dumps(record, ensure_ascii=False, default=str)},
+                      maxlen=self.maxlen, approximate=True)
+        pipe.execute()
+
+    def close(self):
+        pass
+
+
+class FailedQuerySink:
+    """
+    Неудачные и неуверенно классифицированные запросы — примеры для обучения
+    классификатора (python -m hydro_find.ai.classifier train). Запись идёт
+    пачками в фоновом потоке: обработка сообщения только кладёт запись в очередь.
+    """
+
+    def __init__(self, writer, batch_size: int = 100, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="failed-query-sink", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, query: str, **fields):
+        """
+        Поставить запись в очередь (не блокирует; при переполнении запись теряется).
+
+        Args:
+            kind: unclassified, low_confidence, ...
+            query: Исходный запрос
+            **fields: error, component_type, local_label, local_confidence, ...
+        """
+        record = {"ts": time.time(), "kind": kind, "task_id": current_task_id(), "query": query, **fields}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if record is None:
+                    self._flush(batch)
+                    self.writer.close()
+                    return
+                batch.append(record)
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            self.writer.write(batch)
+        except Exception as e:
+            logger.error("Не удалось сохранить %s неудачных запросов: %s", len(batch), e)
+
+    def close(self, timeout: float = 5.0):
+        """Дописать очередь и закрыть запись"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_sink: Optional[FailedQuerySink] = None
+_sink_lock = threading.Lock()
+
+
+def process_path(path: str) -> str:
+    """
+    Путь файла этого процесса: воркер супервизора (WORKER_SLOT) получает свой
+    файл — logs/failed_queries.jsonl → logs/failed_queries.2.jsonl. Номер слота
+    не повторяется среди работающих процессов и сохраняется после перезапуска.
+    """
+    slot = os.getenv("WORKER_SLOT")
+    if not slot:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{slot}{ext}"
+
+
+def _create_writer():
+    kind = os.getenv("FAILED_QUERY_SINK", "file").lower()
+    if kind == "off":
+        return None
+    if kind == "redis":
+        import redis
+
+        # Соединение устанавливается при первой записи — в фоновом потоке
+        client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)))
+        return RedisStreamWriter(
+            client,
+            stream=os.getenv("FAILED_QUERY_STREAM", "failed_queries"),
+            maxlen=int(os.getenv("FAILED_QUERY_STREAM_MAXLEN", 100000)),
+        )
+    return JsonlRotatingWriter(
+        process_path(os.getenv("FAILED_QUERY_PATH", "logs/failed_queries.jsonl")),
+        max_bytes=int(os.getenv("FAILED_QUERY_MAX_BYTES", 10 * 1024 * 1024)),
+        backups=int(os.getenv("FAILED_QUERY_BACKUPS", 5)),
+    )
+
+
+def get_failed_query_sink() -> Optional[FailedQuerySink]:
+    """Общий приёмник неудачных запросов (FAILED_QUERY_SINK: file, redis или off)"""
+    global _sink
+    if _sink is not None:
+        return _sink
+    with _sink_lock:
+        if _sink is None:
+            try:
+                writer = _create_writer()
+            except Exception as e:
+                logger.error("Не удалось создать приёмник неудачных запросов: %s", e)
+                return None
+            if writer is None:
+                return None
+            _sink = FailedQuerySink(writer)
+            atexit.register(_sink.close)
+    return _sink
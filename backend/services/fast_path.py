@@ -0,0 +1,189 @@
+# backend/services/fast_path.py
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.services.db_service import get_db_service, get_page_size, pagination_for
+from hydro_find.ai.local_parser import parse_query
+from hydro_find.database.connection import statement_timeout
+from hydro_find.database.enums import parse_thread
+from hydro_find.instrumentation import timing
+
+logger = logging.getLogger(__name__)
+
+# Артикул — одно «слово» с цифрой: DKOL-12, 10.0402, AB1234
+_ARTICLE_RE = re.compile(r"^(?=.*\d)[\w\-./]{3,40}$")
+
+
+class FastPathBusy(Exception):
+    """Все места пула быстрого пути заняты — запрос идёт в очередь"""
+
+
+def looks_like_article(query: str) -> bool:
+    text = query.strip()
+    return bool(_ARTICLE_RE.match(text)) and parse_thread(text) is None
+
+
+class FastPathResolver:
+    """
+    Ответ на запрос без очереди и AI, если он укладывается в бюджет времени:
+    точный артикул или запрос, полностью разобранный по словарям перечислений.
+    None — запрос нужно отправить в очередь.
+    """
+
+    def __init__(self, repository, budget_ms: float = 150.0, classify: Optional[Callable] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, articles=None, max_pending: int = 8):
+        """
+        Args:
+            repository: ComponentRepository (search, find_by_article_any)
+            budget_ms: Бюджет на весь путь, мс
+            classify: Локальная классификация запроса → тип или None (когда в запросе нет ключевого слова)
+            executor: Пул для запросов к БД (ожидание ограничено остатком бюджета)
+            articles: Поиск по артикулу (ArticleIndex); по умолчанию — repository
+            max_pending: Запросов к БД в пуле (выполняются и ждут потока); сверх — сразу в очередь
+        """
+        self.repository = repository
+        self.articles = articles if articles is not None else repository
+        self.budget = budget_ms / 1000
+        self.classify = classify
+        self._executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="fast-path")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _call(self, deadline: float, fn, *args):
+        """
+        Запрос к БД с ожиданием не дольше остатка бюджета.
+
+        Raises:
+            TimeoutError: Бюджет исчерпан
+            FastPathBusy: Пул занят медленными запросами
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FutureTimeout()
+        # Очередь пула не растёт: когда БД тормозит, новые запросы не копятся за зависшими
+        if not self._slots.acquire(blocking=False):
+            raise FastPathBusy()
+
+        def run():
+            # Ответ после бюджета не нужен — PostgreSQL прервёт запрос сам
+            with statement_timeout(math.ceil(remaining * 1000)):
+                return fn(*args)
+
+        future = self._executor.submit(timing.bind(run))
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeout:
+            # Ещё не начатый запрос снимается с очереди пула
+            future.cancel()
+            raise
+
+    @staticmethod
+    def _result(query: str, matches: List[Dict[str, Any]], component_type: Optional[str],
+                extracted: Dict[str, Any], resolved_by: str, quantity: Optional[int] = None) -> Dict[str, Any]:
+        """Результат в формате воркера (_prepare_final_result)"""
+        return {
+            "query": query,
+            "source": "database",
+            "resolved_by": resolved_by,
+            "matches": matches,
+            "match_count": len(matches),
+            "ai_result": {
+                "component_type": component_type,
+                "extracted_data": extracted,
+                "quantity": quantity,
+                "confidence": 1.0,
+                "success": True,
+            },
+            "timestamp": time.time(),
+        }
+
+    def resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + self.budget
+        try:
+            if looks_like_article(query):
+                with timing.stage("fast_path.article"):
+                    item = self._call(deadline, self.articles.find_by_article_any, query.strip())
+                if item is not None:
+                    return self._result(query, [item], item.get("component_type"), {}, "article")
+
+            with timing.stage("fast_path.parse"):
+                parsed = parse_query(query)
+                if parsed.component_type is None and self.classify is not None:
+                    component_type = self.classify(query)
+                    if component_type:
+                        parsed = parse_query(query, component_type)
+            if not parsed.complete:
+                return None
+
+            params, search_params = parsed.validated()
+            if not search_params:
+                return None
+            search_params = {"component_type": parsed.component_type, "original_query": query, **search_params}
+            with timing.stage("fast_path.db_search"):
+                matches = self._call(deadline, self.repository.search, search_params, get_page_size())
+            if not matches:
+                # Пустой результат отдаём AI: он может понять запрос иначе
+                return None
+            result = self._result(query, matches, parsed.component_type, params, "local_parser", parsed.quantity)
+            result["pagination"] = pagination_for(search_params, matches)
+            return result
+
+        except FutureTimeout:
+            logger.debug("Быстрый путь не уложился в %.0f мс", self.budget * 1000)
+            return None
+        except FastPathBusy:
+            logger.debug("Быстрый путь занят, запрос отправлен в очередь")
+            return None
+        except Exception as e:
+            logger.warning("Ошибка быстрого пути: %s", e)
+            return None
+
+
+_resolver: Optional[FastPathResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_fast_path() -> Optional[FastPathResolver]:
+    """Быстрый путь с бюджетом FAST_PATH_BUDGET_MS (0 — выключен) и FAST_PATH_MAX_PENDING запросами к БД"""
+    global _resolver
+    try:
+        budget_ms = float(os.getenv("FAST_PATH_BUDGET_MS", "150"))
+    except ValueError:
+        budget_ms = 150.0
+    if budget_ms <= 0:
+        return None
+    try:
+        max_pending = max(1, int(os.getenv("FAST_PATH_MAX_PENDING", "8")))
+    except ValueError:
+        max_pending = 8
+    if _resolver is not None:
+        return _resolver
+
+    with _resolver_lock:
+        if _resolver is None:
+            from hydro_find.ai.classifier import load_classifier
+            from hydro_find.ai.models.ai_models import get_local_classifier_threshold
+
+            classifier = load_classifier()
+            threshold = get_local_classifier_threshold()
+
+            def classify(query: str) -> Optional[str]:
+                label, confidence = classifier.predict(query)
+                return label if confidence >= threshold else None
+
+            db_service = get_db_service()
+            _resolver = FastPathResolver(
+                db_service.repository, budget_ms,
+                classify=classify if classifier is not None else None,
+                articles=db_service.articles,
+                max_pending=max_pending,
+            )
+            logger.info("Быстрый путь включён, бюджет %.0f мс", budget_ms)
+    return _resolver
@@ -0,0 +1,266 @@
+# backend/services/import_service.py
+
+import hashlib
+import logging
+import re
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from hydro_find.tabular import iter_rows, cell_to_str, find_column
+from backend.messaging.queues import PRIORITY_BULK
+
+logger = logging.getLogger(__name__)
+
+# Возможные заголовки колонок в файлах заказов
+QUERY_COLUMNS = ["наименование", "название", "номенклатура", "запрос", "позиция", "query", "name", "item"]
+ARTICLE_COLUMNS = ["артикул", "арт.", "article", "sku"]
+QUANTITY_COLUMNS = ["количество", "кол-во", "кол.", "qty", "quantity"]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_QUANTITY_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _merge_quantity(first: Optional[int], second: Optional[int]) -> int:
+    """Сумма количеств повторяющейся строки (без количества — одна штука)"""
+    return (first or 1) + (second or 1)
+
+
+class OrderLineParser:
+    """Преобразование строк таблицы в строки заказа"""
+
+    def __init__(self):
+        self._query_col: Optional[int] = None
+        self._article_col: Optional[int] = None
+        self._quantity_col: Optional[int] = None
+        self._header_checked = False
+
+    def _detect_header(self, row: List[Any]) -> bool:
+        """Определение колонок по заголовку. True если строка — заголовок"""
+        self._header_checked = True
+        self._query_col = find_column(row, QUERY_COLUMNS)
+        self._article_col = find_column(row, ARTICLE_COLUMNS)
+        self._quantity_col = find_column(row, QUANTITY_COLUMNS)
+        return any(col is not None for col in (self._query_col, self._article_col, self._quantity_col))
+
+    def parse(self, row: List[Any]) -> Optional[Tuple[str, Optional[int]]]:
+        """
+        Разбор строки таблицы.
+
+        Returns:
+            Optional[Tuple[str, Optional[int]]]: (текст строки, количество) или None для пустых строк/заголовка
+
+        Raises:
+            ValueError: Дробное количество ("1.5") — штучный товар не делится
+        """
+        if not self._header_checked and self._detect_header(row):
+            return None
+
+        cells = [cell_to_str(value) for value in row]
+        quantity = None
+
+        if self._query_col is not None or self._article_col is not None:
+            parts = [
+                cells[col] for col in (self._article_col, self._query_col)
+                if col is not None and col < len(cells) and cells[col]
+            ]
+        else:
+            # Без заголовка — склеиваем все непустые ячейки
+            parts = [cell for i, cell in enumerate(cells) if cell and i != self._quantity_col]
+
+        if self._quantity_col is not None and self._quantity_col < len(cells):
+            # Число в начале ячейки: "5", "5 шт", "5,0"
+            match = _QUANTITY_RE.search(cells[self._quantity_col])
+            if match:
+                value = float(match.group().replace(",", "."))
+                if not value.is_integer():
+                    raise ValueError(f"Дробное количество: {cells[self._quantity_col]}")
+                quantity = int(value)
+
+        line = _WHITESPACE_RE.sub(" ", " ".join(parts)).strip()
+        if not line:
+            return None
+        return line, quantity
+
+
+class OrderImportService:
+    """Потоковый импорт заказов из Excel/CSV в пакетный конвейер"""
+
+    def __init__(
+            self,
+            producer,
+            cache_service=None,
+            chunk_size: int = 50,
+            priority: int = PRIORITY_BULK
+    ):
+        """
+        Инициализация сервиса импорта.
+
+        Args:
+            producer: RMQProducer для отправки пакетов
+            cache_service: CacheService для статуса импорта (опционально)
+            chunk_size: Количество уникальных строк в одном пакете
+            priority: Приоритет сообщений импорта
+        """
+        self.producer = producer
+        self.cache_service = cache_service
+        self.chunk_size = chunk_size
+        self.priority = priority
+
+    @staticmethod
+    def _line_key(line: str) -> bytes:
+        """Ключ дедупликации (digest вместо строки — память не растёт с длиной строк)"""
+        return hashlib.blake2b(line.casefold().encode(), digest_size=16).digest()
+
+    def iter_chunks(self, stream: BinaryIO, filename: str, stats: Dict[str, Any]) -> Iterator[List[Tuple[str, Optional[int]]]]:
+        """
+        Потоковое чтение файла пакетами уникальных строк.
+
+        Args:
+            stream: Бинарный поток файла
+            filename: Имя файла
+            stats: Словарь для накопления счётчиков (rows, duplicates, unique, invalid_quantity)
+                и поправок количества (quantity_adjustments)
+
+        Повтор строки складывает количества. Если строка уже ушла в отправленном
+        пакете, добавка суммируется в stats["quantity_adjustments"]: ключ строки → [строка, количество].
+        """
+        parser = OrderLineParser()
+        seen = set()
+        # Ключ строки → позиция в ещё не отправленном пакете
+        pending: Dict[bytes, int] = {}
+        chunk: List[Tuple[str, Optional[int]]] = []
+
+        for row in iter_rows(stream, filename):
+            stats["rows"] += 1
+            try:
+                parsed = parser.parse(row)
+            except ValueError as e:
+                stats["invalid_quantity"] += 1
+                logger.warning("Строка %s пропущена: %s", stats["rows"], e)
+                continue
+            if parsed is None:
+                continue
+
+            key = self._line_key(parsed[0])
+            if key in seen:
+                stats["duplicates"] += 1
+                if key in pending:
+                    line, quantity = chunk[pending[key]]
+                    chunk[pending[key]] = (line, _merge_quantity(quantity, parsed[1]))
+                else:
+                    adjustment = stats["quantity_adjustments"].setdefault(key, [parsed[0], 0])
+                    adjustment[1] += parsed[1] or 1
+                continue
+            seen.add(key)
+            stats["unique"] += 1
+
+            pending[key] = len(chunk)
+            chunk.append(parsed)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+                pending = {}
+
+        if chunk:
+            yield chunk
+
+    def _send_chunk(self, import_id: str, index: int, chunk: List[Tuple[str, Optional[int]]]) -> Optional[str]:
+        """Отправка одного пакета строк в очередь"""
+        task_id = str(uuid.uuid4())
+        lines = [line for line, _ in chunk]
+        message = {
+            "task_id": task_id,
+            "query": "\n".join(lines),
+            "priority": self.priority,
+            "metadata": {
+                "import_id": import_id,
+                "chunk_index": index,
+                "lines": lines,
+                "quantities": [qty for _, qty in chunk],
+            }
+        }
+
+        if not self.producer.send_message(message):
+            logger.error("Не удалось отправить пакет %s импорта %s", index, import_id)
+            return None
+
+        if self.cache_service:
+            self.cache_service.set_task_status(task_id, "processing", {
+                "query": message["query"],
+                "import_id": import_id,
+                "chunk_index": index
+            })
+        return task_id
+
+    def import_file(self, stream: BinaryIO, filename: str, import_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Импорт файла заказа: пакеты отправляются по мере чтения строк.
+
+        Args:
+            stream: Бинарный поток файла
+            filename: Имя файла
+            import_id: Идентификатор импорта (генерируется если не указан)
+
+        Returns:
+            Dict: Сводка импорта
+        """
+        import_id = import_id or str(uuid.uuid4())
+        start_time = time.time()
+        stats = {"rows": 0, "duplicates": 0, "unique": 0, "invalid_quantity": 0, "quantity_adjustments": {}}
+        task_ids: List[str] = []
+        failed_chunks = 0
+        first_enqueue_time = None
+
+        for index, chunk in enumerate(self.iter_chunks(stream, filename, stats)):
+            task_id = self._send_chunk(import_id, index, chunk)
+            if task_id is None:
+                failed_chunks += 1
+                continue
+
+            task_ids.append(task_id)
+            if first_enqueue_time is None:
+                first_enqueue_time = time.time() - start_time
+            # Промежуточный статус без списка задач — размер записи не растёт с файлом
+            self._save_status(import_id, "processing", filename, stats, [], failed_chunks,
+                              chunks_enqueued=len(task_ids))
+
+        summary = self._save_status(
+            import_id, "queued" if task_ids else "error", filename, stats, task_ids, failed_chunks
+        )
+        summary["processing_time"] = time.time() - start_time
+        summary["time_to_first_enqueue"] = first_enqueue_time
+
+        logger.info(
+            "Импорт %s завершён: строк %s, уникальных %s, пакетов %s за %.2f секунд",
+            import_id, stats["rows"], stats["unique"], len(task_ids), summary["processing_time"]
+        )
+        return summary
+
+    def _save_status(self, import_id: str, status: str, filename: str, stats: Dict[str, Any],
+                     task_ids: List[str], failed_chunks: int,
+                     chunks_enqueued: Optional[int] = None) -> Dict[str, Any]:
+        """Сохранение прогресса импорта"""
+        data = {
+            "import_id": import_id,
+            "status": status,
+            "filename": filename,
+            "rows_read": stats["rows"],
+            "unique_lines": stats["unique"],
+            "duplicate_lines": stats["duplicates"],
+            "invalid_quantity_lines": stats["invalid_quantity"],
+            "chunks_enqueued": len(task_ids) if chunks_enqueued is None else chunks_enqueued,
+            "chunks_failed": failed_chunks,
+            "task_ids": task_ids,
+        }
+        adjustments = stats["quantity_adjustments"]
+        if chunks_enqueued is None:
+            # Повторы строк из уже отправленных пакетов: количество к добавлению (только в итоговой сводке)
+            data["quantity_adjustments"] = [
+                {"line": line, "quantity": quantity} for line, quantity in adjustments.values()
+            ]
+        else:
+            data["quantity_adjustment_lines"] = len(adjustments)
+        if self.cache_service:
+            self.cache_service.set_import_status(import_id, data)
+        return data
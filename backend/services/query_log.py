@@ -0,0 +1,109 @@
+# backend/services/query_log.py
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from hydro_find.instrumentation import StageTimings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    Журнал запросов в JSONL: по записи на запрос API (source=api) и на
+    обработанное воркером сообщение (source=worker) с таймингами этапов и
+    ответами AI. Записи одной задачи связываются по task_id; журнал
+    воркера — вход для backend.benchmark.replay.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                if self._file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as e:
+                logger.error("Ошибка записи журнала запросов %s: %s", self.path, e)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record_api(self, task_id: str, query: str, timings: StageTimings, cached: bool):
+        """Запрос к API: поиск в кэше и постановка в очередь"""
+        if not self._sampled():
+            return
+        self._write({
+            "source": "api",
+            "ts": timings.started,
+            "task_id": task_id,
+            "query": query,
+            "cached": cached,
+            **timings.to_dict(),
+            "total_ms": round((time.time() - timings.started) * 1000, 2),
+        })
+
+    def record_worker(self, message: Dict[str, Any], result: Dict[str, Any], timings: StageTimings):
+        """Обработанное воркером сообщение: этапы, вызовы AI и итог"""
+        if not self._sampled():
+            return
+        outcome = result.get("result") or {}
+        ai_result = outcome.get("ai_result") or {}
+        self._write({
+            "source": "worker",
+            "ts": timings.started,
+            "task_id": message.get("task_id"),
+            "query": message.get("query"),
+            "priority": message.get("priority"),
+            "metadata": message.get("metadata") or {},
+            "status": result.get("status"),
+            "cached": result.get("cached", False),
+            "error": result.get("error"),
+            "component_type": ai_result.get("component_type"),
+            "match_count": outcome.get("match_count"),
+            **timings.to_dict(),
+            "total_ms": round((result.get("processing_time") or 0) * 1000, 2),
+            "llm_calls": timings.calls,
+        })
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_recorder: Optional[QueryRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_query_recorder() -> Optional[QueryRecorder]:
+    """Журнал запросов из QUERY_LOG_PATH (None — журнал выключен)"""
+    global _recorder
+    path = os.getenv("QUERY_LOG_PATH")
+    if not path:
+        return None
+    with _recorder_lock:
+        if _recorder is None or _recorder.path != path:
+            try:
+                sample_rate = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+            except ValueError:
+                sample_rate = 1.0
+            _recorder = QueryRecorder(path, sample_rate)
+            logger.info("Журнал запросов: %s (доля записи %s)", path, sample_rate)
+    return _recorder
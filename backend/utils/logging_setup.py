@@ -0,0 +1,104 @@
+# backend/utils/logging_setup.py
+"""
+Настройка логирования процессов API и воркера.
+
+Контекст задачи (task_id) хранится в contextvars и добавляется в записи
+одним фильтром на обработчиках — без подмены LogRecordFactory на каждое
+сообщение. Контекст локален для потока/задачи и переносится в пулы через
+hydro_find.instrumentation.bind.
+
+    LOG_LEVEL=INFO LOG_FORMAT=json python run_worker.py
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from hydro_find.instrumentation import tracing
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(task_id)s] %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_NO_TASK = "-"
+
+_task_id: ContextVar[str] = ContextVar("task_id", default=_NO_TASK)
+
+# Поля LogRecord, которые не переносятся в JSON как extra
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "task_id", "trace_id"}
+
+
+@contextmanager
+def task_context(task_id: Optional[str]):
+    """Все записи журнала внутри блока (и в привязанных потоках) получают task_id"""
+    token = _task_id.set(task_id or _NO_TASK)
+    try:
+        yield
+    finally:
+        _task_id.reset(token)
+
+
+def current_task_id() -> str:
+    return _task_id.get()
+
+
+class TaskContextFilter(logging.Filter):
+    """Добавляет task_id и trace_id текущего контекста в запись"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Явно переданный extra={'task_id': ...} имеет приоритет
+        if not hasattr(record, "task_id"):
+            record.task_id = _task_id.get()
+        span = tracing.current_span()
+        record.trace_id = span.context.trace_id if span is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной JSON-строкой; сообщение форматируется только при выводе"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "task_id": getattr(record, "task_id", _NO_TASK),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            data["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """
+    Корневой обработчик с фильтром контекста задачи.
+
+    Args:
+        level: Уровень (по умолчанию LOG_LEVEL или INFO)
+        fmt: text или json (по умолчанию LOG_FORMAT или text)
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    handler.addFilter(TaskContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
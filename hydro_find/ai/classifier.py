@@ -0,0 +1,329 @@
+# hydro_find/ai/classifier.py
+
+import json
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from hydro_find.ai.models.ai_models import get_local_classifier_path
+from hydro_find.prompts import ComponentType
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-zа-яё0-9/\.\-]+")
+_SPACES_RE = re.compile(r"\s+")
+
+_FORMAT_VERSION = 1
+
+
+def _normalize(text: str) -> str:
+    return _SPACES_RE.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+class NgramClassifier:
+    """
+    Локальный классификатор типа компонента: символьные n-граммы + слова,
+    TF-IDF и мультиклассовая логистическая регрессия. Работает на CPU без
+    внешних зависимостей, модель хранится в JSON.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 4), min_df: int = 2):
+        self.ngram_range = ngram_range
+        self.min_df = min_df
+        self.labels: List[str] = []
+        self.idf: Dict[str, float] = {}
+        self.weights: Dict[str, List[float]] = {}
+        self.bias: List[float] = []
+
+    def _terms(self, text: str) -> Counter:
+        text = _normalize(text)
+        terms = Counter(f"w:{word}" for word in _WORD_RE.findall(text))
+        padded = f" {text} "
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                terms[padded[i:i + n]] += 1
+        return terms
+
+    def _features(self, text: str) -> Dict[str, float]:
+        """TF-IDF вектор (сублинейный tf, L2-нормировка) по словарю модели"""
+        vector = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in self._terms(text).items() if term in self.idf
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        if norm:
+            vector = {term: v / norm for term, v in vector.items()}
+        return vector
+
+    def _scores(self, features: Dict[str, float]) -> List[float]:
+        scores = list(self.bias)
+        for term, value in features.items():
+            row = self.weights.get(term)
+            if row:
+                for k, weight in enumerate(row):
+                    scores[k] += weight * value
+        return scores
+
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def fit(self, texts: List[str], labels: List[str], epochs: int = 15,
+            learning_rate: float = 0.5, l2: float = 1e-5, seed: int = 42) -> "NgramClassifier":
+        """
+        Обучение SGD на примерах (запрос, тип компонента).
+
+        Args:
+            texts: Запросы
+            labels: Итоговые типы компонентов
+            epochs: Число проходов по данным
+            learning_rate: Начальный шаг (уменьшается по эпохам)
+            l2: L2-регуляризация
+            seed: Зерно перемешивания
+        """
+        if not texts or len(texts) != len(labels):
+            raise ValueError("Нужны непустые и одинаковые по длине списки запросов и меток")
+
+        self.labels = sorted(set(labels))
+        label_index = {label: k for k, label in enumerate(self.labels)}
+
+        # Словарь и IDF
+        term_counts = [self._terms(text) for text in texts]
+        df = Counter(term for counts in term_counts for term in counts)
+        total = len(texts)
+        self.idf = {
+            term: math.log((1 + total) / (1 + count)) + 1
+            for term, count in df.items() if count >= self.min_df
+        }
+
+        samples = [(self._features(text), label_index[label]) for text, label in zip(texts, labels)]
+        n_labels = len(self.labels)
+        self.weights = defaultdict(lambda: [0.0] * n_labels)
+        self.bias = [0.0] * n_labels
+
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(samples)
+            rate = learning_rate / (1 + epoch * 0.5)
+            for features, target in samples:
+                probs = self._softmax(self._scores(features))
+                for k in range(n_labels):
+                    gradient = probs[k] - (1.0 if k == target else 0.0)
+                    self.bias[k] -= rate * gradient
+                    for term, value in features.items():
+                        row = self.weights[term]
+                        row[k] -= rate * (gradient * value + l2 * row[k])
+
+        self.weights = dict(self.weights)
+        return self
+
+    def predict_proba(self, text: str) -> List[Tuple[str, float]]:
+        """Типы компонентов с вероятностями, по убыванию"""
+        if not self.labels:
+            return []
+        probs = self._softmax(self._scores(self._features(text)))
+        return sorted(zip(self.labels, probs), key=lambda item: item[1], reverse=True)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Наиболее вероятный тип и уверенность"""
+        ranked = self.predict_proba(text)
+        if not ranked:
+            return None, 0.0
+        return ranked[0]
+
+    def save(self, path) -> None:
+        data = {
+            "version": _FORMAT_VERSION,
+            "ngram_range": list(self.ngram_range),
+            "min_df": self.min_df,
+            "labels": self.labels,
+            "bias": [round(b, 6) for b in self.bias],
+            "idf": {term: round(v, 6) for term, v in self.idf.items()},
+            # Нулевые веса (термины без вклада) не сохраняем
+            "weights": {
+                term: [round(w, 6) for w in row]
+                for term, row in self.weights.items() if any(abs(w) > 1e-6 for w in row)
+            },
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path) -> "NgramClassifier":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия модели: {data.get('version')}")
+        model = cls(ngram_range=tuple(data["ngram_range"]), min_df=data["min_df"])
+        model.labels = data["labels"]
+        model.bias = data["bias"]
+        model.idf = data["idf"]
+        model.weights = data["weights"]
+        return model
+
+
+def load_classifier(path: Optional[str] = None) -> Optional[NgramClassifier]:
+    """Загрузка обученной модели (LOCAL_CLASSIFIER_PATH); None, если модели нет"""
+    path = Path(path or get_local_classifier_path())
+    if not path.exists():
+        logger.info("Локальный классификатор не найден (%s), классификация через AI", path)
+        return None
+    try:
+        model = NgramClassifier.load(path)
+        logger.info("Локальный классификатор загружен: %s, типов: %s", path, len(model.labels))
+        return model
+    except Exception as e:
+        logger.error("Ошибка загрузки локального классификатора %s: %s", path, e)
+        return None
+
+
+def load_examples(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Примеры из JSONL: запрос (query или original_query) и итоговый тип (component_type).
+    Записи неуспешной обработки и с неизвестным типом пропускаются.
+    """
+    allowed = {t.value for t in ComponentType}
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or record.get("success") is False:
+                continue
+            query = record.get("query") or record.get("original_query")
+            label = record.get("component_type")
+            if query and label in allowed:
+                texts.append(str(query))
+                labels.append(label)
+    return texts, labels
+
+
+def _split(texts: List[str], labels: List[str], holdout: float, seed: int = 42):
+    indices = list(range(len(texts)))
+    random.Random(seed).shuffle(indices)
+    cut = int(len(indices) * (1 - holdout))
+    pick = lambda part: ([texts[i] for i in part], [labels[i] for i in part])
+    return pick(indices[:cut]), pick(indices[cut:])
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _evaluate(predict, texts: Iterable[str], labels: Iterable[str]) -> Dict[str, float]:
+    correct, total, latencies = 0, 0, []
+    for text, label in zip(texts, labels):
+        start = time.perf_counter()
+        predicted = predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += predicted == label
+        total += 1
+    return {
+        "accuracy": round(correct / total, 4) if total else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.5), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "count": total,
+    }
+
+
+def benchmark(model: NgramClassifier, texts: List[str], labels: List[str],
+              threshold: float, llm_classify=None) -> Dict[str, Dict[str, float]]:
+    """
+    Точность и задержка: локальная модель, локальная модель с порогом
+    (доля запросов, ушедших бы в AI) и, если передан llm_classify, путь через AI.
+    """
+    report = {"local": _evaluate(lambda text: model.predict(text)[0], texts, labels)}
+
+    confident = [(text, label) for text, label in zip(texts, labels) if model.predict(text)[1] >= threshold]
+    report["local_confident"] = _evaluate(
+        lambda text: model.predict(text)[0], [t for t, _ in confident], [l for _, l in confident]
+    )
+    report["local_confident"]["coverage"] = round(len(confident) / len(texts), 4) if texts else 0.0
+
+    if llm_classify is not None:
+        report["llm"] = _evaluate(llm_classify, texts, labels)
+    return report
+
+
+def main():
+    """CLI: обучение и оценка локального классификатора"""
+    import argparse
+
+    from hydro_find.ai.models.ai_models import get_local_classifier_threshold
+
+    parser = argparse.ArgumentParser(description='Локальный классификатор типа компонента')
+    parser.add_argument('--model', default=None, help='Файл модели (по умолчанию LOCAL_CLASSIFIER_PATH)')
+    subparsers = parser.add_subparsers(dest='command', help='Команды')
+
+    train_parser = subparsers.add_parser('train', help='Обучить модель на JSONL (query, component_type)')
+    train_parser.add_argument('data', help='JSONL с запросами и итоговыми типами')
+    train_parser.add_argument('--holdout', type=float, default=0.2, help='Доля примеров для проверки')
+    train_parser.add_argument('--epochs', type=int, default=15, help='Число эпох')
+
+    bench_parser = subparsers.add_parser('bench', help='Точность и задержка модели на JSONL')
+    bench_parser.add_argument('data', help='JSONL с запросами и итоговыми типами')
+    bench_parser.add_argument('--threshold', type=float, default=None, help='Порог уверенности')
+    bench_parser.add_argument('--llm', action='store_true', help='Сравнить с классификацией через AI')
+    bench_parser.add_argument('--limit', type=int, default=None, help='Ограничить число примеров')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    model_path = args.model or get_local_classifier_path()
+
+    if args.command == 'train':
+        texts, labels = load_examples(args.data)
+        if not texts:
+            print("❌ Нет примеров для обучения")
+            return
+        (train_x, train_y), (test_x, test_y) = _split(texts, labels, args.holdout)
+        start = time.perf_counter()
+        model = NgramClassifier().fit(train_x, train_y, epochs=args.epochs)
+        print(f"Обучено на {len(train_x)} примерах за {time.perf_counter() - start:.1f} с, типы: {model.labels}")
+        if test_x:
+            print(f"Проверка на {len(test_x)} примерах: {_evaluate(lambda t: model.predict(t)[0], test_x, test_y)}")
+        # Итоговая модель — на всех данных
+        model = NgramClassifier().fit(texts, labels, epochs=args.epochs)
+        model.save(model_path)
+        print(f"✅ Модель сохранена: {model_path}")
+
+    elif args.command == 'bench':
+        model = load_classifier(model_path)
+        if model is None:
+            print(f"❌ Модель не найдена: {model_path}")
+            return
+        texts, labels = load_examples(args.data)
+        if args.limit:
+            texts, labels = texts[:args.limit], labels[:args.limit]
+
+        llm_classify = None
+        if args.llm:
+            from hydro_find.ai.service import AIProcessingService
+            llm_classify = AIProcessingService()._classify_llm
+
+        threshold = args.threshold if args.threshold is not None else get_local_classifier_threshold()
+        report = benchmark(model, texts, labels, threshold, llm_classify)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,352 @@
+import hashlib
 import json
 import logging
+import time
 from typing import Optional, Dict, Any
 from openai import OpenAI
-from openai._exceptions import APIConnectionError, APIError, RateLimitError
-from hydro_find.ai.models.ai_models import get_api_key, get_default_model, get_timeout
+from openai._exceptions import APIConnectionError, APIError, APIStatusError, BadRequestError, RateLimitError
+from hydro_find.ai.models.ai_models import (
+    get_api_key, get_default_model, get_timeout, get_max_retries, get_max_concurrency,
+    get_max_tokens, get_task_max_tokens, get_task_models, is_routing_enabled, is_streaming_enabled,
+    is_structured_output_enabled, is_prompt_cache_control_enabled
+)
+from hydro_find.ai.rate_limiter import RateLimitTimeout, create_rate_limiter, parse_retry_after
+from hydro_find.ai.router import ModelRouter, RequestCancelled, current_cancel_token
+from hydro_find.ai.streaming import terminator_for
+from hydro_find.ai.usage import TokenUsageTracker
+from hydro_find.instrumentation import timing, tracing
+from hydro_find.instrumentation.metrics import FAILURES, RETRIES
+from hydro_find.prompts.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
 
+_USE_DEFAULT = object()
+
+
+def prompt_fingerprint(system_prompt: str) -> str:
+    """Короткий отпечаток системного промпта (ключ записанных ответов при replay)"""
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
 class OpenRouterClient:
-    def __init__(self):
+    def __init__(self, rate_limiter=_USE_DEFAULT, router=_USE_DEFAULT):
         self.api_key = get_api_key()
-        self.model = get_default_model()
+        self.model = get_default_model() or get_task_models("extract")[0]
         self.timeout = get_timeout()
+        self.max_retries = get_max_retries()
+        # Общий token bucket + AIMD конкурентность (None — без ограничений)
+        self.rate_limiter = create_rate_limiter() if rate_limiter is _USE_DEFAULT else rate_limiter
+        # Выбор модели по задаче с hedging/failover (None — всегда self.model)
+        if router is _USE_DEFAULT:
+            router = ModelRouter(max_workers=get_max_concurrency() * 2) if is_routing_enabled() else None
+        self.router = router
+        # Модели, отклонившие response_format: для них схема передаётся только в промпте
+        self._no_structured_output = set()
+        # Расход токенов по задачам
+        self.usage = TokenUsageTracker()
 
         try:
             self._client = OpenAI(
                 base_url="https://openrouter.ai/api/v1",
                 api_key=self.api_key,
-                max_retries=3,
+                # Повторы выполняем сами, чтобы 429 проходили через rate limiter
+                max_retries=0,
                 timeout=self.timeout,
                 default_headers={
                     "HTTP-Referer": "http://localhost:3000",  # Исправленный заголовок
                     "X-Title": "Hydro-Search APP"
                 }
             )
-            logger.info(f"OpenRouter клиент инициализирован с моделью: {self.model}")
+            logger.info("OpenRouter клиент инициализирован с моделью: %s", self.model)
         except Exception as e:
-            logger.error(f"Ошибка инициализации OpenRouter клиента: {e}")
+            logger.error("Ошибка инициализации OpenRouter клиента: %s", e)
+            raise
+
+    @staticmethod
+    def _backoff(seconds: float, cancel=None):
+        """Пауза перед повтором; отменённый запрос не ждёт"""
+        if cancel is None:
+            time.sleep(seconds)
+        elif cancel.wait(seconds):
+            raise RequestCancelled()
+
+    def _create_completion(self, cancel=None, **kwargs):
+        """
+        Запрос к API с rate limiter и повторами при 429, 5xx и ошибках подключения.
+        cancel — CancelToken роутера: отменённый запрос не занимает слот и не повторяется.
+
+        Raises:
+            RateLimitError, APIConnectionError, APIStatusError: Если попытки исчерпаны
+                (остальные ответы 4xx — сразу)
+            RateLimitTimeout: Если не дождались разрешения rate limiter
+        """
+        for attempt in range(self.max_retries + 1):
+            if cancel is not None and cancel.cancelled:
+                raise RequestCancelled()
+            try:
+                if self.rate_limiter is None:
+                    return self._client.chat.completions.create(**kwargs)
+
+                with self.rate_limiter.slot(self.timeout, cancel):
+                    response = self._client.chat.completions.create(**kwargs)
+                self.rate_limiter.on_success()
+                return response
+
+            except RateLimitError as e:
+                retry_after = parse_retry_after(getattr(e.response, "headers", None))
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_rate_limited(retry_after)
+                if attempt >= self.max_retries:
+                    raise
+                # Пауза всегда: без Retry-After запаса токенов в bucket хватит, чтобы сразу повторить 429
+                self._backoff(retry_after if retry_after is not None else min(30, 2 ** attempt), cancel)
+                RETRIES.inc(kind="llm_rate_limit")
+                logger.info("429 от OpenRouter, повтор %s/%s", attempt + 1, self.max_retries)
+
+            except APIConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                self._backoff(min(30, 2 ** attempt), cancel)
+                RETRIES.inc(kind="llm_connection")
+                logger.info("Ошибка подключения к OpenRouter, повтор %s/%s", attempt + 1, self.max_retries)
+
+            except APIStatusError as e:
+                # 502/503 OpenRouter — временные сбои провайдера
+                if e.status_code < 500 or attempt >= self.max_retries:
+                    raise
+                self._backoff(min(30, 2 ** attempt), cancel)
+                RETRIES.inc(kind="llm_server_error")
+                logger.info("Ответ %s от OpenRouter, повтор %s/%s", e.status_code, attempt + 1, self.max_retries)
+
+    def generate(
+            self,
+            system_prompt: str,
+            user_query: str,
+            task: Optional[str] = None,
+            schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Генерация ответа от AI.
+
+        Args:
+            system_prompt: Системный промпт
+            user_query: Запрос пользователя
+            task: Задача (classify, quantity, split, extract) — модель выбирает роутер
+            schema: JSON-схема ответа для structured output (если модель поддерживает)
+        """
+        start = time.perf_counter()
+        with tracing.start_span(f"llm.{task or 'default'}", task=task or "default") as span:
+            if self.router is not None and task:
+                result, model = self.router.execute(
+                    task, lambda model: self._complete(model, system_prompt, user_query, task, schema)
+                )
+                if model:
+                    logger.debug("Задача %s выполнена моделью %s", task, model)
+            else:
+                model = self.model
+                result = self._complete(model, system_prompt, user_query, task, schema)
+
+            if span is not None:
+                span.set_attribute("model", model or "")
+                span.set_attribute("success", result is not None)
+
+        elapsed = time.perf_counter() - start
+        timing.observe(f"llm.{task or 'default'}", elapsed)
+        timings = timing.current()
+        if timings is not None:
+            timings.add_call(
+                task=task, prompt=prompt_fingerprint(system_prompt), input=user_query,
+                output=result, model=model, ms=round(elapsed * 1000, 2)
+            )
+        return result
+
+    def _response_format(self, model: str, task: Optional[str], schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if schema is None or not is_structured_output_enabled() or model in self._no_structured_output:
+            return None
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": f"{task or 'response'}_params", "strict": True, "schema": schema}
+        }
+
+    def _read_stream(self, stream, terminator, cancel=None) -> Optional[str]:
+        """
+        Чтение потока до первого полного ответа; остаток генерации отменяется.
+
+        Raises:
+            RequestCancelled: Роутер отменил запрос (поток закрыт из другого потока)
+        """
+        parts = []
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelled()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+
+                answer = terminator.feed(delta)
+                if answer is not None:
+                    logger.debug("Ранняя остановка потока после %s фрагментов", len(parts))
+                    return answer
+        except RequestCancelled:
+            raise
+        except Exception:
+            if cancel is not None and cancel.cancelled:
+                raise RequestCancelled()
             raise
+        finally:
+            # Закрытие соединения прекращает генерацию на стороне провайдера
+            stream.close()
+
+        content = "".join(parts).strip()
+        if not content:
+            logger.warning("AI вернул пустой ответ")
+            return None
+        return content
 
-    def generate(self, system_prompt: str, user_query: str) -> Optional[str]:
-        """Генерация ответа от AI"""
+    @staticmethod
+    def _system_message(model: str, system_prompt: str) -> Dict[str, Any]:
+        """
+        Системное сообщение. Системный промпт — стабильный префикс запроса (меняется
+        только сообщение пользователя); провайдерам с явным кэшем отмечаем его cache_control.
+        """
+        if is_prompt_cache_control_enabled() and model.startswith(("anthropic/", "google/gemini")):
+            return {
+                "role": "system",
+                "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+            }
+        return {"role": "system", "content": system_prompt}
+
+    def _record_usage(self, task: Optional[str], system_prompt: str, user_query: str,
+                      answer: Optional[str], usage=None):
+        """Учёт токенов: из usage ответа, а для потока (обрывается раньше usage) — оценкой"""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if isinstance(prompt_tokens, int):
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", 0)
+            completion = getattr(usage, "completion_tokens", 0)
+            self.usage.record(
+                task, prompt_tokens,
+                completion if isinstance(completion, int) else 0,
+                cached if isinstance(cached, int) else 0
+            )
+        else:
+            self.usage.record(
+                task, count_tokens(system_prompt) + count_tokens(user_query), count_tokens(answer or "")
+            )
+
+    def _complete(
+            self,
+            model: str,
+            system_prompt: str,
+            user_query: str,
+            task: Optional[str] = None,
+            schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Один запрос к указанной модели (отдельный спан на каждую попытку роутера)"""
+        with tracing.start_span("openrouter.chat.completions", kind="client",
+                                model=model, task=task or "default") as span:
+            result = self._request(model, system_prompt, user_query, task, schema)
+            if span is not None:
+                span.set_attribute("success", result is not None)
+            return result
+
+    def _request(
+            self,
+            model: str,
+            system_prompt: str,
+            user_query: str,
+            task: Optional[str] = None,
+            schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Запрос к модели с обработкой ошибок API"""
+        cancel = current_cancel_token()
         try:
-            logger.debug(f"Отправка запроса к AI. Модель: {self.model}")
+            logger.debug("Отправка запроса к AI. Модель: %s", model)
 
-            response = self._client.chat.completions.create(
-                model=self.model,
+            terminator = terminator_for(task) if is_streaming_enabled() else None
+            request = dict(
+                model=model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    self._system_message(model, system_prompt),
                     {"role": "user", "content": user_query}
                 ],
                 temperature=0.2,
                 timeout=self.timeout,
-                max_tokens=2000
+                max_tokens=get_task_max_tokens(task) if task else get_max_tokens(),
+                stream=terminator is not None
             )
+            response_format = self._response_format(model, task, schema)
+            if response_format:
+                request["response_format"] = response_format
+
+            try:
+                response = self._create_completion(cancel, **request)
+            except BadRequestError as e:
+                if not response_format:
+                    raise
+                # Провайдер не поддерживает structured output — повторяем без него
+                logger.warning("Модель %s не поддерживает response_format: %s", model, e)
+                self._no_structured_output.add(model)
+                request.pop("response_format")
+                response = self._create_completion(cancel, **request)
+
+            if terminator is not None:
+                if cancel is not None:
+                    # Ответ другой модели закрывает этот поток сразу, не дожидаясь фрагмента
+                    cancel.on_cancel(response.close)
+                answer = self._read_stream(response, terminator, cancel)
+                self._record_usage(task, system_prompt, user_query, answer)
+                return answer
 
             if response.choices and response.choices[0].message.content:
                 content = response.choices[0].message.content.strip()
-                logger.debug(f"Получен ответ от AI, длина: {len(content)} символов")
+                logger.debug("Получен ответ от AI, длина: %s символов", len(content))
+                self._record_usage(task, system_prompt, user_query, content, getattr(response, "usage", None))
                 return content
             else:
                 logger.warning("AI вернул пустой ответ")
                 return None
 
+        except RequestCancelled:
+            logger.debug("Запрос к модели %s отменён: ответила другая модель", model)
+            return None
         except APIConnectionError as e:
-            logger.error(f"Ошибка подключения к OpenRouter API: {e}")
+            FAILURES.inc(failure_class="llm_connection")
+            logger.error("Ошибка подключения к OpenRouter API: %s", e)
             return None
         except RateLimitError as e:
-            logger.error(f"Превышен лимит запросов к OpenRouter: {e}")
+            FAILURES.inc(failure_class="llm_rate_limit")
+            logger.error("Превышен лимит запросов к OpenRouter: %s", e)
+            return None
+        except RateLimitTimeout as e:
+            FAILURES.inc(failure_class="llm_rate_limit_timeout")
+            logger.error("Запрос к OpenRouter не выполнен: %s", e)
             return None
         except APIError as e:
-            logger.error(f"Ошибка API OpenRouter: {e}")
+            FAILURES.inc(failure_class="llm_api")
+            logger.error("Ошибка API OpenRouter: %s", e)
             return None
         except Exception as e:
-            logger.exception(f"Неожиданная ошибка при запросе к AI: {e}")
+            FAILURES.inc(failure_class="llm_unexpected")
+            logger.exception("Неожиданная ошибка при запросе к AI: %s", e)
             return None
 
-    def extract_json(self, system_prompt: str, user_query: str) -> Optional[Dict[str, Any]]:
+    def extract_json(
+            self,
+            system_prompt: str,
+            user_query: str,
+            task: Optional[str] = None,
+            schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """Извлечение JSON из ответа AI"""
         logger.debug("Извлечение JSON из ответа AI")
 
-        text = self.generate(system_prompt, user_query)
+        text = self.generate(system_prompt, user_query, task=task, schema=schema)
         if not text:
             logger.warning("Не удалось получить ответ от AI для извлечения JSON")
             return None
@@ -87,16 +362,16 @@ class OpenRouterClient:
             if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
                 json_str = text[start_idx:end_idx + 1]
                 result = json.loads(json_str)
-                logger.debug(f"JSON успешно извлечен, ключи: {list(result.keys())}")
+                logger.debug("JSON успешно извлечен, ключи: %s", list(result.keys()))
                 return result
             else:
                 # Если нет JSON, возвращаем raw текст
-                logger.warning(f"AI не вернул JSON. Ответ: {text[:100]}...")
+                logger.warning("AI не вернул JSON. Ответ: %s...", text[:100])
                 return {"raw_response": text}
 
         except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON: {e}. Текст: {text[:200]}...")
+            logger.error("Ошибка декодирования JSON: %s. Текст: %s...", e, text[:200])
             return {"raw_response": text}
         except Exception as e:
-            logger.exception(f"Неожиданная ошибка при извлечении JSON: {e}")
+            logger.exception("Неожиданная ошибка при извлечении JSON: %s", e)
             return {"raw_response": text}
\ No newline at end of file
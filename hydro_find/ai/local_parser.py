@@ -0,0 +1,163 @@
+# hydro_find/ai/local_parser.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from hydro_find.ai.schemas import build_response_schema, validate_params
+from hydro_find.database.enums import Standard, parse_angle, parse_series, parse_thread
+from hydro_find.prompts import ComponentType
+
+# Ключевые слова типа компонента (начало слова, после приведения к нижнему регистру)
+_TYPE_STEMS: Tuple[Tuple[str, str], ...] = (
+    ("фитинг", ComponentType.FITTINGS.value),
+    ("адаптер", ComponentType.ADAPTERS.value),
+    ("переходник", ComponentType.ADAPTERS.value),
+    ("заглушк", ComponentType.PLUGS.value),
+    ("тройник", ComponentType.ADAPTER_TEE.value),
+    ("банджо", ComponentType.BANJO.value),
+    ("banjo", ComponentType.BANJO.value),
+    ("брс", ComponentType.BRS.value),
+    ("brs", ComponentType.BRS.value),
+    ("муфт", ComponentType.COUPLING.value),
+)
+
+# Слова, не несущие параметров
+_STOPWORDS = {
+    "с", "со", "и", "на", "под", "для", "в", "-", "—", ",", ";", "резьба", "резьбой", "резьбы",
+    "угол", "угловой", "серия", "серии", "стандарт", "шт", "шт.", "штук", "град", "градусов",
+}
+
+_TOKEN_RE = re.compile(r"""[^\s,;()]+""")
+_DY_RE = re.compile(r"^(?:dy|ду|dn|дн)(\d{1,3})$")
+_QUANTITY_RE = re.compile(r"(\d+)\s*(?:шт\.?|штук)(?=\s|$)")
+_ANGLE_RE = re.compile(r"^(\d{2})(?:°|град\.?)$")
+
+
+@dataclass
+class LocalParse:
+    """Результат разбора запроса без AI"""
+    component_type: Optional[str] = None
+    fields: Dict[str, Any] = field(default_factory=dict)
+    quantity: Optional[int] = None
+    unparsed: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """Тип определён, найдены параметры и в запросе не осталось нераспознанных слов"""
+        return bool(self.component_type and self.fields and not self.unparsed)
+
+    def validated(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(параметры для ответа, типизированные параметры для БД) — как у ответа AI"""
+        return validate_params(self.component_type, self.fields)
+
+
+def _slots(component_type: str, prefix: str) -> List[str]:
+    """Поля схемы под значения одного перечисления: ['standard'] или ['standard_1', 'standard_2', ...]"""
+    schema = build_response_schema(component_type)
+    if schema is None:
+        return []
+    names = schema["properties"]
+    if prefix in names:
+        return [prefix]
+    return sorted(name for name in names if re.fullmatch(rf"{prefix}_\d", name))
+
+
+def _match_type(token: str) -> Optional[str]:
+    for stem, component_type in _TYPE_STEMS:
+        if token.startswith(stem):
+            return component_type
+    return None
+
+
+def parse_query(query: str, component_type: Optional[str] = None) -> LocalParse:
+    """
+    Разбор запроса по словарям перечислений: тип по ключевому слову, стандарт,
+    резьба, арматура, угол, серия, Dy и количество. Голые числа не
+    угадываются (резьба «1» или количество?) — остаются нераспознанными.
+
+    Args:
+        query: Строка запроса
+        component_type: Тип, если уже известен (например, от локального классификатора)
+    """
+    text = query.lower().replace("ё", "е")
+    result = LocalParse(component_type=component_type)
+
+    quantity = _QUANTITY_RE.search(text)
+    if quantity:
+        result.quantity = int(quantity.group(1))
+        text = text[:quantity.start()] + " " + text[quantity.end():]
+
+    values: Dict[str, List[Any]] = {"standard": [], "thread": [], "armature": [], "angle": [], "seria": []}
+    scalars: Dict[str, Any] = {}
+
+    tokens = _TOKEN_RE.findall(text)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        i += 1
+
+        if token in _STOPWORDS:
+            continue
+        detected = _match_type(token)
+        if detected:
+            if result.component_type is None:
+                result.component_type = detected
+            elif result.component_type != detected:
+                result.unparsed.append(token)
+            continue
+        if token.upper() in Standard.__members__:
+            values["standard"].append(token.upper())
+            continue
+        if token.startswith("штуцер"):
+            conical = following.startswith("конус")
+            values["armature"].append("штуцер конусный" if conical else "штуцер")
+            i += conical
+            continue
+        if token.startswith("гайк"):
+            values["armature"].append("гайка")
+            continue
+        dy = _DY_RE.match(token)
+        if dy:
+            scalars["Dy"] = int(dy.group(1))
+            continue
+        angle = _ANGLE_RE.match(token)
+        if angle and parse_angle(angle.group(1)) is not None:
+            values["angle"].append(int(angle.group(1)))
+            continue
+        if token.isdigit() and following.startswith("град") and parse_angle(token) is not None:
+            values["angle"].append(int(token))
+            i += 1
+            continue
+        if not token.isdigit() and parse_thread(token) is not None:
+            values["thread"].append(token)
+            continue
+        if token in ("l", "s", "легкая", "тяжелая") and parse_series(token) is not None:
+            values["seria"].append(token.upper())
+            continue
+        result.unparsed.append(token)
+
+    if result.component_type is None:
+        # Без типа параметры не разложить по полям
+        result.unparsed.extend(str(v) for vs in values.values() for v in vs)
+        return result
+
+    for prefix, found in values.items():
+        if not found:
+            continue
+        slots = _slots(result.component_type, prefix)
+        if len(found) > len(slots):
+            # Параметр, которого у типа нет (или больше значений, чем полей) — нужен AI
+            result.unparsed.extend(str(v) for v in found)
+            continue
+        result.fields.update(zip(slots, found))
+
+    schema = build_response_schema(result.component_type)
+    for name, value in scalars.items():
+        if schema is not None and name in schema["properties"]:
+            result.fields[name] = value
+        else:
+            result.unparsed.append(f"{name}{value}")
+
+    return result
@@ -23,7 +23,7 @@ def get_timeout() -> int:
     try:
         return int(timeout)
     except ValueError:
-        logger.warning(f"Некорректный таймаут: {timeout}, использую 120 секунд")
+        logger.warning("Некорректный таймаут: %s, использую 120 секунд", timeout)
         return 120
 
 
@@ -33,10 +33,48 @@ def get_max_tokens() -> int:
     try:
         return int(max_tokens)
     except ValueError:
-        logger.warning(f"Некорректное количество токенов: {max_tokens}, использую 2000")
+        logger.warning("Некорректное количество токенов: %s, использую 2000", max_tokens)
         return 2000
 
 
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name, str(default))
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Некорректное значение %s: %s, использую %s", name, value, default)
+        return default
+
+
+def get_max_retries() -> int:
+    """Количество повторов запроса при 429 и ошибках подключения."""
+    return int(_get_float("AI_MAX_RETRIES", 3))
+
+
+def get_rate_limit_backend() -> str:
+    """Хранилище rate limiter: redis (общий для воркеров), local или off."""
+    backend = os.getenv("AI_RATE_LIMITER", "redis").lower()
+    if backend not in ("redis", "local", "off"):
+        logger.warning("Некорректный AI_RATE_LIMITER: %s, использую redis", backend)
+        return "redis"
+    return backend
+
+
+def get_rate_limit_rps() -> float:
+    """Разрешённое число запросов в секунду к провайдеру (на весь флот воркеров)."""
+    return max(0.1, _get_float("AI_RATE_LIMIT_RPS", 2.0))
+
+
+def get_rate_limit_burst() -> float:
+    """Размер burst token bucket."""
+    return max(1.0, _get_float("AI_RATE_LIMIT_BURST", 5.0))
+
+
+def get_max_concurrency() -> int:
+    """Максимум одновременных запросов к провайдеру из одного процесса."""
+    return max(1, int(_get_float("AI_MAX_CONCURRENCY", 4)))
+
+
 def check_api_key() -> bool:
     """Проверка доступности API ключа."""
     try:
@@ -61,4 +99,129 @@ def get_available_models() -> list:
         "openai/gpt-4o-mini",
         "anthropic/claude-3-haiku",
         "meta-llama/llama-3.1-70b-instruct",
-    ]
\ No newline at end of file
+    ]
+
+
+# Модели по задачам: дешёвые/быстрые для классификации и количества,
+# более сильные для извлечения параметров. Порядок — приоритет выбора.
+_DEFAULT_TASK_MODELS = {
+    "classify": [
+        "meta-llama/llama-3.1-8b-instruct:free",
+        "mistralai/mistral-7b-instruct:free",
+        "openai/gpt-4o-mini",
+    ],
+    "quantity": [
+        "meta-llama/llama-3.1-8b-instruct:free",
+        "mistralai/mistral-7b-instruct:free",
+        "openai/gpt-4o-mini",
+    ],
+    "split": [
+        "google/gemma-3-27b-it:free",
+        "openai/gpt-4o-mini",
+        "meta-llama/llama-3.1-8b-instruct:free",
+    ],
+    "extract": [
+        "openai/gpt-4o-mini",
+        "google/gemma-3-27b-it:free",
+        "anthropic/claude-3-haiku",
+        "meta-llama/llama-3.1-70b-instruct",
+    ],
+    # Пакетные задачи: длинный структурированный ответ по нескольким строкам
+    "batch_classify": [
+        "openai/gpt-4o-mini",
+        "google/gemma-3-27b-it:free",
+        "meta-llama/llama-3.1-70b-instruct",
+    ],
+    "batch_extract": [
+        "openai/gpt-4o-mini",
+        "google/gemma-3-27b-it:free",
+        "anthropic/claude-3-haiku",
+        "meta-llama/llama-3.1-70b-instruct",
+    ],
+}
+
+
+def is_routing_enabled() -> bool:
+    """Включена ли маршрутизация запросов по моделям (AI_ROUTING)."""
+    return os.getenv("AI_ROUTING", "true").lower() == "true"
+
+
+def get_task_models(task: str) -> list:
+    """
+    Список моделей для задачи. Переопределяется через AI_MODELS_<TASK>
+    (через запятую); модель по умолчанию добавляется последним запасным вариантом.
+    """
+    env_value = os.getenv(f"AI_MODELS_{task.upper()}")
+    if env_value:
+        models = [m.strip() for m in env_value.split(",") if m.strip()]
+    else:
+        models = list(_DEFAULT_TASK_MODELS.get(task, _DEFAULT_TASK_MODELS["extract"]))
+
+    default_model = get_default_model()
+    if default_model and default_model not in models:
+        models.append(default_model)
+    return models
+
+
+def get_hedge_delay() -> float:
+    """Задержка (с) перед дублирующим запросом ко второй модели, пока нет статистики p95."""
+    return max(0.5, _get_float("AI_HEDGE_AFTER", 8.0))
+
+
+# Бюджеты токенов ответа по задачам: классификация — одно слово,
+# извлечение — короткий JSON-объект
+_DEFAULT_TASK_MAX_TOKENS = {
+    "classify": 12,
+    "quantity": 16,
+    "extract": 400,
+    "batch_classify": 600,
+    "batch_extract": 4000,
+}
+
+
+def get_task_max_tokens(task: str) -> int:
+    """Лимит токенов ответа для задачи (AI_MAX_TOKENS_<TASK>, по умолчанию AI_MAX_TOKENS)."""
+    default = _DEFAULT_TASK_MAX_TOKENS.get(task, get_max_tokens())
+    return max(1, int(_get_float(f"AI_MAX_TOKENS_{task.upper()}", default)))
+
+
+def is_streaming_enabled() -> bool:
+    """Потоковая генерация с ранней остановкой (AI_STREAMING)."""
+    return os.getenv("AI_STREAMING", "true").lower() == "true"
+
+
+def is_structured_output_enabled() -> bool:
+    """Передавать JSON-схему через response_format (AI_STRUCTURED_OUTPUT)."""
+    return os.getenv("AI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+def is_prompt_cache_control_enabled() -> bool:
+    """Помечать системный промпт cache_control для провайдеров с явным кэшем (AI_PROMPT_CACHE)."""
+    return os.getenv("AI_PROMPT_CACHE", "true").lower() == "true"
+
+
+
+def get_batch_pack_size() -> int:
+    """Сколько строк заказа упаковывать в один запрос к AI (AI_BATCH_PACK_SIZE, 0 — по одной)."""
+    return max(0, int(_get_float("AI_BATCH_PACK_SIZE", 10)))
+
+
+def get_local_classifier_path() -> str:
+    """Файл локального классификатора типа компонента (LOCAL_CLASSIFIER_PATH)."""
+    default = Path(__file__).resolve().parent / "component_classifier.json"
+    return os.getenv("LOCAL_CLASSIFIER_PATH") or str(default)
+
+
+def get_local_classifier_threshold() -> float:
+    """Минимальная уверенность локального классификатора; ниже — классификация через AI."""
+    return min(1.0, max(0.0, _get_float("LOCAL_CLASSIFIER_THRESHOLD", 0.85)))
+
+
+def get_max_candidates() -> int:
+    """Сколько типов искать одновременно для неоднозначного запроса (CLASSIFIER_MAX_CANDIDATES)."""
+    return max(1, int(_get_float("CLASSIFIER_MAX_CANDIDATES", 2)))
+
+
+def get_candidate_min_score() -> float:
+    """Минимальная вероятность локальной модели, с которой тип становится дополнительным кандидатом."""
+    return min(1.0, max(0.0, _get_float("CLASSIFIER_CANDIDATE_MIN_SCORE", 0.2)))
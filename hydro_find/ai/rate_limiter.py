@@ -0,0 +1,303 @@
+# hydro_find/ai/rate_limiter.py
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from hydro_find.ai.models.ai_models import (
+    get_rate_limit_backend, get_rate_limit_rps, get_rate_limit_burst, get_max_concurrency
+)
+from hydro_find.ai.router import RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTimeout(Exception):
+    """Не удалось получить разрешение на запрос за отведённое время"""
+
+
+# Атомарное списание токена. Время берётся из Redis, чтобы часы воркеров не расходились.
+# Возвращает время ожидания в секундах (строкой — Lua number в ответе усекается до целого).
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate_max = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'blocked_until')
+local rate = tonumber(data[3]) or rate_max
+local blocked = tonumber(data[4]) or 0
+if blocked > now then
+    return tostring(blocked - now)
+end
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+# Обратная связь AIMD: ARGV[1] — 'success' или 'limited'
+_FEEDBACK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate_max = tonumber(ARGV[2])
+local rate_min = tonumber(ARGV[3])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or rate_max
+if ARGV[1] == 'limited' then
+    rate = math.max(rate_min, rate * tonumber(ARGV[4]))
+    local retry_after = tonumber(ARGV[5])
+    if retry_after > 0 then
+        local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+        redis.call('HSET', KEYS[1], 'blocked_until', tostring(math.max(blocked, now + retry_after)))
+    end
+else
+    rate = math.min(rate_max, rate + tonumber(ARGV[4]))
+end
+redis.call('HSET', KEYS[1], 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(rate)
+"""
+
+
+class LocalTokenBucket:
+    """Token bucket в памяти процесса (если Redis недоступен)"""
+
+    def __init__(self, rate: float, capacity: float, min_rate: float,
+                 decrease_factor: float = 0.5, increase_step: float = 0.05):
+        self.rate_max = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self._tokens = capacity
+        self._ts = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Списание токена. Возвращает время ожидания (0 — разрешено сразу)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                return self._blocked_until - now
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.rate_max, self.rate + self.increase_step)
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+
+class RedisTokenBucket:
+    """Token bucket, общий для всех процессов через Redis"""
+
+    def __init__(self, redis_client, rate: float, capacity: float, min_rate: float,
+                 key: str = "ratelimit:openrouter",
+                 decrease_factor: float = 0.5, increase_step: float = 0.05):
+        self._redis = redis_client
+        self.key = key
+        self.rate_max = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self._acquire = redis_client.register_script(_ACQUIRE_SCRIPT)
+        self._feedback = redis_client.register_script(_FEEDBACK_SCRIPT)
+
+    @property
+    def rate(self) -> float:
+        value = self._redis.hget(self.key, "rate")
+        return float(value) if value else self.rate_max
+
+    def acquire(self) -> float:
+        return float(self._acquire(keys=[self.key], args=[self.rate_max, self.capacity]))
+
+    def on_success(self):
+        self._feedback(keys=[self.key],
+                       args=["success", self.rate_max, self.min_rate, self.increase_step, 0])
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        self._feedback(keys=[self.key],
+                       args=["limited", self.rate_max, self.min_rate, self.decrease_factor, retry_after or 0])
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничение числа одновременных запросов с AIMD:
+    +1/limit за каждый успех, ×decrease_factor при 429.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify()
+
+    def on_rate_limited(self):
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class RateLimiter:
+    """Token bucket (общий для флота воркеров) + адаптивная конкурентность процесса"""
+
+    def __init__(self, bucket, concurrency: AdaptiveConcurrency):
+        self.bucket = bucket
+        self.concurrency = concurrency
+
+    @contextmanager
+    def slot(self, timeout: float, cancel=None):
+        """
+        Ожидание разрешения на один запрос к провайдеру.
+
+        Args:
+            timeout: Наибольшее время ожидания, с
+            cancel: CancelToken роутера — отменённый запрос перестаёт ждать
+
+        Raises:
+            RateLimitTimeout: Если разрешение не получено за timeout секунд
+            RequestCancelled: Запрос отменён во время ожидания
+        """
+        deadline = time.monotonic() + timeout
+        if not self.concurrency.acquire(timeout):
+            raise RateLimitTimeout("Превышено время ожидания свободного слота")
+
+        try:
+            while True:
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelled()
+                try:
+                    wait = self.bucket.acquire()
+                except Exception as e:
+                    # Ошибка Redis не должна останавливать запросы
+                    logger.warning("Ошибка rate limiter, запрос пропущен без ограничения: %s", e)
+                    wait = 0.0
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout(f"Лимит запросов: ожидание {wait:.1f} с превышает таймаут")
+                if cancel is not None:
+                    cancel.wait(wait)
+                else:
+                    time.sleep(wait)
+
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self):
+        self.concurrency.on_success()
+        try:
+            self.bucket.on_success()
+        except Exception as e:
+            logger.debug("Ошибка обновления rate limiter: %s", e)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        self.concurrency.on_rate_limited()
+        logger.warning("429 от провайдера: конкурентность снижена до %s, retry-after %s",
+                       int(self.concurrency.limit), retry_after)
+        try:
+            self.bucket.on_rate_limited(retry_after)
+        except Exception as e:
+            logger.debug("Ошибка обновления rate limiter: %s", e)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Время ожидания из заголовков ответа 429 (Retry-After или X-RateLimit-Reset в мс)"""
+    if not headers:
+        return None
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    reset = headers.get("x-ratelimit-reset")
+    if reset:
+        try:
+            return max(0.0, float(reset) / 1000 - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def create_rate_limiter() -> Optional[RateLimiter]:
+    """Создание rate limiter по настройкам окружения (AI_RATE_LIMITER=redis|local|off)"""
+    backend = get_rate_limit_backend()
+    if backend == "off":
+        return None
+
+    rate = get_rate_limit_rps()
+    capacity = get_rate_limit_burst()
+    min_rate = max(0.05, rate / 20)
+    concurrency = AdaptiveConcurrency(get_max_concurrency())
+
+    if backend == "redis":
+        try:
+            import os
+            import redis
+
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                socket_timeout=2,
+                socket_connect_timeout=1
+            )
+            client.ping()
+            logger.info("Rate limiter OpenRouter: Redis, %s запросов/с, burst %s", rate, capacity)
+            return RateLimiter(RedisTokenBucket(client, rate, capacity, min_rate), concurrency)
+        except Exception as e:
+            logger.warning("Redis недоступен для rate limiter, используется локальный: %s", e)
+
+    logger.info("Rate limiter OpenRouter: локальный, %s запросов/с, burst %s", rate, capacity)
+    return RateLimiter(LocalTokenBucket(rate, capacity, min_rate), concurrency)
@@ -0,0 +1,265 @@
+# hydro_find/ai/router.py
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from hydro_find.ai.models.ai_models import get_task_models, get_hedge_delay
+from hydro_find.instrumentation.timing import bind
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """Запрос отменён: другая модель уже ответила"""
+
+
+class CancelToken:
+    """
+    Отмена запроса проигравшей модели: флаг для проверок и закрытие
+    зарегистрированных ресурсов (потока ответа провайдера).
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Ожидание до timeout секунд; True — запрос отменён"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Вызвать callback при отмене (сразу, если запрос уже отменён)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug("Ошибка закрытия отменённого запроса: %s", e)
+
+
+_cancel_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """Токен отмены запроса, выполняемого роутером в этом потоке (None — вне роутера)"""
+    return _cancel_token.get()
+
+
+class ModelStats:
+    """Скользящая статистика задержек и ошибок одной модели"""
+
+    def __init__(self, window: int = 200):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.last_error_at: Optional[float] = None
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+            else:
+                self.last_error_at = time.time()
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            values = sorted(self._latencies)
+        index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+        return values[index]
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1.0 - sum(self._outcomes) / len(self._outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": self.samples,
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+        }
+
+
+class ModelRouter:
+    """
+    Выбор модели под задачу с учётом задержек и ошибок.
+
+    Запрос уходит первой здоровой модели; если ответа нет дольше её p95,
+    дублируется следующей (hedging), при ошибке — переключение на следующую.
+    """
+
+    def __init__(
+            self,
+            task_models: Optional[Dict[str, List[str]]] = None,
+            max_hedges: int = 1,
+            max_attempts: int = 3,
+            min_hedge_delay: float = 1.0,
+            max_hedge_delay: float = 20.0,
+            unhealthy_error_rate: float = 0.5,
+            cooldown: float = 60.0,
+            max_workers: int = 8
+    ):
+        """
+        Args:
+            task_models: Модели по задачам (по умолчанию из окружения)
+            max_hedges: Сколько дополнительных моделей можно запускать параллельно
+            max_attempts: Максимум моделей, опрашиваемых за один запрос
+            min_hedge_delay: Нижняя граница задержки перед hedge-запросом
+            max_hedge_delay: Верхняя граница задержки перед hedge-запросом
+            unhealthy_error_rate: Доля ошибок, после которой модель уходит в конец списка
+            cooldown: Сколько секунд после последней ошибки модель считается нездоровой
+            max_workers: Размер пула потоков для параллельных запросов
+        """
+        self._task_models = task_models
+        self.max_hedges = max_hedges
+        self.max_attempts = max_attempts
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.cooldown = cooldown
+        self._stats: Dict[str, ModelStats] = {}
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-router")
+
+    def models_for(self, task: str) -> List[str]:
+        if self._task_models is not None:
+            return list(self._task_models.get(task) or self._task_models.get("extract", []))
+        return get_task_models(task)
+
+    def stats(self, model: str) -> ModelStats:
+        with self._stats_lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def _is_healthy(self, model: str) -> bool:
+        stats = self.stats(model)
+        if stats.samples < 5:
+            return True
+        recently_failed = stats.last_error_at is not None and time.time() - stats.last_error_at < self.cooldown
+        return not (recently_failed and stats.error_rate >= self.unhealthy_error_rate)
+
+    def rank(self, task: str) -> List[str]:
+        """Модели задачи: сначала здоровые в порядке приоритета, затем остальные"""
+        models = self.models_for(task)
+        return sorted(models, key=lambda m: (not self._is_healthy(m), models.index(m)))
+
+    def hedge_delay(self, model: str) -> float:
+        p95 = self.stats(model).percentile(0.95)
+        delay = p95 if p95 is not None else get_hedge_delay()
+        return max(self.min_hedge_delay, min(self.max_hedge_delay, delay))
+
+    def _timed_call(self, model: str, call: Callable[[str], Optional[Any]], token: CancelToken) -> Optional[Any]:
+        start = time.monotonic()
+        reset = _cancel_token.set(token)
+        try:
+            result = call(model)
+        except RequestCancelled:
+            result = None
+        except Exception as e:
+            logger.warning("Модель %s завершилась с ошибкой: %s", model, e)
+            result = None
+        finally:
+            _cancel_token.reset(reset)
+        # Отменённый запрос ничего не говорит о здоровье модели
+        if not token.cancelled:
+            self.stats(model).record(time.monotonic() - start, result is not None)
+        return result
+
+    @staticmethod
+    def _cancel(pending: Dict[Any, Tuple[str, CancelToken]]):
+        """Отмена проигравших запросов: не начатые не запускаются, начатые закрывают поток и слот"""
+        for future, (model, token) in pending.items():
+            future.cancel()
+            token.cancel()
+            logger.debug("Запрос к модели %s отменён", model)
+
+    def execute(self, task: str, call: Callable[[str], Optional[Any]]) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Выполнение запроса с hedging и failover.
+
+        Args:
+            task: Задача (classify, quantity, split, extract)
+            call: Функция запроса к модели; None означает неудачу. Запрос, проигравший
+                другой модели, отменяется: current_cancel_token() внутри call
+
+        Returns:
+            Tuple: (результат, модель) или (None, None)
+        """
+        candidates = self.rank(task)[:self.max_attempts]
+        if not candidates:
+            return None, None
+
+        pending = {}
+        next_index = 0
+        hedge_at = None
+
+        def launch():
+            nonlocal next_index, hedge_at
+            model = candidates[next_index]
+            next_index += 1
+            token = CancelToken()
+            pending[self._executor.submit(bind(self._timed_call), model, call, token)] = (model, token)
+            hedge_at = time.monotonic() + self.hedge_delay(model)
+
+        launch()
+        while pending:
+            can_hedge = next_index < len(candidates) and len(pending) <= self.max_hedges
+            timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                logger.info("Модель %s отвечает медленно, дублируем запрос в %s",
+                            pending[next(iter(pending))][0], candidates[next_index])
+                launch()
+                continue
+
+            for future in done:
+                model, _ = pending.pop(future)
+                result = future.result()
+                if result is not None:
+                    self._cancel(pending)
+                    return result, model
+                logger.warning("Модель %s не ответила на задачу %s", model, task)
+
+            if not pending and next_index < len(candidates):
+                launch()
+
+        return None, None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._stats_lock:
+            models = list(self._stats.items())
+        return {model: stats.snapshot() for model, stats in models}
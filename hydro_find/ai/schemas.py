@@ -0,0 +1,256 @@
+# hydro_find/ai/schemas.py
+
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Boolean, Integer, SmallInteger, String
+
+from hydro_find.database.models import CATEGORY_TO_MODEL
+from hydro_find.prompts import ComponentType
+from hydro_find.database.enums import (
+    Standard, Angle, Series, THREAD_LABELS, ARMATURE_LABELS,
+    parse_standard, parse_thread, parse_armature, parse_angle, parse_series
+)
+
+logger = logging.getLogger(__name__)
+
+# Служебные колонки, которые модель не извлекает
+_SKIP_COLUMNS = {"id", "article", "name", "updated_at"}
+
+# Колонки-ссылки на Enum: префикс колонки → (JSON-схема значения, разбор, вывод в ответ)
+_ENUM_FIELDS: Dict[str, Tuple[Dict[str, Any], Callable, Callable]] = {
+    "standard": (
+        {"type": ["string", "null"], "enum": [s.name for s in Standard] + [None]},
+        parse_standard, lambda e: e.name,
+    ),
+    "thread": (
+        {"type": ["string", "null"], "enum": list(THREAD_LABELS) + [None]},
+        parse_thread, lambda e: next(label for label, value in THREAD_LABELS.items() if value == e),
+    ),
+    "armature": (
+        {"type": ["string", "null"], "enum": list(ARMATURE_LABELS) + [None]},
+        parse_armature, lambda e: next(label for label, value in ARMATURE_LABELS.items() if value == e),
+    ),
+    "angle": (
+        {"type": ["integer", "null"], "enum": [a.value for a in Angle] + [None]},
+        parse_angle, lambda e: e.value,
+    ),
+    "seria": (
+        {"type": ["string", "null"], "enum": [s.name for s in Series] + [None]},
+        parse_series, lambda e: e.name,
+    ),
+}
+
+_ENUM_COLUMN_RE = re.compile(r"^(standard|thread|armature|angle|seria)(_\d)?_id$")
+
+
+def _enum_column(column_name: str) -> Optional[Tuple[str, str]]:
+    """'standard_1_id' → ('standard_1', 'standard'); None для обычных колонок"""
+    match = _ENUM_COLUMN_RE.match(column_name)
+    if not match:
+        return None
+    return column_name[:-3], match.group(1)
+
+
+def _scalar_schema(column) -> Optional[Dict[str, Any]]:
+    if isinstance(column.type, Boolean):
+        return {"type": ["boolean", "null"]}
+    if isinstance(column.type, (Integer, SmallInteger)):
+        return {"type": ["integer", "null"]}
+    if isinstance(column.type, String):
+        return {"type": ["string", "null"]}
+    return None
+
+
+@lru_cache(maxsize=None)
+def _fields(component_type: str) -> Dict[str, Tuple[str, Any]]:
+    """
+    Поля извлечения для типа компонента: имя поля → (колонка БД, описание).
+    Описание — префикс Enum для ссылочных колонок или колонка для скалярных.
+    """
+    model = CATEGORY_TO_MODEL.get(component_type)
+    if model is None:
+        return {}
+
+    fields = {}
+    for column in model.__table__.columns:
+        if column.name in _SKIP_COLUMNS:
+            continue
+        enum_ref = _enum_column(column.name)
+        if enum_ref:
+            fields[enum_ref[0]] = (column.name, enum_ref[1])
+        elif _scalar_schema(column) is not None:
+            fields[column.name] = (column.name, column)
+    return fields
+
+
+@lru_cache(maxsize=None)
+def build_response_schema(component_type: str) -> Optional[Dict[str, Any]]:
+    """
+    JSON-схема ответа для извлечения параметров, построенная по ORM-модели.
+    None — для типов без таблицы (например, banjo-bolt).
+    """
+    fields = _fields(component_type)
+    if not fields:
+        return None
+
+    properties = {}
+    for field, (_, ref) in fields.items():
+        properties[field] = dict(_ENUM_FIELDS[ref][0]) if isinstance(ref, str) else _scalar_schema(ref)
+
+    return {
+        "type": "object",
+        "properties": properties,
+        # strict-режим требует перечислить все поля; отсутствующие модель заполняет null
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _batch_schema(item_properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ пакетного запроса: {"items": [...]} — strict-режим требует объект на верхнем уровне"""
+    return {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": item_properties,
+                    "required": list(item_properties),
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["items"],
+        "additionalProperties": False,
+    }
+
+
+@lru_cache(maxsize=None)
+def build_batch_classify_schema() -> Dict[str, Any]:
+    """JSON-схема пакетной классификации: номер строки и тип компонента"""
+    return _batch_schema({
+        "index": {"type": "integer"},
+        "type": {"type": "string", "enum": [t.value for t in ComponentType]},
+    })
+
+
+@lru_cache(maxsize=None)
+def build_batch_response_schema(component_type: str) -> Optional[Dict[str, Any]]:
+    """JSON-схема пакетного извлечения: номер строки, количество и поля компонента"""
+    schema = build_response_schema(component_type)
+    if schema is None:
+        return None
+    return _batch_schema({
+        "index": {"type": "integer"},
+        "quantity": {"type": ["integer", "null"]},
+        **schema["properties"],
+    })
+
+
+def unpack_batch_items(data: Optional[Dict[str, Any]], count: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Разбор ответа пакетного запроса.
+
+    Args:
+        data: Разобранный JSON ответа
+        count: Количество строк в запросе
+
+    Returns:
+        Dict: номер строки (с 1) → объект ответа без index. Строки без
+        корректного элемента в результат не попадают — их обрабатывают по одной.
+    """
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return {}
+
+    result = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        if isinstance(index, str) and index.strip().isdigit():
+            index = int(index)
+        if not isinstance(index, int) or isinstance(index, bool) or not 1 <= index <= count:
+            continue
+        if index in result:
+            # Два ответа на одну строку — не угадываем, обрабатываем строку отдельно
+            result[index] = None
+            continue
+        result[index] = {k: v for k, v in item.items() if k != "index"}
+    return {index: item for index, item in result.items() if item is not None}
+
+
+def parse_quantity(value: Any) -> Optional[int]:
+    """Количество из ответа модели: целое > 0 или None"""
+    if value is None or isinstance(value, bool):
+        return None
+    digits = re.search(r"\d+", str(value))
+    quantity = int(digits.group()) if digits else 0
+    return quantity or None
+
+
+def _coerce_scalar(column, value) -> Any:
+    if isinstance(column.type, Boolean):
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower().strip()
+        if text in ("true", "1", "yes", "y", "да"):
+            return True
+        if text in ("false", "0", "no", "n", "нет"):
+            return False
+        return None
+    if isinstance(column.type, (Integer, SmallInteger)):
+        digits = re.search(r"-?\d+", str(value))
+        return int(digits.group()) if digits else None
+    text = str(value).strip()
+    return text or None
+
+
+def validate_params(component_type: str, data: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Проверка и приведение ответа модели.
+
+    Args:
+        component_type: Тип компонента
+        data: Разобранный JSON ответа
+
+    Returns:
+        Tuple: (параметры для ответа с каноничными обозначениями,
+                типизированные параметры для БД с id значений Enum)
+    """
+    if not isinstance(data, dict):
+        return {}, {}
+
+    fields = _fields(component_type)
+    if not fields:
+        # Тип без таблицы — оставляем только простые значения
+        clean = {k: v for k, v in data.items()
+                 if k != "raw_response" and isinstance(v, (str, int, float, bool))}
+        return clean, {}
+
+    clean, typed = {}, {}
+    for field, value in data.items():
+        if value is None or field not in fields:
+            continue
+
+        column_name, ref = fields[field]
+        if isinstance(ref, str):
+            _, parse, display = _ENUM_FIELDS[ref]
+            member = parse(value)
+            if member is None:
+                logger.debug("Значение '%s' поля %s не найдено в перечислении", value, field)
+                continue
+            clean[field] = display(member)
+            typed[column_name] = int(member)
+        else:
+            coerced = _coerce_scalar(ref, value)
+            if coerced is None:
+                continue
+            clean[field] = coerced
+            typed[column_name] = coerced
+
+    return clean, typed
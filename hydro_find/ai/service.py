@@ -1,10 +1,22 @@
 # hydro_find/ai/service.py
 
 import logging
-from typing import Optional, Dict, Any, List
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
+from hydro_find.ai.classifier import load_classifier
 from hydro_find.ai.client import OpenRouterClient
+from hydro_find.ai.models.ai_models import (
+    get_batch_pack_size, get_max_concurrency, get_local_classifier_threshold,
+    get_max_candidates, get_candidate_min_score
+)
+from hydro_find.ai.schemas import (
+    build_response_schema, build_batch_classify_schema, build_batch_response_schema,
+    validate_params, unpack_batch_items, parse_quantity
+)
+from hydro_find.instrumentation import timing
 from hydro_find.prompts import (
     ComponentType,
     PreprocessingTask,
@@ -18,17 +30,95 @@ class AIProcessingService:
     def __init__(self):
         try:
             self.client = OpenRouterClient()
+            # Локальная модель классификации (None — только через AI)
+            self.local_classifier = load_classifier()
+            self.local_threshold = get_local_classifier_threshold()
+            self.max_candidates = get_max_candidates()
+            self.candidate_min_score = get_candidate_min_score()
             logger.info("AIProcessingService инициализирован")
         except Exception as e:
-            logger.error(f"Ошибка инициализации AIProcessingService: {e}")
+            logger.error("Ошибка инициализации AIProcessingService: %s", e)
             raise
 
+    def _rank_local(self, query: str) -> List[Tuple[str, float]]:
+        """Типы по убыванию вероятности локальной модели; пустой список — модели нет"""
+        if self.local_classifier is None:
+            return []
+        try:
+            with timing.stage("classify_local"):
+                return self.local_classifier.predict_proba(query)
+        except Exception as e:
+            logger.error("Ошибка локального классификатора: %s", e)
+            return []
+
+    def _predict_local(self, query: str) -> Tuple[Optional[str], float]:
+        """Предсказание локальной модели без порога; (None, 0.0) — модели нет"""
+        ranked = self._rank_local(query)
+        return ranked[0] if ranked else (None, 0.0)
+
+    def _classify_local(self, query: str) -> Optional[str]:
+        """Классификация локальной моделью; None — модели нет или уверенность ниже порога"""
+        label, confidence = self._predict_local(query)
+        if label is None or confidence < self.local_threshold:
+            logger.debug("Локальный классификатор не уверен (%s: %.2f), используем AI", label, confidence)
+            return None
+        logger.debug("Локальный классификатор: %s (%.2f)", label, confidence)
+        return label
+
+    def _classify_scored(self, query: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Классификация типа компонента.
+
+        Returns:
+            Tuple: (тип компонента, неуверенное предсказание локальной модели или None)
+        """
+        logger.debug("Классификация запроса: %s...", query[:50])
+
+        ranked = self._rank_local(query)
+        label, confidence = ranked[0] if ranked else (None, 0.0)
+        if label is not None and confidence >= self.local_threshold:
+            logger.info("Запрос классифицирован локально как: %s", label)
+            return label, None
+
+        uncertain = None
+        if label is not None:
+            uncertain = {
+                "label": label,
+                "confidence": round(confidence, 4),
+                "ranked": [(name, round(p, 4)) for name, p in ranked[:self.max_candidates]],
+            }
+        return self._classify_llm(query), uncertain
+
+    def _candidates(self, comp_type: str, uncertain: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Типы для одновременного поиска: выбранный и близкие к нему по оценке
+        локальной модели (например, adapters и adapter-tee).
+
+        Returns:
+            [{"component_type", "score"}, ...] — выбранный тип первым; пустой список, если запрос однозначен
+        """
+        if uncertain is None or self.max_candidates < 2:
+            return []
+        ranked = dict(uncertain.get("ranked") or [])
+        others = [(label, p) for label, p in ranked.items()
+                  if label != comp_type and p >= self.candidate_min_score]
+        if not others:
+            return []
+        # Тип, выбранный AI, ранжируется не ниже лучшего локального кандидата
+        primary = max([ranked.get(comp_type, 0.0)] + [p for _, p in others])
+        candidates = [{"component_type": comp_type, "score": primary}]
+        candidates += [{"component_type": label, "score": p} for label, p in others[:self.max_candidates - 1]]
+        return candidates
+
     def _classify(self, query: str) -> Optional[str]:
         """Классификация типа компонента"""
-        logger.debug(f"Классификация запроса: {query[:50]}...")
+        return self._classify_scored(query)[0]
+
+    def _classify_llm(self, query: str) -> Optional[str]:
+        """Классификация типа компонента через AI"""
 
         prompt = PromptRepository.get_preprocessing_prompt(PreprocessingTask.CLASSIFY)
-        response = self.client.generate(prompt, query)
+        response = self.client.generate(prompt, query, task=PreprocessingTask.CLASSIFY.value)
 
         if not response:
             logger.warning("Не удалось классифицировать запрос: AI не ответил")
@@ -36,50 +126,62 @@ class AIProcessingService:
 
         # Очистка ответа
         raw = response.lower().strip().strip('"\'').strip('`')
-        logger.debug(f"Ответ классификации: {raw}")
+        logger.debug("Ответ классификации: %s", raw)
 
         # Проверка на допустимые типы
         allowed = {t.value for t in ComponentType}
         if raw in allowed:
-            logger.info(f"Запрос классифицирован как: {raw}")
+            logger.info("Запрос классифицирован как: %s", raw)
             return raw
         else:
-            logger.warning(f"Недопустимый тип компонента в ответе AI: {raw}")
+            logger.warning("Недопустимый тип компонента в ответе AI: %s", raw)
             # Попробуем найти подходящий тип
             for allowed_type in allowed:
                 if allowed_type in raw or raw in allowed_type:
-                    logger.info(f"Использую тип из частичного совпадения: {allowed_type}")
+                    logger.info("Использую тип из частичного совпадения: %s", allowed_type)
                     return allowed_type
             return None
 
-    def _extract_params(self, query: str, component_type: str) -> Optional[Dict[str, Any]]:
-        """Извлечение параметров компонента"""
-        logger.debug(f"Извлечение параметров для {component_type}: {query[:50]}...")
+    def _extract_params(self, query: str, component_type: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Извлечение параметров компонента.
+
+        Returns:
+            Optional[Tuple]: (проверенные параметры, типизированные параметры для БД)
+        """
+        logger.debug("Извлечение параметров для %s: %s...", component_type, query[:50])
 
         try:
             prompt = PromptRepository.get_component_prompt(ComponentType(component_type))
-            result = self.client.extract_json(prompt, query)
+            schema = build_response_schema(component_type)
+            result = self.client.extract_json(prompt, query, task="extract", schema=schema)
 
-            if result:
-                logger.info(f"Параметры извлечены для {component_type}, ключи: {list(result.keys())}")
-            else:
-                logger.warning(f"Не удалось извлечь параметры для {component_type}")
+            if result is None:
+                logger.warning("Не удалось извлечь параметры для %s", component_type)
+                return None
 
-            return result
+            if "raw_response" in result:
+                # Невалидный JSON не превращаем в фильтр — остаётся текстовый поиск
+                logger.warning("AI вернул не JSON для %s, параметры не применяются", component_type)
+
+            params, search_params = validate_params(component_type, result)
+            logger.info("Параметры извлечены для %s, ключи: %s", component_type, list(params.keys()))
+            return params, search_params
 
         except ValueError as e:
-            logger.error(f"Неизвестный тип компонента для извлечения параметров: {component_type}")
+            # Неизвестный тип или параметры, не прошедшие проверку схемы
+            logger.error("Параметры для %s не приняты: %s", component_type, e)
             return None
         except Exception as e:
-            logger.exception(f"Ошибка извлечения параметров: {e}")
+            logger.exception("Ошибка извлечения параметров: %s", e)
             return None
 
     def _extract_quantity(self, text: str) -> Optional[int]:
         """Извлечение количества"""
-        logger.debug(f"Извлечение количества из: {text[:50]}...")
+        logger.debug("Извлечение количества из: %s...", text[:50])
 
         prompt = PromptRepository.get_preprocessing_prompt(PreprocessingTask.QUANTITY)
-        response = self.client.generate(prompt, text)
+        response = self.client.generate(prompt, text, task=PreprocessingTask.QUANTITY.value)
 
         if not response:
             logger.debug("Не удалось извлечь количество: AI не ответил")
@@ -94,18 +196,18 @@ class AIProcessingService:
         digits = ''.join(filter(str.isdigit, response))
         if digits:
             quantity = int(digits)
-            logger.debug(f"Извлечено количество: {quantity}")
+            logger.debug("Извлечено количество: %s", quantity)
             return quantity
         else:
-            logger.debug(f"Не удалось извлечь количество из ответа: {response}")
+            logger.debug("Не удалось извлечь количество из ответа: %s", response)
             return None
 
     def _split_batch(self, text: str) -> List[str]:
         """Разделение пакетного запроса на отдельные строки"""
-        logger.debug(f"Разделение пакетного запроса")
+        logger.debug("Разделение пакетного запроса")
 
         prompt = PromptRepository.get_preprocessing_prompt(PreprocessingTask.SPLIT)
-        response = self.client.generate(prompt, text)
+        response = self.client.generate(prompt, text, task=PreprocessingTask.SPLIT.value)
 
         if not response:
             logger.warning("Не удалось разделить пакетный запрос: AI не ответил")
@@ -115,66 +217,78 @@ class AIProcessingService:
         lines = response.strip().split('\n')
         result = [line.strip() for line in lines if line.strip()]
 
-        logger.info(f"Пакетный запрос разделен на {len(result)} строк")
+        logger.info("Пакетный запрос разделен на %s строк", len(result))
         return result
 
     def process_single(self, query: str) -> Dict[str, Any]:
         """Обработка одного запроса"""
         ts = datetime.now().isoformat()
 
-        logger.info(f"Начало обработки AI запроса: {query[:100]}...")
+        logger.info("Начало обработки AI запроса: %s...", query[:100])
 
         try:
             # 1. Классификация
-            comp_type = self._classify(query)
+            comp_type, uncertain = self._classify_scored(query)
             if not comp_type:
                 logger.warning("Не удалось определить тип компонента")
                 return self._error("Не удалось определить тип компонента", ts)
 
             # 2. Извлечение параметров
-            params = self._extract_params(query, comp_type)
-            if not params:
+            extracted = self._extract_params(query, comp_type)
+            if extracted is None:
                 logger.warning("Не удалось извлечь параметры")
                 return self._error("Не удалось извлечь параметры", ts)
+            params, search_params = extracted
 
             # 3. Извлечение количества
             qty = self._extract_quantity(query)
 
-            result = {
-                "success": True,
-                "component_type": comp_type,
-                "original_query": query,
-                "extracted_data": params,
-                "quantity": qty,
-                "timestamp": ts
-            }
+            result = self._result(query, comp_type, params, search_params, qty, ts)
+            if uncertain is not None:
+                # Тип определил AI — пример для дообучения локальной модели
+                result["local_prediction"] = {"label": uncertain["label"], "confidence": uncertain["confidence"]}
+                candidates = self._candidates(comp_type, uncertain)
+                if candidates:
+                    result["candidates"] = candidates
 
-            logger.info(f"AI запрос успешно обработан. Тип: {comp_type}")
+            logger.info("AI запрос успешно обработан. Тип: %s", comp_type)
 
             return result
 
         except Exception as e:
-            logger.exception(f"Ошибка обработки AI запроса: {e}")
+            logger.exception("Ошибка обработки AI запроса: %s", e)
             return self._error(f"Ошибка ИИ: {e}", ts)
 
-    def process_batch(self, text: str) -> Dict[str, Any]:
-        """Пакетная обработка"""
+    def process_batch(self, text: str, lines: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Пакетная обработка.
+
+        Args:
+            text: Исходный текст заказа
+            lines: Уже разделённые строки (например, из импорта Excel) — разделение через AI пропускается
+        """
         ts = datetime.now().isoformat()
 
-        logger.info(f"Начало пакетной AI обработки")
+        logger.info("Начало пакетной AI обработки")
 
         try:
             # Разделение на строки
-            lines = self._split_batch(text)
+            if lines is None:
+                lines = self._split_batch(text)
             if not lines:
                 return self._error("Не удалось разделить текст на строки", ts)
 
-            # Обработка каждой строки
-            results = []
-            for i, line in enumerate(lines, 1):
-                logger.debug(f"Обработка строки {i}/{len(lines)}: {line[:50]}...")
-                result = self.process_single(line)
-                results.append(result)
+            pack_size = get_batch_pack_size()
+            if pack_size > 1 and len(lines) > 1:
+                # Несколько строк в одном запросе к AI
+                results = self._process_packed(lines, pack_size, ts)
+            else:
+                # Обработка каждой строки
+                results = []
+                for i, line in enumerate(lines, 1):
+                    logger.debug("Обработка строки %s/%s: %s...", i, len(lines), line[:50])
+                    result = self.process_single(line)
+                    results.append(result)
 
             batch_result = {
                 "success": True,
@@ -185,14 +299,136 @@ class AIProcessingService:
                 "timestamp": ts
             }
 
-            logger.info(f"Пакетная AI обработка завершена: {batch_result['processed_items']}/{len(lines)} успешно")
+            logger.info("Пакетная AI обработка завершена: %s/%s успешно", batch_result['processed_items'], len(lines))
 
             return batch_result
 
         except Exception as e:
-            logger.exception(f"Ошибка пакетной AI обработки: {e}")
+            logger.exception("Ошибка пакетной AI обработки: %s", e)
             return self._error(f"Ошибка пакетной обработки: {e}", ts)
 
+    @staticmethod
+    def _pack_lines(lines: List[str]) -> str:
+        """Строки заказа в одном сообщении: "[1] ...", "[2] ..." """
+        return "\n".join(f"[{i}] {line}" for i, line in enumerate(lines, 1))
+
+    def _classify_packed(self, lines: List[str]) -> Dict[int, str]:
+        """Классификация нескольких строк одним запросом: номер строки (с 1) → тип"""
+        try:
+            prompt = PromptRepository.get_batch_classify_prompt()
+            data = self.client.extract_json(
+                prompt, self._pack_lines(lines), task="batch_classify", schema=build_batch_classify_schema()
+            )
+        except Exception as e:
+            logger.exception("Ошибка пакетной классификации: %s", e)
+            return {}
+
+        allowed = {t.value for t in ComponentType}
+        types = {}
+        for index, item in unpack_batch_items(data, len(lines)).items():
+            comp_type = str(item.get("type") or "").lower().strip()
+            if comp_type in allowed:
+                types[index] = comp_type
+        return types
+
+    def _extract_packed(self, lines: List[str], component_type: str) -> Dict[int, Tuple[Dict, Dict, Optional[int]]]:
+        """
+        Извлечение параметров нескольких строк одного типа одним запросом.
+
+        Returns:
+            Dict: номер строки (с 1) → (параметры, параметры для БД, количество).
+            Строки без ответа или с ответом, не прошедшим проверку, отсутствуют.
+        """
+        try:
+            prompt = PromptRepository.get_batch_component_prompt(ComponentType(component_type))
+            data = self.client.extract_json(
+                prompt, self._pack_lines(lines), task="batch_extract",
+                schema=build_batch_response_schema(component_type)
+            )
+        except Exception as e:
+            logger.exception("Ошибка пакетного извлечения параметров для %s: %s", component_type, e)
+            return {}
+
+        extracted = {}
+        for index, item in unpack_batch_items(data, len(lines)).items():
+            quantity = parse_quantity(item.pop("quantity", None))
+            params, search_params = validate_params(component_type, item)
+            if not params and any(v is not None for v in item.values()):
+                # Значения есть, но ни одно не прошло проверку — переспрашиваем строку отдельно
+                logger.debug("Строка %s пакета %s не прошла проверку", index, component_type)
+                continue
+            extracted[index] = (params, search_params, quantity)
+        return extracted
+
+    def _process_packed(self, lines: List[str], pack_size: int, ts: str) -> List[Dict[str, Any]]:
+        """
+        Пакетная обработка по pack_size строк в запросе: классификация всех строк,
+        затем извлечение параметров группами одного типа. Строки, для которых
+        пакетный ответ не получен или не прошёл проверку, обрабатываются по одной.
+        """
+        total = len(lines)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+
+        with ThreadPoolExecutor(max_workers=get_max_concurrency()) as pool:
+            # 1. Классификация: уверенные ответы локальной модели, остальное — пакетами через AI
+            types = {}
+            for position, line in enumerate(lines):
+                local = self._classify_local(line)
+                if local:
+                    types[position] = local
+
+            remaining = [position for position in range(total) if position not in types]
+            offsets = list(range(0, len(remaining), pack_size))
+            chunks = pool.map(timing.bind(
+                lambda offset: self._classify_packed([lines[p] for p in remaining[offset:offset + pack_size]])
+            ), offsets)
+            for offset, classified in zip(offsets, chunks):
+                for index, comp_type in classified.items():
+                    types[remaining[offset + index - 1]] = comp_type
+
+            # 2. Извлечение параметров и количества — группами одного типа
+            by_type = defaultdict(list)
+            for position, comp_type in sorted(types.items()):
+                by_type[comp_type].append(position)
+
+            jobs = [
+                (comp_type, positions[start:start + pack_size])
+                for comp_type, positions in by_type.items()
+                for start in range(0, len(positions), pack_size)
+            ]
+            extracted = pool.map(timing.bind(
+                lambda job: self._extract_packed([lines[p] for p in job[1]], job[0])
+            ), jobs)
+            for (comp_type, positions), items in zip(jobs, extracted):
+                for index, (params, search_params, qty) in items.items():
+                    position = positions[index - 1]
+                    results[position] = self._result(lines[position], comp_type, params, search_params, qty, ts)
+
+            # 3. Запасной путь — по одной строке
+            fallback = [position for position, result in enumerate(results) if result is None]
+            for position, result in zip(fallback, pool.map(timing.bind(lambda p: self.process_single(lines[p])), fallback)):
+                results[position] = result
+
+        logger.info(
+            "Пакетная обработка: %s строк, %s пакетных запросов, %s строк обработано по одной",
+            total, len(offsets) + len(jobs), len(fallback)
+        )
+        return results
+
+    @staticmethod
+    def _result(query: str, comp_type: str, params: Dict[str, Any], search_params: Dict[str, Any],
+                qty: Optional[int], ts: str) -> Dict[str, Any]:
+        """Формирование успешного ответа по строке"""
+        return {
+            "success": True,
+            "component_type": comp_type,
+            "original_query": query,
+            "extracted_data": params,
+            "search_params": search_params,
+            "quantity": qty,
+            "timestamp": ts
+        }
+
     def _error(self, msg: str, ts: str) -> Dict[str, Any]:
         """Формирование ответа об ошибке"""
         error_result = {
@@ -200,7 +436,7 @@ class AIProcessingService:
             "error": msg,
             "timestamp": ts
         }
-        logger.error(f"AI обработка завершилась ошибкой: {msg}")
+        logger.error("AI обработка завершилась ошибкой: %s", msg)
         return error_result
 
     def health_check(self) -> Dict[str, Any]:
@@ -208,13 +444,15 @@ class AIProcessingService:
         try:
             # Простой тестовый запрос
             test_query = "гидравлический фитинг 1/2 BSP"
-            result = self._classify(test_query)
+            result = self._classify_llm(test_query)
 
             if result:
                 return {
                     "status": "healthy",
                     "ai_service": "operational",
                     "model": self.client.model,
+                    "models": self.client.router.snapshot() if self.client.router else {},
+                    "token_usage": self.client.usage.report(),
                     "test_query": test_query,
                     "test_result": result,
                     "timestamp": datetime.now().isoformat()
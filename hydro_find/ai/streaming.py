@@ -0,0 +1,105 @@
+# hydro_find/ai/streaming.py
+
+import json
+import logging
+from typing import Iterable, Optional
+
+from hydro_find.prompts import ComponentType, PreprocessingTask
+
+logger = logging.getLogger(__name__)
+
+_WORD_DELIMITERS = set(" \t\r\n.,;:!\"'`")
+
+
+class JSONObjectTerminator:
+    """
+    Инкрементальный разбор потока: ответ готов, как только закрыт
+    первый сбалансированный JSON-объект (скобки внутри строк не считаются).
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        for char in chunk:
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._complete()
+        return None
+
+    def _complete(self) -> Optional[str]:
+        text = "".join(self._buffer)
+        try:
+            json.loads(text)
+        except json.JSONDecodeError:
+            # Сбалансированный, но невалидный объект — дочитываем ответ целиком
+            logger.debug("Сбалансированный JSON не прошёл разбор, продолжаем чтение потока")
+            self._reset()
+            return None
+        return text
+
+    def _reset(self):
+        self._buffer = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+
+class EnumTerminator:
+    """Ответ готов, как только получено одно из допустимых значений целиком"""
+
+    def __init__(self, values: Iterable[str]):
+        self.values = {v.lower() for v in values}
+        self._text = ""
+
+    def feed(self, chunk: str) -> Optional[str]:
+        self._text += chunk
+        cleaned = self._text.lower().lstrip(" \t\r\n\"'`")
+
+        # Слово закончилось разделителем — проверяем первое слово
+        for i, char in enumerate(cleaned):
+            if char in _WORD_DELIMITERS:
+                word = cleaned[:i]
+                return word if word in self.values else None
+
+        # Слово ещё может продолжиться (banjo → banjo-bolt)
+        if cleaned in self.values and not any(
+                v != cleaned and v.startswith(cleaned) for v in self.values
+        ):
+            return cleaned
+        return None
+
+
+def terminator_for(task: Optional[str]):
+    """Условие ранней остановки потока для задачи (None — читаем до конца)"""
+    if task == PreprocessingTask.CLASSIFY.value:
+        return EnumTerminator(t.value for t in ComponentType)
+    if task == "extract":
+        return JSONObjectTerminator()
+    return None
@@ -0,0 +1,37 @@
+# hydro_find/ai/usage.py
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+
+class TokenUsageTracker:
+    """Накопление расхода токенов по типам задач (для отчёта tokens/request)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: {"requests": 0, "prompt": 0, "completion": 0, "cached": 0})
+
+    def record(self, task: Optional[str], prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        with self._lock:
+            totals = self._totals[task or "default"]
+            totals["requests"] += 1
+            totals["prompt"] += prompt_tokens
+            totals["completion"] += completion_tokens
+            totals["cached"] += cached_tokens
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Средние токены на запрос по задачам и доля входных токенов из кэша провайдера"""
+        with self._lock:
+            items = [(task, dict(totals)) for task, totals in self._totals.items()]
+
+        report = {}
+        for task, totals in items:
+            requests = totals["requests"] or 1
+            report[task] = {
+                "requests": totals["requests"],
+                "prompt_tokens_per_request": round(totals["prompt"] / requests, 1),
+                "completion_tokens_per_request": round(totals["completion"] / requests, 1),
+                "cached_prompt_ratio": round(totals["cached"] / totals["prompt"], 3) if totals["prompt"] else 0.0,
+            }
+        return report
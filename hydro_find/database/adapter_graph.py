@@ -0,0 +1,198 @@
+# hydro_find/database/adapter_graph.py
+
+import heapq
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .enums import THREAD_LABELS, Armature, Standard, parse_armature, parse_standard, parse_thread
+
+logger = logging.getLogger(__name__)
+
+_THREAD_NAMES = {thread: label for label, thread in THREAD_LABELS.items()}
+
+# Тройник в цепочке работает как переходник, но хуже: лишний выход нужно глушить
+_EDGE_COST = {"adapters": 1.0, "adapter-tee": 1.5}
+
+
+class Port(NamedTuple):
+    """Присоединение: стандарт, резьба и арматура (None — не важна)"""
+    standard: int
+    thread: int
+    armature: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self.standard, self.thread
+
+    def label(self) -> str:
+        parts = [Standard(self.standard).name, _THREAD_NAMES.get(self.thread, str(self.thread))]
+        if self.armature is not None:
+            parts.append(Armature(self.armature).name.lower())
+        return " ".join(parts)
+
+
+def parse_port(text: str) -> Optional[Port]:
+    """
+    Присоединение из строки: «BSP 1/2», «JIC 3/4 гайка», «DKOL M16x1.5 штуцер».
+
+    Returns:
+        Port или None, если не найден стандарт или резьба
+    """
+    standard = thread = armature = None
+    rest = []
+    for token in str(text).split():
+        if standard is None and parse_standard(token) is not None:
+            standard = parse_standard(token)
+        elif thread is None and parse_thread(token) is not None:
+            thread = parse_thread(token)
+        else:
+            rest.append(token)
+    if rest:
+        armature = parse_armature(" ".join(rest))
+        if armature is None:
+            return None
+    if standard is None or thread is None:
+        return None
+    return Port(int(standard), int(thread), int(armature) if armature is not None else None)
+
+
+def mates(a: Optional[int], b: Optional[int]) -> bool:
+    """Гайка соединяется со штуцером; неизвестная арматура — с чем угодно"""
+    if a is None or b is None:
+        return True
+    return (a == Armature.NUT) != (b == Armature.NUT)
+
+
+@dataclass(frozen=True)
+class _Edge:
+    ref: int                 # номер переходника в списке графа
+    end: Port                # присоединение, которым переходник подключается
+    out: Port                # присоединение, которое остаётся свободным
+    cost: float
+
+
+class AdapterGraph:
+    """
+    Граф соединений переходников и тройников: вершины — присоединения
+    (стандарт, резьба, арматура), рёбра — переходники. Строится в памяти из
+    таблиц adapters и adapter_tees и перестраивается раз в ttl секунд или
+    после invalidate(). Поиск цепочек — по возрастанию стоимости с
+    ограничением длины цепочки и числа раскрытых вершин.
+    """
+
+    def __init__(self, repository, ttl: float = 600.0, max_expansions: int = 20000):
+        """
+        Args:
+            repository: ComponentRepository (iter_adapter_ports)
+            ttl: Период перестроения графа, с
+            max_expansions: Верхняя граница числа раскрытых путей в одном поиске
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self.max_expansions = max_expansions
+        # (переходники, рёбра по присоединению) — заменяются одним присваиванием
+        self._graph: Tuple[List[Dict[str, Any]], Dict[Tuple[int, int], List[_Edge]]] = ([], {})
+        self._built_at: Optional[float] = None
+        self._rebuilding = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    def __len__(self):
+        return len(self._graph[0])
+
+    def rebuild(self):
+        """Полное перестроение графа (атомарная замена)"""
+        started = time.monotonic()
+        adapters: List[Dict[str, Any]] = []
+        edges: Dict[Tuple[int, int], List[_Edge]] = {}
+        for category, component_id, article, name, ports in self.repository.iter_adapter_ports():
+            ports = [Port(*p) for p in ports if p[0] and p[1]]
+            if len(ports) < 2:
+                continue
+            ref = len(adapters)
+            adapters.append({"component_type": category, "id": component_id, "article": article, "name": name})
+            cost = _EDGE_COST.get(category, 1.0)
+            # Любые два выхода тройника образуют проход
+            for i, end in enumerate(ports):
+                for j, out in enumerate(ports):
+                    if i != j:
+                        edges.setdefault(end.key, []).append(_Edge(ref, end, out, cost))
+
+        self._graph = (adapters, edges)
+        self._built_at = time.monotonic()
+        logger.info("Граф переходников: %s переходников, %s присоединений за %.2f с",
+                    len(adapters), len(edges), self._built_at - started)
+
+    def invalidate(self):
+        """Перестроить граф при следующем поиске (каталог изменился)"""
+        self._built_at = None
+
+    def _stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > self.ttl
+
+    def _ensure_fresh(self):
+        if self._stale():
+            with self._rebuilding:
+                if self._stale():
+                    self.rebuild()
+
+    def find_chains(self, source: Port, target: Port, max_length: int = 3, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Лучшие цепочки переходников от source к target.
+
+        Args:
+            source: Имеющееся присоединение
+            target: Присоединение, к которому нужно подключиться
+            max_length: Наибольшее число переходников в цепочке
+            limit: Число цепочек
+
+        Returns:
+            [{"length", "cost", "adapters": [{..., "in", "out"}]}] по возрастанию стоимости
+        """
+        self._ensure_fresh()
+        adapters, edges = self._graph
+
+        chains: List[Dict[str, Any]] = []
+        # Одни и те же переходники через разные выходы тройника — одна цепочка
+        found = set()
+        # (стоимость, порядковый номер, свободное присоединение, путь из рёбер)
+        heap: List[Tuple[float, int, Port, Tuple[_Edge, ...]]] = [(0.0, 0, source, ())]
+        counter = expansions = 0
+        while heap and len(chains) < limit and expansions < self.max_expansions:
+            cost, _, port, path = heapq.heappop(heap)
+            expansions += 1
+            if path and port.key == target.key and mates(port.armature, target.armature):
+                refs = tuple(edge.ref for edge in path)
+                if refs not in found:
+                    found.add(refs)
+                    chains.append(self._chain(adapters, path, cost))
+                continue
+            if len(path) >= max_length:
+                continue
+
+            used = {edge.ref for edge in path}
+            visited = {source.key} | {edge.out.key for edge in path}
+            for edge in edges.get(port.key, ()):
+                if edge.ref in used or not mates(port.armature, edge.end.armature):
+                    continue
+                # Возврат к уже пройденному присоединению не приближает к цели
+                if edge.out.key in visited and edge.out.key != target.key:
+                    continue
+                counter += 1
+                heapq.heappush(heap, (cost + edge.cost, counter, edge.out, path + (edge,)))
+        return chains
+
+    @staticmethod
+    def _chain(adapters: List[Dict[str, Any]], path: Tuple[_Edge, ...], cost: float) -> Dict[str, Any]:
+        return {
+            "length": len(path),
+            "cost": cost,
+            "adapters": [
+                {**adapters[edge.ref], "in": edge.end.label(), "out": edge.out.label()} for edge in path
+            ],
+        }
@@ -0,0 +1,125 @@
+# hydro_find/database/article_index.py
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import CATEGORY_TO_MODEL
+
+logger = logging.getLogger(__name__)
+
+_CATEGORIES = list(CATEGORY_TO_MODEL)
+_ID_BITS = 40
+
+
+def normalize_article(article: str) -> str:
+    """Артикул без регистра и внешних пробелов"""
+    return str(article).strip().upper()
+
+
+def _pack(category: str, component_id: int) -> int:
+    # Одно целое на запись вместо кортежа: индекс на сотни тысяч артикулов остаётся компактным
+    return (_CATEGORIES.index(category) << _ID_BITS) | component_id
+
+
+def _unpack(value: int) -> Tuple[str, int]:
+    return _CATEGORIES[value >> _ID_BITS], value & ((1 << _ID_BITS) - 1)
+
+
+class ArticleIndex:
+    """
+    Индекс артикулов всех категорий в памяти: артикул → (категория, id).
+    Поиск по артикулу — O(1) без запросов по всем таблицам; сам компонент
+    читается по первичному ключу. Индекс перестраивается в фоне раз в ttl секунд,
+    до первой загрузки поиск идёт напрямую по таблицам.
+    """
+
+    def __init__(self, repository, ttl: float = 300.0):
+        """
+        Args:
+            repository: ComponentRepository (iter_articles, get_by_id, find_by_article_any)
+            ttl: Период перестроения индекса, с
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self._index: Optional[Dict[str, int]] = None
+        # Совпадающие артикулы в разных категориях — редкость, храним отдельно
+        self._duplicates: Dict[str, List[int]] = {}
+        self._loaded_at = 0.0
+        self._refreshing = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def __len__(self):
+        return len(self._index or {})
+
+    def refresh(self):
+        """Полное перестроение индекса (атомарная замена)"""
+        started = time.monotonic()
+        index: Dict[str, int] = {}
+        duplicates: Dict[str, List[int]] = {}
+        for category, component_id, article in self.repository.iter_articles():
+            key = normalize_article(article)
+            packed = _pack(category, component_id)
+            if key in index:
+                duplicates.setdefault(key, [index[key]]).append(packed)
+            else:
+                index[key] = packed
+
+        self._index, self._duplicates = index, duplicates
+        self._loaded_at = time.monotonic()
+        logger.info("Индекс артикулов: %s записей за %.2f с", len(index), self._loaded_at - started)
+
+    def refresh_async(self) -> bool:
+        """Перестроение в фоновом потоке; False — уже идёт"""
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Ошибка построения индекса артикулов: %s", e)
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="article-index", daemon=True).start()
+        return True
+
+    def add(self, category: str, component_id: int, article: str):
+        """Добавление/обновление одной записи без перестроения"""
+        if self._index is not None:
+            self._index[normalize_article(article)] = _pack(category, component_id)
+
+    def lookup(self, article: str) -> List[Tuple[str, int]]:
+        """(категория, id) для артикула; пустой список, если индекс не загружен или артикула нет"""
+        if self._index is None:
+            return []
+        key = normalize_article(article)
+        if key in self._duplicates:
+            return [_unpack(v) for v in self._duplicates[key]]
+        packed = self._index.get(key)
+        return [_unpack(packed)] if packed is not None else []
+
+    def find(self, article: str) -> List[Dict[str, Any]]:
+        """Компоненты с точным артикулом"""
+        if self._index is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh_async()
+        if self._index is None:
+            item = self.repository.find_by_article_any(article.strip())
+            return [item] if item else []
+
+        items = []
+        for category, component_id in self.lookup(article):
+            item = self.repository.get_by_id(category, component_id)
+            if item is not None:
+                items.append(item)
+        return items
+
+    def find_by_article_any(self, article: str) -> Optional[Dict[str, Any]]:
+        """Первый компонент с артикулом — совместимо с ComponentRepository"""
+        items = self.find(article)
+        return items[0] if items else None
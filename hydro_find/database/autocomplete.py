@@ -0,0 +1,213 @@
+# hydro_find/database/autocomplete.py
+
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Кириллические буквы, совпадающие по начертанию с латинскими: артикулы часто
+# набирают в русской раскладке («АВ-12» вместо «AB-12»)
+_HOMOGLYPHS = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x",
+})
+# Разделители не участвуют в сравнении: DKOL-12, DKOL 12 и DKOL12 — одно и то же
+_SEPARATORS_RE = re.compile(r"[\s\-_./\\,]+")
+
+_FIELDS = ("article", "name", "s_key")
+
+
+def fold(text: str) -> str:
+    """Ключ для сравнения префиксов: нижний регистр, латиница вместо похожей кириллицы, без разделителей"""
+    return _SEPARATORS_RE.sub("", str(text).lower().translate(_HOMOGLYPHS))
+
+
+def _keys(field: str, value: str) -> List[str]:
+    """Ключи одного поля: у названия — с начала каждого слова («фитинг BSP 1/2» находится по «bsp»)"""
+    if field != "name":
+        key = fold(value)
+        return [key] if key else []
+    words = value.split()
+    keys = [fold(" ".join(words[i:])) for i in range(len(words))]
+    return [key for key in keys if key]
+
+
+class AutocompleteIndex:
+    """
+    Подсказки по префиксу артикула, названия и s_key всех категорий.
+    Отсортированный массив ключей + bisect: поиск — O(log n + limit) без
+    запросов к БД. Новые записи (id больше загруженного) догружаются
+    инкрементально раз в refresh_interval секунд, полное перестроение —
+    раз в ttl секунд (изменения и удаления).
+    """
+
+    def __init__(self, repository, ttl: float = 3600.0, refresh_interval: float = 60.0, max_limit: int = 50):
+        """
+        Args:
+            repository: ComponentRepository (iter_search_fields)
+            ttl: Период полного перестроения, с
+            refresh_interval: Период догрузки новых записей, с
+            max_limit: Верхняя граница числа подсказок в ответе
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.max_limit = max_limit
+        # Параллельные массивы: ключи отсортированы, _refs[i] — номер записи в _items
+        self._keys: List[str] = []
+        self._refs: List[int] = []
+        self._items: List[Tuple[str, int, str, str, Optional[str]]] = []
+        self._max_ids: Dict[str, int] = {}
+        self._loaded = False
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._refreshing = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _entries(rows: Iterable[Tuple[str, int, str, str, Optional[str]]], offset: int):
+        """(ключ, номер записи) для строк репозитория и сами записи"""
+        items, entries = [], []
+        for category, component_id, article, name, s_key in rows:
+            ref = offset + len(items)
+            items.append((category, component_id, article, name, s_key))
+            for field, value in zip(_FIELDS, (article, name, s_key)):
+                if value:
+                    entries.extend((key, ref) for key in _keys(field, value))
+        entries.sort()
+        return items, entries
+
+    def _note_ids(self, items, max_ids: Dict[str, int]):
+        for category, component_id, *_ in items:
+            if component_id > max_ids.get(category, 0):
+                max_ids[category] = component_id
+
+    def rebuild(self):
+        """Полное перестроение (атомарная замена массивов)"""
+        started = time.monotonic()
+        items, entries = self._entries(self.repository.iter_search_fields(), 0)
+        max_ids: Dict[str, int] = {}
+        self._note_ids(items, max_ids)
+
+        with self._lock:
+            self._items = items
+            self._keys = [key for key, _ in entries]
+            self._refs = [ref for _, ref in entries]
+            self._max_ids = max_ids
+            self._loaded = True
+        self._built_at = self._checked_at = time.monotonic()
+        logger.info("Индекс подсказок: %s записей, %s ключей за %.2f с",
+                    len(items), len(entries), self._built_at - started)
+
+    def refresh(self) -> int:
+        """
+        Догрузка записей, добавленных после последней загрузки.
+
+        Returns:
+            Число добавленных записей
+        """
+        if not self._loaded:
+            self.rebuild()
+            return len(self._items)
+
+        items, entries = self._entries(self.repository.iter_search_fields(after_ids=dict(self._max_ids)),
+                                       len(self._items))
+        self._checked_at = time.monotonic()
+        if not items:
+            return 0
+
+        # Слияние двух отсортированных последовательностей — O(n + m) вместо пересортировки
+        merged = list(heapq.merge(zip(self._keys, self._refs), entries))
+        max_ids = dict(self._max_ids)
+        self._note_ids(items, max_ids)
+        with self._lock:
+            self._items = self._items + items
+            self._keys = [key for key, _ in merged]
+            self._refs = [ref for _, ref in merged]
+            self._max_ids = max_ids
+        logger.info("Индекс подсказок: добавлено %s записей", len(items))
+        return len(items)
+
+    def refresh_async(self, full: bool = False) -> bool:
+        """Обновление в фоновом потоке; False — уже идёт"""
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self.rebuild() if full else self.refresh()
+            except Exception as e:
+                logger.error("Ошибка обновления индекса подсказок: %s", e)
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="autocomplete-index", daemon=True).start()
+        return True
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if not self._loaded or now - self._built_at > self.ttl:
+            self.refresh_async(full=True)
+        elif now - self._checked_at > self.refresh_interval:
+            self.refresh_async()
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Подсказки по префиксу: по одной на компонент, в порядке ключей.
+
+        Args:
+            prefix: Начало артикула, названия или s_key
+            limit: Число подсказок (не больше max_limit)
+
+        Returns:
+            Список {"component_type", "id", "article", "name", "s_key", "field"};
+            пустой, пока индекс не загружен
+        """
+        self._maybe_refresh()
+        key = fold(prefix)
+        limit = max(1, min(limit, self.max_limit))
+        if not key:
+            return []
+
+        with self._lock:
+            keys, refs, items = self._keys, self._refs, self._items
+
+        suggestions: List[Dict[str, Any]] = []
+        seen = set()
+        i = bisect_left(keys, key)
+        while i < len(keys) and len(suggestions) < limit and keys[i].startswith(key):
+            ref = refs[i]
+            i += 1
+            if ref in seen:
+                continue
+            seen.add(ref)
+            category, component_id, article, name, s_key = items[ref]
+            suggestions.append({
+                "component_type": category,
+                "id": component_id,
+                "article": article,
+                "name": name,
+                "s_key": s_key,
+                "field": self._matched_field(key, article, s_key),
+            })
+        return suggestions
+
+    @staticmethod
+    def _matched_field(key: str, article: str, s_key: Optional[str]) -> str:
+        if article and fold(article).startswith(key):
+            return "article"
+        if s_key and fold(s_key).startswith(key):
+            return "s_key"
+        return "name"
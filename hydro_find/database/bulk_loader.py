@@ -0,0 +1,481 @@
+# hydro_find/database/bulk_loader.py
+
+import csv
+import itertools
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Integer, SmallInteger, or_, select
+
+from hydro_find.tabular import cell_to_str, iter_rows
+
+from .enums import (
+    ARMATURE_LABELS, SERIES_LABELS, THREAD_LABELS, Angle, Armature, Series, Standard, Thread,
+    parse_angle, parse_armature, parse_series, parse_standard, parse_thread
+)
+from .models import CATEGORY_TO_MODEL
+
+logger = logging.getLogger(__name__)
+
+_MAX_ERRORS = 20
+_TRUE_VALUES = {"1", "true", "yes", "y", "да", "+"}
+_FALSE_VALUES = {"0", "false", "no", "n", "нет", "-"}
+
+
+class _EnumLookup:
+    """
+    Разбор обозначения перечисления через заранее построенную таблицу
+    «обозначение → id»; редкие написания разбираются parse_* один раз
+    и дописываются в таблицу.
+    """
+
+    def __init__(self, table: Dict[str, int], parse: Callable[[str], Any]):
+        self.table = table
+        self.parse = parse
+
+    def __call__(self, value: str) -> int:
+        key = value.upper()
+        if key not in self.table:
+            member = self.parse(value)
+            if member is None:
+                raise ValueError(f"неизвестное значение «{value}»")
+            self.table[key] = int(member)
+        return self.table[key]
+
+
+def _enum_table(enum_class, labels: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    table = {name.upper(): int(member) for name, member in enum_class.__members__.items()}
+    table.update({label.upper(): int(member) for label, member in (labels or {}).items()})
+    return table
+
+
+def _enum_lookups() -> Dict[str, _EnumLookup]:
+    """Таблицы разбора для префиксов колонок *_id (новые на каждую загрузку — дописываются при разборе)"""
+    return {
+        "standard": _EnumLookup(_enum_table(Standard), parse_standard),
+        "thread": _EnumLookup(_enum_table(Thread, THREAD_LABELS), parse_thread),
+        "armature": _EnumLookup(_enum_table(Armature, ARMATURE_LABELS), parse_armature),
+        "angle": _EnumLookup(_enum_table(Angle), parse_angle),
+        "seria": _EnumLookup(_enum_table(Series, SERIES_LABELS), parse_series),
+    }
+
+
+_ENUMS = {"standard": Standard, "thread": Thread, "armature": Armature, "angle": Angle, "seria": Series}
+
+
+def _parse_int(value: str) -> int:
+    return int(float(value.replace(",", ".")))
+
+
+def _parse_bool(value: str) -> bool:
+    text = value.lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    raise ValueError(f"не булево значение «{value}»")
+
+
+def _enum_id(enum_class) -> Callable[[str], int]:
+    """Разбор id значения перечисления (колонки *_id в файле)"""
+    def parse(value: str) -> int:
+        number = _parse_int(value)
+        if number not in enum_class._value2member_map_:
+            raise ValueError(f"неизвестный id {enum_class.__name__} «{value}»")
+        return number
+    return parse
+
+
+@dataclass
+class ColumnSpec:
+    """Колонка таблицы и её возможные заголовки в файле: заголовок → разбор значения"""
+    name: str
+    headers: Dict[str, Callable[[str], Any]]
+    required: bool = False
+
+
+def column_specs(category: str) -> List[ColumnSpec]:
+    """
+    Колонки загрузки для категории: все колонки модели, кроме id и updated_at
+    (время изменения проставляет загрузка).
+    Колонки *_id принимают обозначение (заголовок без _id: standard_1 = BSP)
+    или сам id (заголовок standard_1_id = 1).
+    """
+    model_class = CATEGORY_TO_MODEL[category]
+    lookups = _enum_lookups()
+    specs = []
+    for column in model_class.__table__.columns:
+        if column.name in ("id", "updated_at"):
+            continue
+        name = column.name
+        prefix = re.sub(r"_\d$", "", name[:-3]) if name.endswith("_id") else None
+        if prefix in lookups:
+            specs.append(ColumnSpec(name, {
+                name[:-3].lower(): lookups[prefix],
+                name.lower(): _enum_id(_ENUMS[prefix]),
+            }))
+        elif isinstance(column.type, Boolean):
+            specs.append(ColumnSpec(name, {name.lower(): _parse_bool}))
+        elif isinstance(column.type, (Integer, SmallInteger)):
+            specs.append(ColumnSpec(name, {name.lower(): _parse_int}))
+        else:
+            specs.append(ColumnSpec(name, {name.lower(): str}, required=not column.nullable))
+    return specs
+
+
+@dataclass
+class LoadReport:
+    """Итог загрузки файла"""
+    category: str
+    rows_read: int = 0
+    rows_loaded: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append(f"строка {line}: {message}")
+
+
+class Progress:
+    """Периодический отчёт о числе строк и скорости, строк/с"""
+
+    def __init__(self, every: int = 100000, output: Callable[[str], None] = print):
+        self.every = every
+        self.output = output
+        self.started = time.perf_counter()
+        self._next = every
+
+    def update(self, rows: int):
+        if self.every and rows >= self._next:
+            elapsed = time.perf_counter() - self.started
+            self.output(f"  {rows:_} строк, {rows / elapsed:_.0f} строк/с".replace("_", " "))
+            self._next += self.every
+
+
+FileColumn = Tuple[ColumnSpec, int, Callable[[str], Any]]
+
+
+def file_columns(header: List[Any], category: str) -> List[FileColumn]:
+    """
+    Колонки таблицы, найденные в заголовке файла: (колонка, позиция, разбор).
+    Колонок, которых нет в файле, загрузка не касается.
+
+    Raises:
+        ValueError: В файле нет обязательной колонки (article, name)
+    """
+    normalized = [cell_to_str(h).lower() for h in header]
+    columns = []
+    for spec in column_specs(category):
+        found = next((h for h in spec.headers if h in normalized), None)
+        if found is None:
+            if spec.required:
+                raise ValueError(f"В файле нет обязательной колонки {spec.name}")
+            continue
+        columns.append((spec, normalized.index(found), spec.headers[found]))
+    return columns
+
+
+def iter_records(rows: Iterable[List[Any]], columns: List[FileColumn], report: LoadReport,
+                 progress: Optional[Progress] = None) -> Iterator[Tuple[Any, ...]]:
+    """
+    Строки файла без заголовка → кортежи значений в порядке columns.
+    Строки с ошибками пропускаются и попадают в отчёт.
+    """
+    for line, row in enumerate(rows, start=2):
+        report.rows_read += 1
+        if progress is not None:
+            progress.update(report.rows_read)
+        try:
+            values = []
+            for spec, position, parse in columns:
+                text = cell_to_str(row[position]) if position < len(row) else ""
+                if not text:
+                    if spec.required:
+                        raise ValueError(f"пустое значение {spec.name}")
+                    values.append(None)
+                else:
+                    values.append(parse(text))
+        except ValueError as e:
+            report.add_error(line, str(e))
+            continue
+        yield tuple(values)
+
+
+class PostgresCopyLoader:
+    """
+    Загрузка в PostgreSQL: COPY во временную таблицу, затем одна вставка
+    INSERT ... ON CONFLICT (article) DO UPDATE. Неизменившиеся строки не
+    переписываются, у изменённых обновляется updated_at. Вся загрузка
+    файла — одна транзакция.
+    """
+
+    def __init__(self, conninfo: str):
+        self.conninfo = conninfo
+
+    def load(self, category: str, columns: List[str], records: Iterable[Tuple[Any, ...]], report: LoadReport):
+        import psycopg
+        from psycopg import sql
+
+        table = CATEGORY_TO_MODEL[category].__tablename__
+        stage = f"_stage_{table}"
+        column_list = sql.SQL(", ").join(sql.Identifier(c) for c in columns)
+        updated_columns = [c for c in columns if c != "article"]
+
+        with psycopg.connect(self.conninfo) as connection, connection.cursor() as cursor:
+            cursor.execute(sql.SQL(
+                "CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+            ).format(stage=sql.Identifier(stage), columns=column_list, table=sql.Identifier(table)))
+            # Порядок строк файла: при повторе артикула побеждает последняя
+            cursor.execute(sql.SQL("ALTER TABLE {stage} ADD COLUMN _row BIGSERIAL").format(
+                stage=sql.Identifier(stage)))
+
+            with cursor.copy(sql.SQL("COPY {stage} ({columns}) FROM STDIN").format(
+                    stage=sql.Identifier(stage), columns=column_list)) as copy:
+                for record in records:
+                    copy.write_row(record)
+                    report.rows_loaded += 1
+
+            cursor.execute(sql.SQL("""
+                WITH upserted AS (
+                    INSERT INTO {table} ({columns}, updated_at)
+                    SELECT DISTINCT ON (article) {columns}, now() FROM {stage} ORDER BY article, _row DESC
+                    ON CONFLICT (article) DO UPDATE SET {assignments}, updated_at = now()
+                    WHERE ({current}) IS DISTINCT FROM ({excluded})
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+            """).format(
+                table=sql.Identifier(table),
+                columns=column_list,
+                stage=sql.Identifier(stage),
+                assignments=sql.SQL(", ").join(
+                    sql.SQL("{c} = EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in updated_columns),
+                current=sql.SQL(", ").join(sql.Identifier(table, c) for c in updated_columns),
+                excluded=sql.SQL(", ").join(sql.SQL("EXCLUDED.{c}").format(c=sql.Identifier(c))
+                                            for c in updated_columns),
+            ))
+            report.inserted, report.updated = cursor.fetchone()
+
+
+def dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Upsert не поддерживается для {dialect_name}")
+    return insert
+
+
+class SqlAlchemyUpsertLoader:
+    """
+    Загрузка пачками INSERT ... ON CONFLICT через SQLAlchemy: файлы — для
+    SQLite (тесты, локальная разработка), пачки синхронизации каталога —
+    для SQLite и PostgreSQL.
+    """
+
+    def __init__(self, engine, batch_size: int = 5000):
+        self.engine = engine
+        self.batch_size = batch_size
+
+    def load(self, category: str, columns: List[str], records: Iterable[Tuple[Any, ...]], report: LoadReport):
+        now = datetime.now(timezone.utc)
+        records = iter(records)
+        with self.engine.begin() as connection:
+            while True:
+                batch = [dict(zip(columns, record), updated_at=now)
+                         for record in itertools.islice(records, self.batch_size)]
+                if not batch:
+                    break
+                self.upsert(connection, category, batch, report)
+
+    @staticmethod
+    def upsert(connection, category: str, batch: List[Dict[str, Any]], report: LoadReport):
+        """
+        Пачка записей (колонка → значение, без id) по article. Записи без
+        изменений не переписываются и, как в PostgresCopyLoader, не считаются
+        обновлёнными: updated — записи, в которых изменилось хотя бы одно значение.
+        """
+        table = CATEGORY_TO_MODEL[category].__table__
+        report.rows_loaded += len(batch)
+        # При повторе артикула в пачке побеждает последняя запись
+        batch = list({values["article"]: values for values in batch}.values())
+        changed = [c for c in batch[0] if c not in ("article", "updated_at")]
+        existing = {row[0]: row[1:] for row in connection.execute(
+            select(table.c.article, *(table.c[c] for c in changed))
+            .where(table.c.article.in_([values["article"] for values in batch])))}
+
+        statement = dialect_insert(connection.dialect.name)(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["article"],
+            set_={c: statement.excluded[c] for c in batch[0] if c != "article"},
+            where=or_(*(table.c[c].is_distinct_from(statement.excluded[c]) for c in changed)),
+        )
+        connection.execute(statement, batch)
+        # Та же проверка, что в WHERE: обновлены только записи, где значение отличается от сохранённого
+        report.updated += sum(
+            1 for values in batch
+            if values["article"] in existing
+            and tuple(values[c] for c in changed) != tuple(existing[values["article"]])
+        )
+        report.inserted += len(batch) - len(existing)
+
+
+def create_loader(db=None, batch_size: int = 5000):
+    """Загрузчик под диалект подключения: COPY для PostgreSQL, пачки INSERT для SQLite"""
+    from .connection import DatabaseConnection
+
+    db = db or DatabaseConnection()
+    # Загрузчики пишут updated_at — колонка должна быть и в БД, созданной до её появления
+    db.upgrade_schema()
+    url = db.engine.url
+    if url.get_backend_name() == "postgresql":
+        return PostgresCopyLoader(url.set(drivername="postgresql").render_as_string(hide_password=False))
+    if url.get_backend_name() == "sqlite":
+        return SqlAlchemyUpsertLoader(db.engine, batch_size)
+    raise ValueError(f"Массовая загрузка не поддерживается для {url.get_backend_name()}")
+
+
+def load_file(stream: BinaryIO, filename: str, category: str, loader=None,
+              progress: Optional[Progress] = None) -> LoadReport:
+    """
+    Загрузка CSV/XLSX в таблицу категории.
+
+    Args:
+        stream: Бинарный поток файла
+        filename: Имя файла (формат — по расширению)
+        category: Тип компонента (ключ CATEGORY_TO_MODEL)
+        loader: PostgresCopyLoader/SqlAlchemyUpsertLoader; None — только разбор (проверка файла)
+        progress: Отчёт о ходе загрузки
+
+    Returns:
+        LoadReport
+    """
+    if category not in CATEGORY_TO_MODEL:
+        raise ValueError(f"Неизвестный тип компонента: {category}")
+    report = LoadReport(category)
+    started = time.perf_counter()
+    rows = iter_rows(stream, filename)
+    header = next(rows, None)
+    if header is None:
+        return report
+    columns = file_columns(header, category)
+    records = iter_records(rows, columns, report, progress)
+    if loader is None:
+        for _ in records:
+            report.rows_loaded += 1
+    else:
+        loader.load(category, [spec.name for spec, _, _ in columns], records, report)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def generate_rows(category: str, rows: int, seed: int = 42) -> Iterator[List[Any]]:
+    """Синтетический каталог: заголовок и rows строк со случайными обозначениями перечислений"""
+    rng = random.Random(seed)
+    specs = column_specs(category)
+    choices = {
+        "standard": list(Standard.__members__),
+        "thread": list(THREAD_LABELS),
+        "armature": list(ARMATURE_LABELS),
+        "angle": [str(int(a)) for a in Angle],
+        "seria": ["L", "S"],
+    }
+    headers = [next(iter(spec.headers)) for spec in specs]
+    yield headers
+    for i in range(1, rows + 1):
+        row = []
+        for spec, header in zip(specs, headers):
+            prefix = re.sub(r"_\d$", "", header)
+            parse = spec.headers[header]
+            if spec.name == "article":
+                row.append(f"SYN-{category}-{i:07d}")
+            elif spec.name == "name":
+                row.append(f"Синтетический {category} {i}")
+            elif prefix in choices:
+                row.append(rng.choice(choices[prefix]))
+            elif parse is _parse_bool:
+                row.append(rng.choice(["0", "1"]))
+            elif parse is _parse_int:
+                row.append(str(rng.choice([6, 8, 10, 12, 16, 20, 25])))
+            else:
+                row.append(f"S{rng.randint(10, 60)}")
+        yield row
+
+
+def write_csv(path: str, rows: Iterable[Sequence[Any]]) -> int:
+    """Запись строк в CSV; возвращает число строк без заголовка"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        count = -1
+        for count, row in enumerate(rows):
+            writer.writerow(row)
+    return max(count, 0)
+
+
+def main():
+    """CLI: загрузка каталога из CSV/XLSX и генерация синтетических файлов"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Массовая загрузка каталога компонентов')
+    subparsers = parser.add_subparsers(dest='command', help='Команды')
+
+    load_parser = subparsers.add_parser('load', help='Загрузить CSV/XLSX в таблицу типа (upsert по article)')
+    load_parser.add_argument('category', choices=list(CATEGORY_TO_MODEL), help='Тип компонента')
+    load_parser.add_argument('path', help='Файл CSV/XLSX с заголовком')
+    load_parser.add_argument('--dry-run', action='store_true', help='Только разобрать файл, без записи в БД')
+    load_parser.add_argument('--batch-size', type=int, default=5000, help='Размер пачки (не для COPY)')
+    load_parser.add_argument('--progress-every', type=int, default=100000, help='Отчёт каждые N строк')
+
+    generate_parser = subparsers.add_parser('generate', help='Синтетический CSV для замера скорости')
+    generate_parser.add_argument('category', choices=list(CATEGORY_TO_MODEL), help='Тип компонента')
+    generate_parser.add_argument('path', help='Файл CSV')
+    generate_parser.add_argument('--rows', type=int, default=1000000, help='Число строк')
+    generate_parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'load':
+        loader = None if args.dry_run else create_loader(batch_size=args.batch_size)
+        with open(args.path, 'rb') as f:
+            report = load_file(f, args.path, args.category, loader, Progress(args.progress_every))
+        print(f"{'Разобрано' if args.dry_run else 'Загружено'} {report.rows_loaded} из {report.rows_read} строк "
+              f"за {report.seconds:.1f} с ({report.rows_per_second:_.0f} строк/с)".replace("_", " "))
+        if not args.dry_run:
+            print(f"Добавлено: {report.inserted}, обновлено: {report.updated}")
+            if report.rows_loaded:
+                from .generation import CatalogGeneration
+
+                # Индексы API и кэш результатов перестроятся по новому поколению
+                print(f"Поколение каталога: {CatalogGeneration().bump()}")
+        if report.skipped:
+            print(f"❌ Пропущено строк с ошибками: {report.skipped}")
+            for error in report.errors:
+                print(f"  {error}")
+
+    elif args.command == 'generate':
+        started = time.perf_counter()
+        count = write_csv(args.path, generate_rows(args.category, args.rows, args.seed))
+        print(f"✅ {count} строк записано в {args.path} за {time.perf_counter() - started:.1f} с")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
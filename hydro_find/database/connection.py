@@ -1,12 +1,33 @@
 # hydro_find/database/connection.py
 
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# Лимит времени запросов сессий, открытых в этом контексте, мс (None — без лимита)
+_statement_timeout: ContextVar[Optional[int]] = ContextVar("statement_timeout", default=None)
+
+
+@contextmanager
+def statement_timeout(ms: int):
+    """
+    Лимит времени запросов к БД внутри блока: PostgreSQL прерывает запрос
+    сам (SET LOCAL statement_timeout), и соединение не остаётся занятым
+    запросом, результат которого уже не ждут. На других СУБД не действует.
+    """
+    token = _statement_timeout.set(max(1, int(ms)))
+    try:
+        yield
+    finally:
+        _statement_timeout.reset(token)
+
 class DatabaseConnection:
     def __init__(self):
         self._engine = create_engine(
@@ -19,11 +40,27 @@ class DatabaseConnection:
         )
         self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
 
+    @property
+    def engine(self):
+        return self._engine
+
     def get_session(self):
-        return self._SessionLocal()
+        session = self._SessionLocal()
+        timeout = _statement_timeout.get()
+        if timeout is not None and self._engine.dialect.name == "postgresql":
+            # Действует до конца транзакции сессии
+            session.execute(text(f"SET LOCAL statement_timeout = {timeout}"))
+        return session
 
     def create_all_tables(self):
         Base.metadata.create_all(bind=self._engine)
+        self.upgrade_schema()
+
+    def upgrade_schema(self):
+        """Недостающие колонки и таблицы в уже созданной БД (см. migrations.upgrade_schema)"""
+        from .migrations import upgrade_schema
+
+        return upgrade_schema(self._engine)
 
     def _get_database_url(self) -> str:
         url = os.getenv("DATABASE_URL")
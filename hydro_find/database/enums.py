@@ -1,6 +1,7 @@
 # hydro_find/database/enums.py
 
 from enum import IntEnum
+from typing import Optional
 
 class Standard(IntEnum):
     BSP = 1
@@ -53,33 +54,7 @@ class Thread(IntEnum):
         Возвращает Enum-значение по строке из CSV.
         Если строка не найдена — выбрасывает ValueError.
         """
-        # Словарь сопоставления строк и ID
-        mapping = {
-            "1/8": cls._1_8,
-            "1/4": cls._1_4,
-            "3/8": cls._3_8,
-            "1/2": cls._1_2,
-            "3/4": cls._3_4,
-            "1": cls._1,
-            "1.1/4": cls._1_1_4,
-            "1.1/2": cls._1_1_2,
-            "2": cls._2,
-            "14х1.5": cls.M14_X_1_5,
-            "16х1.5": cls.M16_X_1_5,
-            "18х1.5": cls.M18_X_1_5,
-            "1,3/16": cls._1_3_16,
-            "1,5/16": cls._1_5_16,
-            "1,5/8": cls._1_5_8,
-            "1,7/8": cls._1_7_8,
-            "2,1/2": cls._2_1_2,
-            "5/8": cls._5_8,
-            "7/8": cls._7_8,
-            "9/16": cls._9_16,
-            "5/16": cls._5_16,
-            "7/16": cls._7_16,
-            "3/4''": cls._3_4_INCH,
-        }
-        result = mapping.get(value)
+        result = THREAD_LABELS.get(value)
         if result is None:
             raise ValueError(f"Thread '{value}' не найден в перечислении")
         return result
@@ -97,4 +72,98 @@ class Angle(IntEnum):
 class Series(IntEnum):
     LIGHT = 1
     HEAVY = 2
-    INTERLOCK = 3
\ No newline at end of file
+    INTERLOCK = 3
+
+
+# Строковые обозначения резьб (как в CSV каталога) → Enum
+THREAD_LABELS = {
+    "1/8": Thread._1_8,
+    "1/4": Thread._1_4,
+    "3/8": Thread._3_8,
+    "1/2": Thread._1_2,
+    "3/4": Thread._3_4,
+    "1": Thread._1,
+    "1.1/4": Thread._1_1_4,
+    "1.1/2": Thread._1_1_2,
+    "2": Thread._2,
+    "14х1.5": Thread.M14_X_1_5,
+    "16х1.5": Thread.M16_X_1_5,
+    "18х1.5": Thread.M18_X_1_5,
+    "1,3/16": Thread._1_3_16,
+    "1,5/16": Thread._1_5_16,
+    "1,5/8": Thread._1_5_8,
+    "1,7/8": Thread._1_7_8,
+    "2,1/2": Thread._2_1_2,
+    "5/8": Thread._5_8,
+    "7/8": Thread._7_8,
+    "9/16": Thread._9_16,
+    "5/16": Thread._5_16,
+    "7/16": Thread._7_16,
+    "3/4''": Thread._3_4_INCH,
+}
+
+# Обозначения арматуры в запросах и промптах → Enum
+ARMATURE_LABELS = {
+    "гайка": Armature.NUT,
+    "штуцер": Armature.UNION,
+    "штуцер конусный": Armature.CONICAL_UNION,
+}
+
+# Обозначения серий → Enum
+SERIES_LABELS = {
+    "L": Series.LIGHT,
+    "S": Series.HEAVY,
+    "ЛЕГКАЯ": Series.LIGHT,
+    "ТЯЖЕЛАЯ": Series.HEAVY,
+}
+
+
+def normalize_thread_label(value: str) -> str:
+    """Приведение написания резьбы к виду каталога: 'M14x1,5' → '14х1.5', '1 1/4' → '1.1/4'"""
+    text = str(value).strip().strip('"').replace(" ", "")
+    text = text.lstrip("MmМм")
+    text = text.replace("x", "х").replace("X", "х").replace("Х", "х")
+    if "х" in text:
+        text = text.replace(",", ".")
+    return text
+
+
+def parse_standard(value) -> Optional[Standard]:
+    """Стандарт по имени ('bsp', 'JIC') или id"""
+    if isinstance(value, int):
+        return Standard(value) if value in Standard._value2member_map_ else None
+    return Standard.__members__.get(str(value).upper().strip())
+
+
+def parse_thread(value) -> Optional[Thread]:
+    """Резьба по обозначению ('1/2', 'M14x1.5') или id"""
+    if isinstance(value, int):
+        return Thread(value) if value in Thread._value2member_map_ else None
+    return THREAD_LABELS.get(str(value).strip()) or THREAD_LABELS.get(normalize_thread_label(value))
+
+
+def parse_armature(value) -> Optional[Armature]:
+    """Арматура по русскому обозначению, имени Enum или id"""
+    if isinstance(value, int):
+        return Armature(value) if value in Armature._value2member_map_ else None
+    text = str(value).strip()
+    return ARMATURE_LABELS.get(text.lower()) or Armature.__members__.get(text.upper())
+
+
+def parse_angle(value) -> Optional[Angle]:
+    """Угол по числу (90, '90°', 'ANGLE_90')"""
+    text = str(value).upper().replace("ANGLE_", "").replace("°", "").strip()
+    try:
+        number = int(float(text))
+    except ValueError:
+        return None
+    return Angle(number) if number in Angle._value2member_map_ else None
+
+
+def parse_series(value) -> Optional[Series]:
+    """Серия по имени Enum, обозначению (L, S) или id"""
+    if isinstance(value, int):
+        return Series(value) if value in Series._value2member_map_ else None
+    text = str(value).upper().strip()
+    return Series.__members__.get(text) or SERIES_LABELS.get(text)
+
@@ -0,0 +1,199 @@
+# hydro_find/database/facets.py
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .enums import THREAD_LABELS, Angle, Armature, Series, Standard, parse_angle, parse_armature, \
+    parse_series, parse_standard, parse_thread
+from .models import CATEGORY_TO_MODEL
+
+logger = logging.getLogger(__name__)
+
+_THREAD_NAMES = {int(thread): label for label, thread in THREAD_LABELS.items()}
+# Пустое значение колонки: 0 занят (угол 0°)
+_EMPTY = -1
+
+
+def _parse_int(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+# Фасет → (префикс колонок, разбор значения фильтра в id, id → обозначение)
+_FACETS: Dict[str, Tuple[str, Callable[[Any], Any], Callable[[int], Any]]] = {
+    "standard": ("standard", parse_standard, lambda v: Standard(v).name),
+    "thread": ("thread", parse_thread, lambda v: _THREAD_NAMES.get(v, v)),
+    "armature": ("armature", parse_armature, lambda v: Armature(v).name),
+    "angle": ("angle", parse_angle, lambda v: Angle(v).value),
+    "seria": ("seria", parse_series, lambda v: Series(v).name),
+    "Dy": ("Dy", _parse_int, lambda v: v),
+    "dn": ("dn", _parse_int, lambda v: v),
+}
+
+
+def facet_columns(model_class) -> Dict[str, List[str]]:
+    """Колонки фасетов модели: standard → ['standard_id'] или ['standard_1_id', 'standard_2_id']"""
+    columns = model_class.__table__.columns
+    result = {}
+    for facet, (prefix, _, _) in _FACETS.items():
+        if prefix in columns:
+            result[facet] = [prefix]
+        elif f"{prefix}_id" in columns:
+            result[facet] = [f"{prefix}_id"]
+        else:
+            numbered = [f"{prefix}_{i}_id" for i in (1, 2, 3) if f"{prefix}_{i}_id" in columns]
+            if numbered:
+                result[facet] = numbered
+    return result
+
+
+class CategoryFacets:
+    """
+    Битовые маски одной категории: для каждого значения фасета — массив bool
+    длиной в число записей. Подсчёт для любой комбинации фильтров — AND/OR
+    масок и count_nonzero, без запросов к БД.
+    """
+
+    def __init__(self, category: str, columns: Dict[str, np.ndarray], facets: Dict[str, List[str]]):
+        """
+        Args:
+            category: Тип компонента
+            columns: Значения колонок (_EMPTY — пусто), по массиву на колонку
+            facets: Фасет → его колонки
+        """
+        self.category = category
+        self.size = len(next(iter(columns.values()))) if columns else 0
+        self.bitmaps: Dict[str, Dict[int, np.ndarray]] = {}
+        for facet, names in facets.items():
+            values = np.unique(np.concatenate([columns[name] for name in names]))
+            bitmaps = {}
+            for value in values[values != _EMPTY]:
+                mask = np.zeros(self.size, dtype=bool)
+                for name in names:
+                    # Переходник с BSP на любом из концов попадает в фасет BSP
+                    mask |= columns[name] == value
+                bitmaps[int(value)] = mask
+            self.bitmaps[facet] = bitmaps
+
+    def _mask(self, filters: Dict[str, List[int]], skip: Optional[str] = None) -> np.ndarray:
+        """Записи, подходящие под фильтры: OR внутри фасета, AND между фасетами"""
+        mask = np.ones(self.size, dtype=bool)
+        for facet, values in filters.items():
+            if facet == skip:
+                continue
+            bitmaps = self.bitmaps.get(facet, {})
+            selected = np.zeros(self.size, dtype=bool)
+            for value in values:
+                if value in bitmaps:
+                    selected |= bitmaps[value]
+            mask &= selected
+        return mask
+
+    def counts(self, filters: Dict[str, List[int]]) -> Tuple[int, Dict[str, Dict[int, int]]]:
+        """
+        Число записей под фильтрами и количество по значениям каждого фасета.
+        Для фасета с фильтром счёт идёт без его собственного фильтра — видно,
+        сколько дал бы выбор другого значения.
+
+        Returns:
+            Tuple: (всего, {фасет: {id значения: число записей}})
+        """
+        selected = self._mask(filters)
+        result = {}
+        for facet, bitmaps in self.bitmaps.items():
+            mask = self._mask(filters, skip=facet) if facet in filters else selected
+            counts = {value: int(np.count_nonzero(bitmap & mask)) for value, bitmap in bitmaps.items()}
+            result[facet] = {value: count for value, count in counts.items() if count}
+        return int(np.count_nonzero(selected)), result
+
+
+class FacetIndex:
+    """Маски фасетов по категориям; строятся при первом обращении и перестраиваются раз в ttl секунд"""
+
+    def __init__(self, repository, ttl: float = 600.0):
+        """
+        Args:
+            repository: ComponentRepository (facet_values)
+            ttl: Период перестроения, с
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self._categories: Dict[str, Tuple[float, CategoryFacets]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, category: Optional[str] = None):
+        """Сбросить маски категории (или всех) — каталог изменился"""
+        if category is None:
+            self._categories = {}
+        else:
+            self._categories.pop(category, None)
+
+    def _build(self, category: str) -> CategoryFacets:
+        started = time.monotonic()
+        facets = facet_columns(CATEGORY_TO_MODEL[category])
+        names = sorted({name for columns in facets.values() for name in columns})
+        rows = self.repository.facet_values(category, names)
+        columns = {
+            name: np.array([_EMPTY if row[i] is None else row[i] for row in rows], dtype=np.int64)
+            for i, name in enumerate(names)
+        }
+        built = CategoryFacets(category, columns, facets)
+        logger.info("Фасеты %s: %s записей за %.3f с", category, built.size, time.monotonic() - started)
+        return built
+
+    def get(self, category: str) -> CategoryFacets:
+        if category not in CATEGORY_TO_MODEL:
+            raise KeyError(category)
+        entry = self._categories.get(category)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            with self._lock:
+                entry = self._categories.get(category)
+                if entry is None or time.monotonic() - entry[0] > self.ttl:
+                    entry = (time.monotonic(), self._build(category))
+                    self._categories[category] = entry
+        return entry[1]
+
+    def counts(self, category: str, filters: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """
+        Счётчики фасетов категории под фильтрами.
+
+        Args:
+            category: Тип компонента
+            filters: Фасет → значения в обозначениях запроса ('BSP', '1/2', 90, 'L')
+
+        Returns:
+            {"total", "facets": {фасет: [{"value", "count"}]}} — значения по убыванию числа записей
+
+        Raises:
+            KeyError: Неизвестная категория
+            ValueError: Фасета нет у категории или значение не распознано
+        """
+        facets = self.get(category)
+        parsed: Dict[str, List[int]] = {}
+        for facet, values in filters.items():
+            if facet not in facets.bitmaps:
+                raise ValueError(f"Фасет {facet} недоступен для {category}")
+            _, parse, _ = _FACETS[facet]
+            for value in values:
+                value_id = parse(value)
+                if value_id is None:
+                    raise ValueError(f"Неизвестное значение {facet}: {value}")
+                parsed.setdefault(facet, []).append(int(value_id))
+
+        total, counts = facets.counts(parsed)
+        return {
+            "total": total,
+            "facets": {
+                facet: [
+                    {"value": _FACETS[facet][2](value), "count": count}
+                    for value, count in sorted(values.items(), key=lambda item: (-item[1], item[0]))
+                ]
+                for facet, values in counts.items()
+            },
+        }
@@ -0,0 +1,62 @@
+# hydro_find/database/generation.py
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Отдельный модуль без зависимостей от моделей и загрузчиков: его импортирует кэш API
+GENERATION_KEY = "catalog:generation"
+
+
+class CatalogGeneration:
+    """
+    Поколение каталога — число, которое растёт при каждом изменении каталога
+    (синхронизация, массовая загрузка). Индексы в памяти и кэш результатов
+    помнят поколение, с которым построены, и сбрасываются при расхождении.
+    Хранится в Redis (общее для API и worker'ов); пока Redis недоступен —
+    последнее прочитанное значение плюс изменения этого процесса.
+    """
+
+    def __init__(self, client=None):
+        """
+        Args:
+            client: Клиент Redis; None — подключение по REDIS_HOST/REDIS_PORT при первом обращении
+        """
+        self._client = client
+        self._last = 0
+        self._local = 0
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        return self._client
+
+    def current(self) -> int:
+        try:
+            self._last = int(self._redis().get(GENERATION_KEY) or 0)
+            return self._last
+        except Exception as e:
+            logger.debug("Поколение каталога недоступно в Redis: %s", e)
+            return self._last + self._local
+
+    def bump(self) -> int:
+        """Отметить изменение каталога; возвращает новое поколение"""
+        try:
+            self._last = int(self._redis().incr(GENERATION_KEY))
+            return self._last
+        except Exception as e:
+            logger.warning("Не удалось увеличить поколение каталога в Redis: %s", e)
+            with self._lock:
+                self._local += 1
+            return self._last + self._local
@@ -0,0 +1,58 @@
+# hydro_find/database/migrations.py
+
+import logging
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .models import CATEGORY_TO_MODEL, SyncState
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(engine) -> List[str]:
+    """
+    Доводит существующую БД до текущих моделей. Безопасно запускать при каждом
+    старте и из нескольких процессов сразу: уже применённые шаги пропускаются.
+
+    - updated_at и индекс по нему в таблицах компонентов (водяной знак синхронизации)
+    - таблица sync_state
+
+    Таблицы компонентов не создаются — это делает create_all_tables.
+
+    Returns:
+        List[str]: Применённые изменения (пустой — схема уже актуальна)
+    """
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    postgresql = engine.dialect.name == "postgresql"
+    applied = []
+
+    with engine.begin() as connection:
+        for model_class in CATEGORY_TO_MODEL.values():
+            table = model_class.__table__
+            if table.name not in existing:
+                continue
+            if "updated_at" not in {column["name"] for column in inspector.get_columns(table.name)}:
+                column_type = table.c.updated_at.type.compile(dialect=engine.dialect)
+                # SQLite не знает ADD COLUMN IF NOT EXISTS — там хватает проверки выше
+                if_not_exists = "IF NOT EXISTS " if postgresql else ""
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {engine.dialect.identifier_preparer.quote(table.name)} "
+                    f"ADD COLUMN {if_not_exists}updated_at {column_type}"
+                )
+                applied.append(f"{table.name}.updated_at")
+            for index in table.indexes:
+                if "updated_at" in index.columns and index.name not in {
+                        i["name"] for i in inspector.get_indexes(table.name)}:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+                    applied.append(index.name)
+
+        if SyncState.__tablename__ not in existing:
+            connection.execute(CreateTable(SyncState.__table__, if_not_exists=True))
+            applied.append(SyncState.__tablename__)
+
+    if applied:
+        logger.info("Схема БД обновлена: %s", ", ".join(applied))
+    return applied
@@ -1,6 +1,6 @@
 # hydro_find/database/models.py
 
-from sqlalchemy import Column, Integer, String, Boolean, SmallInteger, ForeignKey  # ← ВНЕШНЯЯ ЗАВИСИМОСТЬ
+from sqlalchemy import Column, Integer, String, Boolean, SmallInteger, ForeignKey, DateTime  # ← ВНЕШНЯЯ ЗАВИСИМОСТЬ
 from sqlalchemy.orm import relationship  # ← ВНЕШНЯЯ ЗАВИСИМОСТЬ
 from .connection import Base  # ← ВНУТРЕННЯЯ ЗАВИСИМОСТЬ
 from .enums import Standard, Armature, Angle, Series, Thread  # ← ВНУТРЕННЯЯ ЗАВИСИМОСТЬ
@@ -13,6 +13,8 @@ class ComponentBase(Base):
     id = Column(Integer, primary_key=True, index=True)
     article = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
+    # Время последнего изменения записи — водяной знак синхронизации каталога
+    updated_at = Column(DateTime(timezone=True), index=True)
 
 class Fitting(ComponentBase):
     __tablename__ = "fittings"
@@ -183,6 +185,16 @@ class Coupling(ComponentBase):
         }
 
 
+class SyncState(Base):
+    """Позиция синхронизации категории: (updated_at, id) последней перенесённой записи источника"""
+    __tablename__ = "sync_state"
+
+    category = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True))
+    last_id = Column(Integer)
+    synced_at = Column(DateTime(timezone=True))
+
+
 
 CATEGORY_TO_MODEL = {
     "fittings": Fitting,
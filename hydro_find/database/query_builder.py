@@ -3,7 +3,7 @@ from sqlalchemy import and_, or_
 from sqlalchemy.orm import Query
 import logging
 from .models import Fitting, Adapter, Plug, AdapterTee, Banjo, BRS, Coupling
-from .enums import Standard, Armature, Angle, Series, Thread
+from .enums import Standard, Armature, Angle, Series, Thread, parse_thread, parse_armature, parse_angle, parse_series
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +26,7 @@ class ComponentQueryBuilder:
                 .query
             )
         except Exception as e:
-            logger.error(f"Error building query: {e}")
+            logger.error("Error building query: %s", e)
             return self.query
 
     def _apply_exact_filters(self):
@@ -45,9 +45,12 @@ class ComponentQueryBuilder:
         }
 
         for param_name, handler in filter_handlers.items():
-            if param_name in params:
+            if param_name in params and params[param_name] is not None:
                 handler(params[param_name])
 
+        # Типизированные параметры: id значений Enum по колонкам модели
+        self._apply_column_filters()
+
         # Булевы флаги
         for flag in ['usit', 'o_ring', 'counter_nut', 'locknut']:
             if flag in params and params[flag] is not None:
@@ -76,7 +79,7 @@ class ComponentQueryBuilder:
                     )
                 )
         except Exception as e:
-            logger.warning(f"Failed to apply standard filter: {e}")
+            logger.warning("Failed to apply standard filter: %s", e)
 
     def _apply_boolean_filter(self, field_name, value):
         """Применяет булев фильтр"""
@@ -85,9 +88,60 @@ class ComponentQueryBuilder:
                 bool_value = str(value).lower() in ['true', '1', 'yes', 'y']
                 self.query = self.query.filter(getattr(self.model, field_name) == bool_value)
         except Exception as e:
-            logger.warning(f"Failed to apply boolean filter {field_name}: {e}")
+            logger.warning("Failed to apply boolean filter %s: %s", field_name, e)
+
+    def _apply_enum_filter(self, field_prefix: str, enum_value):
+        """Фильтр по колонке <prefix>_id или по любой из <prefix>_N_id"""
+        if enum_value is None:
+            return
+
+        if hasattr(self.model, f'{field_prefix}_id'):
+            self.query = self.query.filter(getattr(self.model, f'{field_prefix}_id') == int(enum_value))
+        else:
+            columns = [getattr(self.model, f'{field_prefix}_{i}_id') for i in (1, 2, 3)
+                       if hasattr(self.model, f'{field_prefix}_{i}_id')]
+            if columns:
+                self.query = self.query.filter(or_(*[col == int(enum_value) for col in columns]))
+
+    def _apply_thread_filter(self, thread_value):
+        """Применяет фильтр по резьбе"""
+        try:
+            self._apply_enum_filter('thread', parse_thread(thread_value))
+        except Exception as e:
+            logger.warning("Failed to apply thread filter: %s", e)
+
+    def _apply_armature_filter(self, armature_value):
+        """Применяет фильтр по арматуре"""
+        try:
+            self._apply_enum_filter('armature', parse_armature(armature_value))
+        except Exception as e:
+            logger.warning("Failed to apply armature filter: %s", e)
+
+    def _apply_angle_filter(self, angle_value):
+        """Применяет фильтр по углу"""
+        try:
+            self._apply_enum_filter('angle', parse_angle(angle_value))
+        except Exception as e:
+            logger.warning("Failed to apply angle filter: %s", e)
+
+    def _apply_seria_filter(self, seria_value):
+        """Применяет фильтр по серии"""
+        try:
+            self._apply_enum_filter('seria', parse_series(seria_value))
+        except Exception as e:
+            logger.warning("Failed to apply seria filter: %s", e)
+
+    def _apply_column_filters(self):
+        """Фильтры по типизированным параметрам (*_id и прочие колонки модели)"""
+        handled = {'Dy', 'usit', 'o_ring', 'counter_nut', 'locknut', 'id', 'article', 'name'}
+        table_columns = self.model.__table__.columns
 
-    # ... остальные методы фильтрации ...
+        for name, value in self.params.items():
+            if name in handled or value is None or name not in table_columns:
+                continue
+            if not isinstance(value, (int, bool)) and not name.endswith('_id'):
+                continue
+            self.query = self.query.filter(getattr(self.model, name) == value)
 
     def _apply_text_search(self):
         """Применяет текстовый поиск по артикулу и названию"""
@@ -112,6 +166,6 @@ class ComponentQueryBuilder:
                 if conditions:
                     self.query = self.query.filter(or_(*conditions))
             except Exception as e:
-                logger.error(f"Error in text search: {e}")
+                logger.error("Error in text search: %s", e)
 
         return self
\ No newline at end of file
@@ -1,43 +1,208 @@
 # hydro_find/database/repository.py
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import base64
+import json
 import logging
 
+from sqlalchemy import and_, case, func, literal, or_, select, union_all
+
+from .article_index import normalize_article
 from .connection import DatabaseConnection
-from .models import CATEGORY_TO_MODEL
+from .models import CATEGORY_TO_MODEL, Adapter, AdapterTee
 from .query_builder import ComponentQueryBuilder
 
 logger = logging.getLogger(__name__)
 
 
+# Веса совпадений при ранжировании: точный артикул > часть артикула > s_key > название
+_RELEVANCE_WEIGHTS = {"article_exact": 8, "article": 4, "s_key": 2, "name": 1}
+_RELEVANCE_MAX_TERMS = 8
+
+MAX_PAGE_SIZE = 100
+
+
+def _terms(query: str) -> List[str]:
+    """Слова запроса для ранжирования (без повторов и однобуквенных)"""
+    return [t for t in dict.fromkeys(str(query).lower().split()) if len(t) > 1][:_RELEVANCE_MAX_TERMS]
+
+
+def _relevance(model_class, terms: List[str]):
+    """
+    Оценка совпадения записи со словами запроса (SQL-выражение).
+
+    Returns:
+        Tuple: (выражение оценки, условия совпадения для WHERE)
+    """
+    s_key = getattr(model_class, "s_key", None)
+    scores, conditions = [], []
+    for term in terms:
+        pattern = f"%{term}%"
+        weighted = [
+            (model_class.article.ilike(term), _RELEVANCE_WEIGHTS["article_exact"]),
+            (model_class.article.ilike(pattern), _RELEVANCE_WEIGHTS["article"]),
+            (model_class.name.ilike(pattern), _RELEVANCE_WEIGHTS["name"]),
+        ]
+        if s_key is not None:
+            weighted.append((s_key.ilike(pattern), _RELEVANCE_WEIGHTS["s_key"]))
+        for condition, weight in weighted:
+            scores.append(case((condition, weight), else_=0))
+            conditions.append(condition)
+    if not scores:
+        return literal(0), conditions
+    return sum(scores[1:], scores[0]), conditions
+
+
+def encode_cursor(score: int, component_id: int) -> str:
+    """Курсор страницы: оценка и id последней записи предыдущей страницы"""
+    raw = json.dumps([score, component_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Raises:
+        ValueError: Курсор повреждён
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, component_id = json.loads(raw)
+        return int(score), int(component_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
+
+
 class ComponentRepository:
     def __init__(self, db: DatabaseConnection):
         self._db = db
 
     def search(self, params: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
-        """Поиск компонентов по параметрам"""
+        """Поиск компонентов по параметрам (первая страница search_page)"""
+        return self.search_page(params, limit)[0]
+
+    def search_page(self, params: Dict[str, Any], limit: int = 10,
+                    cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Страница поиска по параметрам: по убыванию оценки совпадения с текстом
+        запроса, затем по id. Пагинация по ключу (score, id) — следующая
+        страница не перечитывает предыдущие, в отличие от OFFSET.
+
+        Args:
+            params: Параметры поиска с component_type и original_query
+            limit: Размер страницы (не больше MAX_PAGE_SIZE)
+            cursor: Курсор из предыдущей страницы; None — первая страница
+
+        Returns:
+            Tuple: (компоненты с полем score, курсор следующей страницы или None)
+
+        Raises:
+            ValueError: Курсор повреждён
+        """
         category = params.get("component_type")
         if not category:
             logger.warning("No component type specified")
-            return []
+            return [], None
 
         model_class = CATEGORY_TO_MODEL.get(category)
         if not model_class:
-            logger.warning(f"Unknown component type: {category}")
-            return []
+            logger.warning("Unknown component type: %s", category)
+            return [], None
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        score, _ = _relevance(model_class, _terms(params.get("original_query", "")))
 
         try:
             # Использование контекстного менеджера для сессии
             with self._db.get_session() as session:
-                query = session.query(model_class)
-                builder = ComponentQueryBuilder(query, params)
-                results = builder.build().limit(limit).all()
+                query = session.query(model_class, score.label("score"))
+                query = ComponentQueryBuilder(query, params).build()
+                if after is not None:
+                    query = query.filter(or_(
+                        score < after[0],
+                        and_(score == after[0], model_class.id > after[1]),
+                    ))
+                # Лишняя запись — признак следующей страницы
+                rows = query.order_by(score.desc(), model_class.id).limit(limit + 1).all()
 
                 # Преобразование результатов
-                return [self._enrich_component_data(item.to_dict()) for item in results]
+                items = []
+                for item, item_score in rows[:limit]:
+                    data = self._enrich_component_data(item.to_dict())
+                    data["score"] = int(item_score)
+                    items.append(data)
+
+            next_cursor = None
+            if len(rows) > limit:
+                next_cursor = encode_cursor(items[-1]["score"], items[-1]["id"])
+            return items, next_cursor
 
         except Exception as e:
-            logger.error(f"Database search error: {e}")
+            logger.error("Database search error: %s", e)
+            return [], None
+
+    def search_all(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Поиск по всем категориям одним запросом (UNION ALL по общим колонкам)
+        с общим ранжированием — когда тип компонента не определён.
+
+        Args:
+            query: Исходный текст запроса
+            limit: Число результатов
+
+        Returns:
+            Компоненты с полями component_type и score (0..1), по убыванию score
+        """
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        selects = []
+        for category, model_class in CATEGORY_TO_MODEL.items():
+            score, conditions = _relevance(model_class, terms)
+            selects.append(
+                select(
+                    literal(category).label("category"),
+                    model_class.id.label("id"),
+                    score.label("score"),
+                ).where(or_(*conditions))
+            )
+
+        unified = union_all(*selects).subquery()
+        statement = (
+            select(unified.c.category, unified.c.id, unified.c.score)
+            .order_by(unified.c.score.desc(), unified.c.category, unified.c.id)
+            .limit(limit)
+        )
+        max_score = len(terms) * sum(_RELEVANCE_WEIGHTS.values())
+
+        try:
+            with self._db.get_session() as session:
+                hits = session.execute(statement).all()
+
+                # Полные записи — одним запросом на категорию
+                by_category: Dict[str, List[int]] = {}
+                for category, component_id, _ in hits:
+                    by_category.setdefault(category, []).append(component_id)
+                items = {}
+                for category, ids in by_category.items():
+                    model_class = CATEGORY_TO_MODEL[category]
+                    for item in session.query(model_class).filter(model_class.id.in_(ids)):
+                        items[(category, item.id)] = item.to_dict()
+
+            results = []
+            for category, component_id, score in hits:
+                data = items.get((category, component_id))
+                if data is None:
+                    continue
+                data = self._enrich_component_data(data)
+                data["component_type"] = category
+                data["score"] = round(score / max_score, 4)
+                results.append(data)
+            return results
+
+        except Exception as e:
+            logger.error("Unified search error: %s", e)
             return []
 
     def get_by_article(self, category: str, article: str) -> Optional[Dict[str, Any]]:
@@ -55,7 +220,96 @@ class ComponentRepository:
                 return self._enrich_component_data(item.to_dict()) if item else None
 
         except Exception as e:
-            logger.error(f"Error getting component by article: {e}")
+            logger.error("Error getting component by article: %s", e)
+            return None
+
+    def get_by_id(self, category: str, component_id: int) -> Optional[Dict[str, Any]]:
+        """Получение компонента по первичному ключу"""
+        model_class = CATEGORY_TO_MODEL.get(category)
+        if not model_class:
+            return None
+
+        try:
+            with self._db.get_session() as session:
+                item = session.get(model_class, component_id)
+                if item is None:
+                    return None
+                data = self._enrich_component_data(item.to_dict())
+                data["component_type"] = category
+                return data
+
+        except Exception as e:
+            logger.error("Error getting component by id: %s", e)
+            return None
+
+    def iter_articles(self, batch_size: int = 10000) -> Iterator[Tuple[str, int, str]]:
+        """Все артикулы каталога: (категория, id, артикул) — только две колонки, потоково"""
+        with self._db.get_session() as session:
+            for category, model_class in CATEGORY_TO_MODEL.items():
+                rows = session.query(model_class.id, model_class.article).yield_per(batch_size)
+                for component_id, article in rows:
+                    yield category, component_id, article
+
+    def iter_search_fields(self, after_ids: Optional[Dict[str, int]] = None,
+                           batch_size: int = 10000) -> Iterator[Tuple[str, int, str, str, Optional[str]]]:
+        """
+        Поля для подсказок: (категория, id, артикул, название, s_key).
+
+        Args:
+            after_ids: Только записи с id больше указанного по категориям (догрузка новых)
+            batch_size: Размер пачки при потоковом чтении
+        """
+        after_ids = after_ids or {}
+        with self._db.get_session() as session:
+            for category, model_class in CATEGORY_TO_MODEL.items():
+                s_key = getattr(model_class, "s_key", None)
+                columns = [model_class.id, model_class.article, model_class.name]
+                query = session.query(*columns, s_key) if s_key is not None else session.query(*columns)
+                if category in after_ids:
+                    query = query.filter(model_class.id > after_ids[category])
+                for row in query.order_by(model_class.id).yield_per(batch_size):
+                    yield (category, row[0], row[1], row[2], row[3] if s_key is not None else None)
+
+    def iter_adapter_ports(self) -> Iterator[Tuple[str, int, str, str, List[Tuple[int, int, Optional[int]]]]]:
+        """Переходники и тройники с присоединениями: (категория, id, артикул, название, [(стандарт, резьба, арматура)])"""
+        with self._db.get_session() as session:
+            for category, model_class, count in (("adapters", Adapter, 2), ("adapter-tee", AdapterTee, 3)):
+                for item in session.query(model_class).yield_per(1000):
+                    ports = [
+                        (getattr(item, f"standard_{i}_id"), getattr(item, f"thread_{i}_id"),
+                         getattr(item, f"armature_{i}_id"))
+                        for i in range(1, count + 1)
+                    ]
+                    yield category, item.id, item.article, item.name, ports
+
+    def facet_values(self, category: str, columns: List[str]) -> List[Tuple]:
+        """Значения указанных колонок всех записей категории (для масок фасетов)"""
+        model_class = CATEGORY_TO_MODEL[category]
+        with self._db.get_session() as session:
+            return session.query(*[getattr(model_class, name) for name in columns]).all()
+
+    def find_by_article_any(self, article: str) -> Optional[Dict[str, Any]]:
+        """
+        Поиск компонента по точному артикулу во всех категориях
+        (без учёта регистра и внешних пробелов — как в ArticleIndex).
+
+        Returns:
+            Данные компонента с полем component_type или None
+        """
+        try:
+            with self._db.get_session() as session:
+                for category, model_class in CATEGORY_TO_MODEL.items():
+                    item = session.query(model_class).filter(
+                        func.upper(func.trim(model_class.article)) == normalize_article(article)
+                    ).first()
+                    if item is not None:
+                        data = self._enrich_component_data(item.to_dict())
+                        data["component_type"] = category
+                        return data
+            return None
+
+        except Exception as e:
+            logger.error("Error getting component by article: %s", e)
             return None
 
     def _enrich_component_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,191 @@
+# hydro_find/database/sync.py
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, create_engine, or_, select
+from sqlalchemy.engine import URL, make_url
+
+from .bulk_loader import LoadReport, SqlAlchemyUpsertLoader, dialect_insert
+from .generation import CatalogGeneration
+from .models import CATEGORY_TO_MODEL, SyncState
+
+logger = logging.getLogger(__name__)
+
+
+def get_source_url() -> URL:
+    """Источник синхронизации: SYNC_SOURCE_URL или PostgreSQL Supabase из SUPABASE_*"""
+    url = os.getenv("SYNC_SOURCE_URL")
+    if url:
+        return make_url(url)
+    host = os.getenv("SUPABASE_HOST")
+    if not host:
+        raise ValueError("Не задан источник синхронизации: SYNC_SOURCE_URL или SUPABASE_HOST")
+    return URL.create(
+        "postgresql",
+        username=os.getenv("SUPABASE_USER", "postgres"),
+        password=os.getenv("SUPABASE_PASSWORD"),
+        host=host,
+        port=int(os.getenv("SUPABASE_PORT", 5432)),
+        database=os.getenv("SUPABASE_DATABASE", "postgres"),
+    )
+
+
+class CatalogSync:
+    """
+    Инкрементальная синхронизация каталога из источника (Supabase/PostgreSQL)
+    в локальную БД. Переносятся только записи, изменённые после водяного
+    знака — (updated_at, id) последней перенесённой записи категории. Знак
+    сохраняется в sync_state в одной транзакции с пачкой, поэтому прерванная
+    синхронизация продолжается с места остановки.
+
+    В источнике updated_at должен обновляться при каждом изменении записи
+    (DEFAULT now() и триггер BEFORE UPDATE); записи с пустым updated_at
+    и удаления не переносятся.
+
+    now() в PostgreSQL — время начала транзакции: запись, закоммиченная
+    позже, чем проход прочитал её updated_at, появляется «позади» знака.
+    Поэтому каждый проход перечитывает окно overlap перед знаком; повторный
+    перенос ничего не меняет (upsert пропускает записи без изменений).
+    """
+
+    def __init__(self, source_engine, target_db, batch_size: int = 1000,
+                 generation: Optional[CatalogGeneration] = None, overlap: float = 300.0):
+        """
+        Args:
+            source_engine: Engine источника
+            target_db: DatabaseConnection локального каталога
+            batch_size: Записей в пачке (одна транзакция в локальной БД)
+            generation: Поколение каталога; увеличивается, если что-то добавлено или изменено
+            overlap: Окно перечитывания перед водяным знаком, с (больше самой долгой транзакции источника)
+        """
+        self.source = source_engine
+        self.target = target_db
+        self.batch_size = batch_size
+        self.generation = generation
+        self.overlap = timedelta(seconds=overlap)
+
+    @staticmethod
+    def _state(connection, category: str) -> Tuple[Optional[datetime], int]:
+        row = connection.execute(
+            select(SyncState.watermark, SyncState.last_id).where(SyncState.category == category)
+        ).first()
+        return (row.watermark, row.last_id or 0) if row else (None, 0)
+
+    @staticmethod
+    def _save_state(connection, category: str, watermark: datetime, last_id: int):
+        values = {"watermark": watermark, "last_id": last_id, "synced_at": datetime.now(timezone.utc)}
+        statement = dialect_insert(connection.dialect.name)(SyncState.__table__).values(category=category, **values)
+        connection.execute(statement.on_conflict_do_update(index_elements=["category"], set_=values))
+
+    def _changed(self, table, watermark: Optional[datetime], last_id: int):
+        """Следующая пачка изменений: по (updated_at, id) строго после водяного знака"""
+        query = select(table).where(table.c.updated_at.isnot(None))
+        if watermark is not None:
+            query = query.where(or_(
+                table.c.updated_at > watermark,
+                and_(table.c.updated_at == watermark, table.c.id > last_id),
+            ))
+        return query.order_by(table.c.updated_at, table.c.id).limit(self.batch_size)
+
+    def sync_category(self, category: str) -> LoadReport:
+        """
+        Перенос изменений одной категории.
+
+        Returns:
+            LoadReport: прочитано из источника, добавлено и обновлено локально
+        """
+        table = CATEGORY_TO_MODEL[category].__table__
+        report = LoadReport(category)
+        started = time.perf_counter()
+        with self.target.engine.connect() as connection:
+            saved = self._state(connection, category)
+        # Чтение начинается с окна перед знаком, сам знак назад не сдвигается
+        cursor = (saved[0] - self.overlap, 0) if saved[0] is not None else saved
+
+        while True:
+            with self.source.connect() as connection:
+                rows = connection.execute(self._changed(table, *cursor)).mappings().all()
+            if not rows:
+                break
+            report.rows_read += len(rows)
+            cursor = rows[-1]["updated_at"], rows[-1]["id"]
+            # id локальной БД свои: запись сопоставляется по артикулу, как при массовой загрузке
+            batch = [{name: value for name, value in row.items() if name != "id"} for row in rows]
+            with self.target.engine.begin() as connection:
+                SqlAlchemyUpsertLoader.upsert(connection, category, batch, report)
+                if saved[0] is None or cursor > saved:
+                    saved = cursor
+                    self._save_state(connection, category, *saved)
+            if len(rows) < self.batch_size:
+                break
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def sync(self, categories: Optional[Iterable[str]] = None) -> Dict[str, LoadReport]:
+        """Перенос изменений категорий (по умолчанию всех); поколение каталога растёт, если что-то изменилось"""
+        reports = {category: self.sync_category(category) for category in (categories or CATEGORY_TO_MODEL)}
+        # Перечитанное окно без изменений не сбрасывает индексы и кэш
+        changed = sum(report.inserted + report.updated for report in reports.values())
+        if changed and self.generation is not None:
+            generation = self.generation.bump()
+            logger.info("Синхронизация каталога: %s записей, поколение %s", changed, generation)
+        return reports
+
+
+def main():
+    """CLI: инкрементальная синхронизация каталога из Supabase"""
+    import argparse
+
+    from .connection import DatabaseConnection
+
+    parser = argparse.ArgumentParser(description='Инкрементальная синхронизация каталога из Supabase')
+    subparsers = parser.add_subparsers(dest='command', help='Команды')
+
+    run_parser = subparsers.add_parser('run', help='Перенести изменения после сохранённого водяного знака')
+    run_parser.add_argument('--category', action='append', choices=list(CATEGORY_TO_MODEL),
+                            help='Тип компонента (можно несколько; по умолчанию все)')
+    run_parser.add_argument('--batch-size', type=int, default=int(os.getenv("SYNC_BATCH_SIZE", 1000)),
+                            help='Записей в пачке')
+    run_parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд (0 — один проход)')
+
+    subparsers.add_parser('status', help='Водяные знаки категорий')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    db = DatabaseConnection()
+    db.create_all_tables()
+
+    if args.command == 'run':
+        sync = CatalogSync(create_engine(get_source_url(), pool_pre_ping=True), db,
+                           batch_size=args.batch_size, generation=CatalogGeneration(),
+                           overlap=float(os.getenv("SYNC_OVERLAP", 300)))
+        while True:
+            for category, report in sync.sync(args.category).items():
+                if report.inserted or report.updated:
+                    print(f"✅ {category}: прочитано {report.rows_read}, добавлено {report.inserted}, "
+                          f"обновлено {report.updated} за {report.seconds:.1f} с")
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+
+    elif args.command == 'status':
+        with db.engine.connect() as connection:
+            states = connection.execute(select(SyncState).order_by(SyncState.category)).all()
+        if not states:
+            print("Синхронизация ещё не выполнялась")
+        for state in states:
+            print(f"{state.category}: до {state.watermark} (id {state.last_id}), последний проход {state.synced_at}")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# hydro_find/instrumentation/__init__.py
+
+from . import tracing
+from .timing import StageTimings, bind, collect, current, observe, stage
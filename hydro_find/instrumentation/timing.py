@@ -0,0 +1,99 @@
+# hydro_find/instrumentation/timing.py
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from . import tracing
+from .metrics import STAGE_SECONDS
+
+# Сборщик таймингов текущей задачи (запрос API или сообщение воркера)
+_current: ContextVar[Optional["StageTimings"]] = ContextVar("stage_timings", default=None)
+
+
+class StageTimings:
+    """Длительность этапов обработки одной задачи и вызовы AI"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.calls: List[Dict[str, Any]] = []
+
+    def record(self, name: str, seconds: float):
+        """Добавить длительность этапа (повторные вызовы суммируются)"""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def add_call(self, **call):
+        """Запись вызова AI (задача, вход, ответ, длительность) — для воспроизведения"""
+        with self._lock:
+            self.calls.append(call)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages_ms": {name: round(ms, 2) for name, ms in self.stages.items()},
+                "stage_counts": dict(self.counts),
+            }
+
+
+def current() -> Optional[StageTimings]:
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """
+    Сбор таймингов задачи. Вложенный вызов использует уже активный сборщик —
+    так внешний код (например, replay) видит этапы, записанные воркером.
+    """
+    existing = _current.get()
+    if existing is not None:
+        yield existing
+        return
+
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def observe(name: str, seconds: float):
+    """Длительность этапа: в гистограмму метрик и в сборщик задачи (если активен)"""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _current.get()
+    if timings is not None:
+        timings.record(name, seconds)
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Замер этапа (и спан трассировки, если она включена)"""
+    start = time.perf_counter()
+    try:
+        with tracing.start_span(name, **attributes):
+            yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Перенос контекста (сборщик таймингов, текущий спан) в поток пула —
+    ThreadPoolExecutor не копирует contextvars.
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # Отдельная копия на вызов: один Context нельзя войти из двух потоков сразу
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
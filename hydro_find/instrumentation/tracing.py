@@ -0,0 +1,307 @@
+# hydro_find/instrumentation/tracing.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """Идентификаторы трассировки (W3C Trace Context)"""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Any) -> Optional["SpanContext"]:
+        if isinstance(value, bytes):
+            value = value.decode("ascii", "ignore")
+        if not isinstance(value, str):
+            return None
+        match = _TRACEPARENT_RE.match(value.strip().lower())
+        if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+            return None
+        return cls(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+
+@dataclass
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: Optional[str]
+    kind: str = "internal"
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self, service: str) -> Dict[str, Any]:
+        return {
+            "service": service,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class FileSpanExporter:
+    """Спаны в JSONL-файл (по строке на спан)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span], service: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(service), ensure_ascii=False, default=str) + "\n")
+
+
+class OTLPHttpExporter:
+    """Спаны в OTLP/HTTP коллектор (JSON-кодирование, POST /v1/traces)"""
+
+    _KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + ("" if endpoint.rstrip("/").endswith("/v1/traces") else "/v1/traces")
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        data = {
+            "traceId": span.context.trace_id,
+            "spanId": span.context.span_id,
+            "name": span.name,
+            "kind": self._KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": k, "value": self._value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    def export(self, spans: List[Span], service: str):
+        import requests
+
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+            "scopeSpans": [{"scope": {"name": "hydro_find"}, "spans": [self._span(s) for s in spans]}],
+        }]}
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Создание спанов и фоновая выгрузка пачками: запись спана в очередь
+    не блокирует обработку запроса.
+    """
+
+    def __init__(self, exporter, service: str, sample_rate: float = 1.0,
+                 batch_size: int = 256, flush_interval: float = 2.0, max_queue: int = 10000):
+        self.exporter = exporter
+        self.service = service
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def new_context(self, parent: Optional[SpanContext]) -> SpanContext:
+        if parent is not None:
+            return SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return SpanContext(secrets.token_hex(16), secrets.token_hex(8), sampled)
+
+    def finish(self, span: Span):
+        if not span.context.sampled:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Коллектор не успевает — теряем спан, но не тормозим запросы
+            pass
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if span is None:
+                    self._export(batch)
+                    return
+                batch.append(span)
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _export(self, batch: List[Span]):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch, self.service)
+        except Exception as e:
+            logger.warning("Не удалось выгрузить %s спанов: %s", len(batch), e)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Выгрузка оставшихся спанов"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_tracer: Optional[Tracer] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure(service: Optional[str] = None) -> Optional[Tracer]:
+    """
+    Настройка трассировки из окружения (вызывается при первом спане).
+
+    TRACING_EXPORTER: off (по умолчанию), file или otlp;
+    TRACING_FILE, OTEL_EXPORTER_OTLP_ENDPOINT, TRACING_SAMPLE_RATE, OTEL_SERVICE_NAME.
+    """
+    global _tracer, _configured
+    if _configured and service is None:
+        return _tracer
+    with _configure_lock:
+        if _configured and service is None:
+            return _tracer
+        if _tracer is not None:
+            _tracer.shutdown()
+            _tracer = None
+
+        kind = os.getenv("TRACING_EXPORTER", "off").lower()
+        service = os.getenv("OTEL_SERVICE_NAME") or service or "hydrofind"
+        try:
+            sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+        except ValueError:
+            sample_rate = 1.0
+
+        exporter = None
+        if kind == "file":
+            exporter = FileSpanExporter(os.getenv("TRACING_FILE", "logs/traces.jsonl"))
+        elif kind == "otlp":
+            exporter = OTLPHttpExporter(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"))
+        elif kind != "off":
+            logger.warning("Неизвестный TRACING_EXPORTER: %s, трассировка выключена", kind)
+
+        if exporter is not None:
+            _tracer = Tracer(exporter, service, sample_rate)
+            atexit.register(_tracer.shutdown)
+            logger.info("Трассировка включена: %s, сервис %s", kind, service)
+        _configured = True
+        return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", parent: Optional[SpanContext] = None, **attributes):
+    """
+    Спан вокруг блока. Родитель — явно переданный контекст (из заголовков)
+    или текущий спан. Без настроенного экспортёра ничего не делает.
+    """
+    tracer = configure()
+    if tracer is None:
+        yield None
+        return
+
+    current = _current_span.get()
+    if parent is None and current is not None:
+        parent = current.context
+    span = Span(name, tracer.new_context(parent), parent.span_id if parent else None, kind,
+                attributes=dict(attributes))
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        tracer.finish(span)
+
+
+def record_span(name: str, start: float, end: Optional[float] = None,
+                parent: Optional[SpanContext] = None, kind: str = "internal", **attributes):
+    """Спан по известным границам (например, ожидание в очереди)"""
+    tracer = configure()
+    if tracer is None:
+        return
+    current = _current_span.get()
+    if parent is None and current is not None:
+        parent = current.context
+    span = Span(name, tracer.new_context(parent), parent.span_id if parent else None, kind,
+                start_ns=int(start * 1e9), end_ns=int((end or time.time()) * 1e9), attributes=dict(attributes))
+    tracer.finish(span)
+
+
+def inject(headers: Dict[str, Any]) -> Dict[str, Any]:
+    """Добавить traceparent текущего спана в заголовки (HTTP или AMQP)"""
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.context.to_traceparent()
+    return headers
+
+
+def extract(headers: Optional[Dict[str, Any]]) -> Optional[SpanContext]:
+    """Контекст трассировки из заголовков"""
+    if not headers:
+        return None
+    return SpanContext.from_traceparent(headers.get(TRACEPARENT_HEADER))
@@ -1,21 +1,35 @@
 # hydro_find/prompts/repository.py
 
+import re
+from typing import Dict
+
 from .types import ComponentType, PreprocessingTask
+from .tokens import count_tokens
 from .specs import (
     JSON_INSTRUCTION, EXTRACTION_RULES, PREPROCESSING_RULES,
     _FITTINGS_SPEC, _ADAPTERS_SPEC, _PLUGS_SPEC, _ADAPTER_TEE_SPEC,
     _BANJO_SPEC, _BANJO_BOLT_SPEC, _BRS_SPEC, _COUPLING_SPEC,
-    _TEXT_SPLIT_SPEC, _QUANTITY_SPEC, _CLASSIFICATION_SPEC
+    _TEXT_SPLIT_SPEC, _QUANTITY_SPEC, _CLASSIFICATION_SPEC,
+    _BATCH_CLASSIFY_SPEC, _BATCH_EXTRACTION_SPEC
 )
 
-# Сборка промпта
+
+# Сжатие промпта: лишние пробелы и пустые строки тоже оплачиваются токенами
+def _compact(text: str) -> str:
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+# Общие префиксы: одинаковое начало промптов позволяет провайдеру
+# переиспользовать кэш префикса между задачами одного вида
+_EXTRACTION_PREFIX = _compact(f"{JSON_INSTRUCTION}\n\n{EXTRACTION_RULES}")
+_PREPROCESSING_PREFIX = _compact(PREPROCESSING_RULES)
+
+
+# Сборка промпта: стабильный общий префикс, затем роль и спецификация задачи
 def _build_prompt(role: str, spec: str, is_json: bool = True) -> str:
-    parts = [f"Ты {role}. {spec}"]
-    if is_json:
-        parts.extend([JSON_INSTRUCTION, EXTRACTION_RULES])
-    else:
-        parts.append(PREPROCESSING_RULES)
-    return "\n\n".join(parts)
+    prefix = _EXTRACTION_PREFIX if is_json else _PREPROCESSING_PREFIX
+    return "\n\n".join([prefix, _compact(f"Ты {role}. {spec}")])
 
 # Промпты компонентов
 _COMPONENT_PROMPTS = {
@@ -36,6 +50,13 @@ _PREPROCESSING_PROMPTS = {
     "classify": _build_prompt("ассистент по обработке технических текстов", _CLASSIFICATION_SPEC, is_json=False),
 }
 
+# Пакетные промпты: тот же префикс и спецификация + формат массива по строкам
+_BATCH_CLASSIFY_PROMPT = _build_prompt("ассистент по обработке технических текстов", _BATCH_CLASSIFY_SPEC)
+_BATCH_COMPONENT_PROMPTS = {
+    name: "\n\n".join([prompt, _compact(_BATCH_EXTRACTION_SPEC)])
+    for name, prompt in _COMPONENT_PROMPTS.items()
+}
+
 # Публичный интерфейс
 class PromptRepository:
     @staticmethod
@@ -50,4 +71,35 @@ class PromptRepository:
         prompt = _PREPROCESSING_PROMPTS.get(task.value)
         if not prompt:
             raise ValueError(f"Неизвестная задача предобработки: {task}")
-        return prompt
\ No newline at end of file
+        return prompt
+
+    @staticmethod
+    def get_batch_classify_prompt() -> str:
+        return _BATCH_CLASSIFY_PROMPT
+
+    @staticmethod
+    def get_batch_component_prompt(component_type: ComponentType) -> str:
+        prompt = _BATCH_COMPONENT_PROMPTS.get(component_type.value)
+        if not prompt:
+            raise ValueError(f"Неизвестный тип компонента: {component_type}")
+        return prompt
+
+    @staticmethod
+    def count_tokens(prompt: str) -> int:
+        return count_tokens(prompt)
+
+    @staticmethod
+    def get_token_report() -> Dict[str, Dict[str, int]]:
+        """Размер системных промптов в токенах и доля общего префикса"""
+        return {
+            "components": {name: count_tokens(p) for name, p in _COMPONENT_PROMPTS.items()},
+            "preprocessing": {name: count_tokens(p) for name, p in _PREPROCESSING_PROMPTS.items()},
+            "batch": {
+                "classify": count_tokens(_BATCH_CLASSIFY_PROMPT),
+                **{name: count_tokens(p) for name, p in _BATCH_COMPONENT_PROMPTS.items()},
+            },
+            "shared_prefix": {
+                "extraction": count_tokens(_EXTRACTION_PREFIX),
+                "preprocessing": count_tokens(_PREPROCESSING_PREFIX),
+            },
+        }
@@ -69,4 +69,24 @@ _COUPLING_SPEC = "Проанализируй запрос и извлеки па
 # === Спецификации предобработки ===
 _TEXT_SPLIT_SPEC = "Разбей строку на отдельные компоненты — по одному на строку."
 _QUANTITY_SPEC = "Извлеки количество или верни 'Не указано'."
-_CLASSIFICATION_SPEC = "Верни одно из: fittings, adapters, plugs, adapter-tee, banjo, banjo-bolt, brs, coupling"
\ No newline at end of file
+_CLASSIFICATION_SPEC = "Верни одно из: fittings, adapters, plugs, adapter-tee, banjo, banjo-bolt, brs, coupling"
+# === Пакетная обработка (несколько строк заказа в одном запросе) ===
+_BATCH_INPUT = (
+    "На входе пронумерованные строки заказа вида \"[N] текст\". "
+    "Обработай КАЖДУЮ строку независимо от остальных."
+)
+
+_BATCH_CLASSIFY_SPEC = (
+    f"{_BATCH_INPUT}\n"
+    "Верни JSON-объект {\"items\": [...]}, по одному элементу на строку:\n"
+    "- index: номер строки N\n"
+    "- type: одно из fittings, adapters, plugs, adapter-tee, banjo, banjo-bolt, brs, coupling"
+)
+
+_BATCH_EXTRACTION_SPEC = (
+    f"{_BATCH_INPUT}\n"
+    "Верни JSON-объект {\"items\": [...]}, по одному элементу на строку:\n"
+    "- index: номер строки N\n"
+    "- quantity: целое число (количество, null если не указано)\n"
+    "- остальные поля — как описано выше"
+)
@@ -0,0 +1,57 @@
+# hydro_find/prompts/tokens.py
+
+import math
+import re
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except ImportError:  # tiktoken необязателен — используем оценку
+    _ENCODING = None
+
+_TOKEN_RE = re.compile(r"[А-Яа-яЁё]+|[A-Za-z]+|\d+|[^\sA-Za-zА-Яа-яЁё\d]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Количество токенов в тексте.
+    Точно — через tiktoken (если установлен), иначе оценка: BPE-словари
+    режут кириллицу примерно по 3 символа, латиницу по 4, числа по 3.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece[0].isascii() and piece[0].isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif piece[0].isalpha():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+def is_exact() -> bool:
+    """True, если подсчёт точный (установлен tiktoken)"""
+    return _ENCODING is not None
+
+
+def main():
+    """Отчёт о размере системных промптов: python -m hydro_find.prompts.tokens"""
+    from .repository import PromptRepository
+
+    report = PromptRepository.get_token_report()
+    print(f"Подсчёт токенов: {'tiktoken' if is_exact() else 'оценка'}")
+    for group, values in report.items():
+        print(f"\n{group}:")
+        for name, tokens in values.items():
+            print(f"  {name:15} {tokens:6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# hydro_find/tabular.py
+
+import csv
+import io
+import itertools
+import logging
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CSV_EXTENSIONS = {".csv", ".txt"}
+EXCEL_EXTENSIONS = {".xlsx", ".xlsm"}
+
+_SNIFF_SAMPLE_SIZE = 8192
+
+
+def get_extension(filename: str) -> str:
+    """Возвращает расширение файла в нижнем регистре (с точкой)"""
+    dot = filename.rfind(".")
+    return filename[dot:].lower() if dot != -1 else ""
+
+
+def is_supported(filename: str) -> bool:
+    """Проверяет, умеем ли мы читать файл с таким именем"""
+    ext = get_extension(filename)
+    return ext in CSV_EXTENSIONS or ext in EXCEL_EXTENSIONS
+
+
+def iter_rows(stream: BinaryIO, filename: str, encoding: str = "utf-8-sig") -> Iterator[List[Any]]:
+    """
+    Построчное чтение CSV/XLSX без загрузки файла целиком.
+
+    Args:
+        stream: Бинарный поток файла
+        filename: Имя файла (по расширению выбирается формат)
+        encoding: Кодировка CSV
+
+    Yields:
+        List[Any]: Значения ячеек строки
+    """
+    ext = get_extension(filename)
+    if ext in CSV_EXTENSIONS:
+        yield from _iter_csv_rows(stream, encoding)
+    elif ext in EXCEL_EXTENSIONS:
+        yield from _iter_excel_rows(stream)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+
+
+def _iter_csv_rows(stream: BinaryIO, encoding: str) -> Iterator[List[Any]]:
+    text = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+    try:
+        # Разделитель определяем по началу файла (в выгрузках из Excel часто ';')
+        sample = text.read(_SNIFF_SAMPLE_SIZE)
+        sample += text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+
+        lines = itertools.chain(io.StringIO(sample, newline=""), text)
+        for row in csv.reader(lines, dialect):
+            yield row
+    finally:
+        # Не закрываем исходный поток вместе с обёрткой
+        text.detach()
+
+
+def _iter_excel_rows(stream: BinaryIO) -> Iterator[List[Any]]:
+    from openpyxl import load_workbook
+
+    # read_only режим читает лист потоково, не строя всё дерево ячеек
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        for row in sheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def cell_to_str(value: Any) -> str:
+    """Приведение значения ячейки к строке (целые float без '.0')"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def find_column(header: List[Any], names: List[str]) -> Optional[int]:
+    """Поиск индекса колонки по возможным названиям заголовка"""
+    normalized = [cell_to_str(h).lower() for h in header]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    return None
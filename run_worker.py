@@ -1,9 +1,17 @@
 # run_worker.py
 from backend.messaging.consumer import RMQConsumer
-import logging
+from backend.utils.logging_setup import setup_logging
+from hydro_find.instrumentation import tracing
+from hydro_find.instrumentation.metrics import start_metrics_server
+import os
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.INFO)
+    setup_logging()
+    tracing.configure("hydrofind-worker")
+    # Sidecar с метриками воркера (METRICS_PORT=0 — выключен)
+    metrics_port = int(os.getenv("METRICS_PORT", 9100))
+    if metrics_port:
+        start_metrics_server(metrics_port)
     consumer = RMQConsumer()
     try:
         consumer.start_consuming()
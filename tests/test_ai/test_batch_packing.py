@@ -0,0 +1,58 @@
+# tests/test_ai/test_batch_packing.py
+
+from unittest.mock import patch, Mock
+
+from hydro_find.ai.service import AIProcessingService
+from hydro_find.ai.schemas import unpack_batch_items
+
+
+def test_unpack_batch_items_skips_invalid_and_duplicates():
+    data = {"items": [
+        {"index": 1, "Dy": 12},
+        {"index": "2", "Dy": 6},
+        {"index": 3, "Dy": 8},
+        {"index": 3, "Dy": 10},
+        {"index": 7, "Dy": 1},
+        "мусор",
+    ]}
+    assert unpack_batch_items(data, 4) == {1: {"Dy": 12}, 2: {"Dy": 6}}
+    assert unpack_batch_items({"raw_response": "..."}, 4) == {}
+
+
+@patch("hydro_find.ai.service.get_batch_pack_size", return_value=10)
+@patch("hydro_find.ai.service.OpenRouterClient")
+def test_process_batch_packs_lines_and_falls_back(mock_client_class, _):
+    mock_client = Mock()
+
+    def extract_json(prompt, query, task=None, schema=None):
+        if task == "batch_classify":
+            return {"items": [
+                {"index": 1, "type": "fittings"},
+                {"index": 2, "type": "fittings"},
+                {"index": 3, "type": "fittings"},
+            ]}
+        if task == "batch_extract":
+            # Третья строка пропущена моделью
+            return {"items": [
+                {"index": 1, "Dy": 12, "quantity": 100},
+                {"index": 2, "Dy": "6", "quantity": None},
+            ]}
+        return {"Dy": 20}
+
+    mock_client.extract_json.side_effect = extract_json
+    mock_client.generate.side_effect = ['"fittings"', "5"]
+    mock_client_class.return_value = mock_client
+
+    service = AIProcessingService()
+    result = service.process_batch("", lines=["Фитинг Dy12 - 100шт", "Фитинг Dy6", "Фитинг Dy20 - 5шт"])
+
+    assert result["success"] is True
+    assert result["processed_items"] == 3
+    first, second, third = result["results"]
+    assert first["extracted_data"] == {"Dy": 12} and first["quantity"] == 100
+    assert second["extracted_data"] == {"Dy": 6} and second["quantity"] is None
+    # Строка без пакетного ответа обработана отдельным запросом
+    assert third["extracted_data"] == {"Dy": 20} and third["quantity"] == 5
+
+    tasks = [call.kwargs["task"] for call in mock_client.extract_json.call_args_list]
+    assert tasks == ["batch_classify", "batch_extract", "extract"]
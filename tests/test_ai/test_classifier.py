@@ -0,0 +1,82 @@
+# tests/test_ai/test_classifier.py
+
+from unittest.mock import patch, Mock
+
+from hydro_find.ai.classifier import NgramClassifier
+from hydro_find.ai.service import AIProcessingService
+
+_EXAMPLES = [
+    ("Фитинг DKOL 12x1.5 Dy10", "fittings"),
+    ("фитинг BSP 1/2 угол 90", "fittings"),
+    ("Фитинг JIC 7/16 гайка", "fittings"),
+    ("фитинг DKOS M16x1.5 штуцер", "fittings"),
+    ("Адаптер BSP 1/2 - JIC 3/4", "adapters"),
+    ("адаптер М16х1.5 на BSP 3/8", "adapters"),
+    ("Адаптер NPTF 1/4 - DKOL", "adapters"),
+    ("адаптер угловой 90 JIC", "adapters"),
+    ("Заглушка BSP 1/2", "plugs"),
+    ("заглушка метрическая M18x1.5", "plugs"),
+    ("Заглушка JIC 9/16 гайка", "plugs"),
+    ("заглушка дюймовая 3/4", "plugs"),
+]
+
+
+def _model():
+    texts, labels = zip(*_EXAMPLES)
+    return NgramClassifier(min_df=1).fit(list(texts), list(labels), epochs=30)
+
+
+def test_predict_and_roundtrip(tmp_path):
+    model = _model()
+    label, confidence = model.predict("Заглушка BSP 3/8")
+    assert label == "plugs"
+    assert confidence > 0.5
+    assert model.predict_proba("адаптер JIC")[0][0] == "adapters"
+
+    path = tmp_path / "model.json"
+    model.save(path)
+    loaded = NgramClassifier.load(path)
+    for (label, p), (expected_label, expected_p) in zip(loaded.predict_proba("фитинг DKOL"),
+                                                        model.predict_proba("фитинг DKOL")):
+        assert label == expected_label
+        assert abs(p - expected_p) < 1e-4
+
+
+@patch("hydro_find.ai.service.OpenRouterClient")
+def test_classify_uses_local_model_above_threshold(mock_client_class):
+    mock_client = Mock()
+    mock_client.generate.return_value = '"coupling"'
+    mock_client_class.return_value = mock_client
+
+    service = AIProcessingService()
+    service.local_classifier = _model()
+
+    service.local_threshold = 0.0
+    assert service._classify("Заглушка BSP 3/8") == "plugs"
+    mock_client.generate.assert_not_called()
+
+    # Ниже порога — классификация через AI
+    service.local_threshold = 1.0
+    assert service._classify("Заглушка BSP 3/8") == "coupling"
+    mock_client.generate.assert_called_once()
+
+
+@patch("hydro_find.ai.service.OpenRouterClient")
+def test_ambiguous_query_gets_candidates(mock_client_class):
+    mock_client_class.return_value = Mock()
+    service = AIProcessingService()
+    service.local_classifier = Mock()
+    service.local_classifier.predict_proba.return_value = [("adapter-tee", 0.5), ("adapters", 0.45), ("plugs", 0.05)]
+    service._classify_llm = Mock(return_value="adapters")
+    service.max_candidates, service.candidate_min_score = 2, 0.2
+
+    comp_type, uncertain = service._classify_scored("переходник тройник JIC")
+    assert comp_type == "adapters"
+    # Выбранный AI тип первым, с оценкой не ниже лучшего локального кандидата
+    assert service._candidates(comp_type, uncertain) == [
+        {"component_type": "adapters", "score": 0.5},
+        {"component_type": "adapter-tee", "score": 0.5},
+    ]
+
+    service.candidate_min_score = 0.6
+    assert service._candidates(comp_type, uncertain) == []
@@ -0,0 +1,42 @@
+# tests/test_ai/test_local_parser.py
+
+from hydro_find.ai.local_parser import parse_query
+
+
+def test_fully_parsed_query_maps_to_typed_params():
+    parsed = parse_query("Фитинг BSP 1/2 гайка 90° 10 шт")
+
+    assert parsed.complete
+    assert parsed.component_type == "fittings"
+    assert parsed.quantity == 10
+    params, typed = parsed.validated()
+    assert params == {"standard": "BSP", "thread": "1/2", "armature": "гайка", "angle": 90}
+    assert typed == {"standard_id": 1, "thread_id": 4, "armature_id": 1, "angle_id": 90}
+
+
+def test_multi_end_components_fill_numbered_fields():
+    parsed = parse_query("переходник JIC 7/16 - BSP 1/4 штуцер конусный")
+
+    assert parsed.complete
+    assert parsed.fields == {
+        "standard_1": "JIC", "standard_2": "BSP",
+        "thread_1": "7/16", "thread_2": "1/4",
+        "armature_1": "штуцер конусный",
+    }
+
+
+def test_unknown_words_and_bare_numbers_need_ai():
+    assert not parse_query("фитинг для трактора").complete
+    # «1» может быть и резьбой, и количеством
+    assert parse_query("Заглушка BSP 1").unparsed == ["1"]
+    # Без ключевого слова тип неизвестен
+    assert not parse_query("BSP 1/2").complete
+    # Тип известен снаружи (локальный классификатор)
+    assert parse_query("BSP 1/2", component_type="plugs").complete
+
+
+def test_parameter_missing_from_type_is_not_dropped():
+    # У заглушки нет угла — значение не теряется молча
+    parsed = parse_query("заглушка BSP 1/2 90°")
+    assert not parsed.complete
+    assert parsed.unparsed == ["90"]
@@ -0,0 +1,132 @@
+# tests/test_ai/test_rate_limiter.py
+
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from openai import APIStatusError, RateLimitError
+
+from hydro_find.ai.client import OpenRouterClient
+from hydro_find.ai.rate_limiter import (
+    AdaptiveConcurrency, LocalTokenBucket, RateLimiter, RateLimitTimeout, RedisTokenBucket, parse_retry_after
+)
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = LocalTokenBucket(rate=1.0, capacity=2, min_rate=0.1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() > 0.5
+
+
+def test_token_bucket_rate_limited_blocks_and_decreases():
+    bucket = LocalTokenBucket(rate=4.0, capacity=2, min_rate=0.1)
+    bucket.on_rate_limited(retry_after=10)
+    assert bucket.rate == 2.0
+    assert bucket.acquire() > 9
+
+
+def test_adaptive_concurrency_aimd():
+    concurrency = AdaptiveConcurrency(max_limit=8)
+    concurrency.on_rate_limited()
+    assert int(concurrency.limit) == 4
+    for _ in range(50):
+        concurrency.on_success()
+    assert concurrency.limit == 8
+
+
+def test_slot_times_out_when_blocked():
+    bucket = LocalTokenBucket(rate=1.0, capacity=1, min_rate=0.1)
+    bucket.on_rate_limited(retry_after=60)
+    limiter = RateLimiter(bucket, AdaptiveConcurrency(max_limit=1))
+    with pytest.raises(RateLimitTimeout):
+        with limiter.slot(timeout=0.1):
+            pass
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({}) is None
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis()
+
+
+def test_redis_bucket_is_shared_between_instances(redis_client):
+    # Два процесса с одним ключом делят один запас токенов
+    first = RedisTokenBucket(redis_client, rate=1.0, capacity=2, min_rate=0.1)
+    second = RedisTokenBucket(redis_client, rate=1.0, capacity=2, min_rate=0.1)
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    assert 0.5 < first.acquire() <= 1.0
+
+
+def test_redis_bucket_aimd_and_retry_after(redis_client):
+    bucket = RedisTokenBucket(redis_client, rate=4.0, capacity=2, min_rate=1.5, increase_step=0.5)
+    bucket.on_rate_limited(retry_after=10)
+    assert bucket.rate == 2.0
+    assert bucket.acquire() > 9
+
+    bucket.on_rate_limited(retry_after=None)
+    assert bucket.rate == 1.5  # не ниже min_rate
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 4.0  # не выше rate_max
+
+
+def _status_error(status: int):
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    return APIStatusError("error", response=httpx.Response(status, request=request), body=None)
+
+
+def _rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    return RateLimitError("rate limited", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+
+def _client(*side_effect):
+    client = OpenRouterClient.__new__(OpenRouterClient)
+    client.rate_limiter = None
+    client.max_retries = 2
+    client._client = Mock()
+    client._client.chat.completions.create.side_effect = list(side_effect)
+    return client
+
+
+def test_completion_retries_server_errors(monkeypatch):
+    monkeypatch.setattr("hydro_find.ai.client.time.sleep", lambda seconds: None)
+    client = _client(_status_error(502), _status_error(503), "ok")
+    assert client._create_completion(model="m") == "ok"
+
+    client = _client(_status_error(502), _status_error(502), _status_error(502))
+    with pytest.raises(APIStatusError):
+        client._create_completion(model="m")
+
+    # 4xx (кроме 429) не повторяется
+    client = _client(_status_error(404), "ok")
+    with pytest.raises(APIStatusError):
+        client._create_completion(model="m")
+    assert client._client.chat.completions.create.call_count == 1
+
+
+def test_rate_limited_retry_waits_without_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("hydro_find.ai.client.time.sleep", sleeps.append)
+    client = _client(_rate_limit_error(), _rate_limit_error(), "ok")
+    # Запас bucket позволяет повторить сразу — пауза нужна всё равно
+    client.rate_limiter = RateLimiter(LocalTokenBucket(rate=100.0, capacity=10, min_rate=1.0),
+                                      AdaptiveConcurrency(max_limit=4))
+    client.timeout = 5
+
+    assert client._create_completion(model="m") == "ok"
+    assert sleeps == [1, 2]
+
+    sleeps.clear()
+    client = _client(_rate_limit_error({"retry-after": "3"}), "ok")
+    assert client._create_completion(model="m") == "ok"
+    assert sleeps == [3.0]
@@ -0,0 +1,95 @@
+# tests/test_ai/test_router.py
+
+import threading
+import time
+
+import pytest
+
+from hydro_find.ai.rate_limiter import AdaptiveConcurrency, LocalTokenBucket, RateLimiter
+from hydro_find.ai.router import CancelToken, ModelRouter, RequestCancelled, current_cancel_token
+
+
+def _router(**kwargs):
+    return ModelRouter(task_models={"classify": ["fast", "backup"]}, **kwargs)
+
+
+def test_execute_uses_first_model():
+    router = _router()
+    result, model = router.execute("classify", lambda m: f"answer from {m}")
+    assert (result, model) == ("answer from fast", "fast")
+
+
+def test_execute_fails_over_on_error():
+    router = _router()
+
+    def call(model):
+        if model == "fast":
+            raise RuntimeError("provider congested")
+        return "ok"
+
+    assert router.execute("classify", call) == ("ok", "backup")
+    assert router.stats("fast").error_rate == 1.0
+
+
+def test_execute_hedges_slow_model():
+    router = _router(min_hedge_delay=0.05, max_hedge_delay=0.05)
+
+    def call(model):
+        if model == "fast":
+            time.sleep(0.5)
+        return model
+
+    start = time.monotonic()
+    assert router.execute("classify", call) == ("backup", "backup")
+    assert time.monotonic() - start < 0.4
+
+
+def test_unhealthy_model_is_ranked_last():
+    router = _router()
+    for _ in range(5):
+        router.stats("fast").record(1.0, ok=False)
+    assert router.rank("classify") == ["backup", "fast"]
+
+
+def test_stats_percentiles():
+    router = _router()
+    for latency in [0.1, 0.2, 0.3, 0.4, 1.0]:
+        router.stats("fast").record(latency, ok=True)
+    snapshot = router.snapshot()["fast"]
+    assert snapshot["p50"] == 0.3
+    assert snapshot["p95"] == 1.0
+
+
+def test_losing_hedge_is_cancelled():
+    router = _router(min_hedge_delay=0.05, max_hedge_delay=0.05)
+    cancelled = threading.Event()
+
+    def call(model):
+        if model == "fast":
+            # Медленная модель ждёт отмены вместо полного таймаута провайдера
+            token = current_cancel_token()
+            token.on_cancel(cancelled.set)
+            if token.wait(5):
+                raise RequestCancelled()
+        return model
+
+    assert router.execute("classify", call) == ("backup", "backup")
+    assert cancelled.wait(1)
+    # Отмена не считается ошибкой модели
+    time.sleep(0.05)
+    assert router.stats("fast").samples == 0
+
+
+def test_slot_stops_waiting_when_cancelled():
+    bucket = LocalTokenBucket(rate=1.0, capacity=1, min_rate=0.1)
+    bucket.on_rate_limited(retry_after=5)
+    limiter = RateLimiter(bucket, AdaptiveConcurrency(max_limit=1))
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        with limiter.slot(timeout=10, cancel=token):
+            pass
+    assert time.monotonic() - start < 1
+    assert limiter.concurrency.in_flight == 0
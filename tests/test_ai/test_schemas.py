@@ -0,0 +1,31 @@
+# tests/test_ai/test_schemas.py
+
+from hydro_find.ai.schemas import build_response_schema, validate_params
+from hydro_find.database.enums import Standard, Thread
+
+
+def test_schema_built_from_orm_model():
+    schema = build_response_schema("fittings")
+    assert schema["additionalProperties"] is False
+    assert set(schema["required"]) == set(schema["properties"])
+    assert "BSP" in schema["properties"]["standard"]["enum"]
+    assert schema["properties"]["Dy"]["type"] == ["integer", "null"]
+    assert "article" not in schema["properties"]
+
+
+def test_schema_missing_for_type_without_table():
+    assert build_response_schema("banjo-bolt") is None
+
+
+def test_validate_params_coerces_to_enum_ids():
+    params, typed = validate_params("fittings", {
+        "standard": "dkol", "thread": "M14x1,5", "Dy": "12 мм", "usit": "да",
+        "removable_nut": True, "raw_response": "мусор"
+    })
+    assert params == {"standard": "DKOL", "thread": "14х1.5", "Dy": 12, "usit": True}
+    assert typed == {"standard_id": Standard.DKOL, "thread_id": Thread.M14_X_1_5, "Dy": 12, "usit": True}
+
+
+def test_validate_params_drops_unknown_enum_values():
+    params, typed = validate_params("plugs", {"standard": "GOST", "thread": None})
+    assert params == {} and typed == {}
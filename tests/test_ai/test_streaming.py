@@ -0,0 +1,76 @@
+# tests/test_ai/test_streaming.py
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from hydro_find.ai.client import OpenRouterClient
+from hydro_find.ai.router import CancelToken, RequestCancelled
+from hydro_find.ai.streaming import EnumTerminator, JSONObjectTerminator
+
+
+def _feed(terminator, chunks):
+    for chunk in chunks:
+        answer = terminator.feed(chunk)
+        if answer is not None:
+            return answer
+    return None
+
+
+def test_json_terminator_stops_on_balanced_object():
+    chunks = ['Вот ответ: {"standard": "BSP", ', '"note": "a}b", "Dy"', ': 12}', ' и пояснение']
+    assert _feed(JSONObjectTerminator(), chunks) == '{"standard": "BSP", "note": "a}b", "Dy": 12}'
+
+
+def test_enum_terminator_waits_for_longer_value():
+    terminator = EnumTerminator(["banjo", "banjo-bolt"])
+    assert terminator.feed('"banjo') is None
+    assert terminator.feed('-bolt') == "banjo-bolt"
+
+
+def test_enum_terminator_stops_on_delimiter():
+    terminator = EnumTerminator(["banjo", "banjo-bolt"])
+    assert _feed(terminator, ['"ban', 'jo"', ' потому что']) == "banjo"
+
+
+@patch("hydro_find.ai.client.OpenAI")
+def test_generate_stream_closes_early(mock_openai_class):
+    def chunk(text):
+        return Mock(choices=[Mock(delta=Mock(content=text))])
+
+    stream = Mock()
+    stream.__iter__ = Mock(return_value=iter([chunk("fit"), chunk("tings"), chunk("\n"), chunk("лишнее")]))
+    mock_openai_class.return_value.chat.completions.create.return_value = stream
+
+    client = OpenRouterClient(rate_limiter=None, router=None)
+    assert client.generate("prompt", "query", task="classify") == "fittings"
+    stream.close.assert_called_once()
+    kwargs = mock_openai_class.return_value.chat.completions.create.call_args.kwargs
+    assert kwargs["stream"] is True
+    assert kwargs["max_tokens"] == 12
+
+
+class _BlockingStream:
+    """Поток без фрагментов: чтение завершается только закрытием соединения"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        self.closed.wait(5)
+        raise RuntimeError("connection closed")
+
+    def close(self):
+        self.closed.set()
+
+
+def test_cancel_closes_stream_waiting_for_first_chunk():
+    client = OpenRouterClient.__new__(OpenRouterClient)
+    stream, token = _BlockingStream(), CancelToken()
+    token.on_cancel(stream.close)
+    threading.Timer(0.05, token.cancel).start()
+
+    with pytest.raises(RequestCancelled):
+        client._read_stream(stream, JSONObjectTerminator(), token)
+    assert stream.closed.is_set()
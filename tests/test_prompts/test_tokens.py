@@ -0,0 +1,18 @@
+# tests/test_prompts/test_tokens.py
+
+from hydro_find.prompts import PromptRepository, ComponentType, PreprocessingTask
+
+
+def test_component_prompts_share_prefix():
+    fittings = PromptRepository.get_component_prompt(ComponentType.FITTINGS)
+    adapters = PromptRepository.get_component_prompt(ComponentType.ADAPTERS)
+    prefix = fittings.split("\n\nТы ")[0]
+    assert adapters.startswith(prefix)
+    assert "  " not in fittings
+
+
+def test_token_report():
+    report = PromptRepository.get_token_report()
+    classify = PromptRepository.get_preprocessing_prompt(PreprocessingTask.CLASSIFY)
+    assert report["preprocessing"]["classify"] == PromptRepository.count_tokens(classify)
+    assert 0 < report["shared_prefix"]["extraction"] < report["components"]["fittings"]
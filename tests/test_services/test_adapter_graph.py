@@ -0,0 +1,91 @@
+# tests/test_services/test_adapter_graph.py
+
+import pytest
+
+from backend.app import create_app
+from hydro_find.database.adapter_graph import AdapterGraph, Port, parse_port
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.enums import Armature, Standard, Thread
+from hydro_find.database.models import Adapter, AdapterTee
+from hydro_find.database.repository import ComponentRepository
+
+NUT, UNION = int(Armature.NUT), int(Armature.UNION)
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    bsp, jic, dkol = int(Standard.BSP), int(Standard.JIC), int(Standard.DKOL)
+    with db.get_session() as session:
+        session.add_all([
+            Adapter(id=1, article="A-1", name="BSP 1/2 - DKOL 16", standard_1_id=bsp, thread_1_id=int(Thread._1_2),
+                    armature_1_id=UNION, standard_2_id=dkol, thread_2_id=int(Thread.M16_X_1_5), armature_2_id=UNION),
+            Adapter(id=2, article="A-2", name="DKOL 16 - JIC 3/4", standard_1_id=dkol,
+                    thread_1_id=int(Thread.M16_X_1_5), armature_1_id=NUT,
+                    standard_2_id=jic, thread_2_id=int(Thread._3_4), armature_2_id=UNION),
+            Adapter(id=3, article="A-3", name="BSP 1/2 - JIC 1/2", standard_1_id=bsp, thread_1_id=int(Thread._1_2),
+                    armature_1_id=UNION, standard_2_id=jic, thread_2_id=int(Thread._1_2), armature_2_id=UNION),
+            AdapterTee(id=1, article="T-1", name="Tee BSP 1/2 - JIC 3/4",
+                       standard_1_id=bsp, thread_1_id=int(Thread._1_2), armature_1_id=NUT,
+                       standard_2_id=jic, thread_2_id=int(Thread._3_4), armature_2_id=UNION,
+                       standard_3_id=jic, thread_3_id=int(Thread._3_4), armature_3_id=UNION),
+        ])
+        session.commit()
+    return ComponentRepository(db)
+
+
+def test_parse_port():
+    assert parse_port("BSP 1/2") == Port(int(Standard.BSP), int(Thread._1_2))
+    assert parse_port("jic 3/4 гайка") == Port(int(Standard.JIC), int(Thread._3_4), NUT)
+    assert parse_port("DKOL M16x1.5 штуцер").thread == int(Thread.M16_X_1_5)
+    assert parse_port("BSP") is None
+    assert parse_port("BSP 1/2 болт") is None
+
+
+def test_chains_respect_armature(repository):
+    graph = AdapterGraph(repository)
+    source, target = parse_port("BSP 1/2 гайка"), parse_port("JIC 3/4 гайка")
+
+    # Гайка источника не встаёт на гайку тройника — остаётся цепочка из двух переходников
+    [chain] = graph.find_chains(source, target)
+    assert [a["article"] for a in chain["adapters"]] == ["A-1", "A-2"]
+    assert chain["adapters"][0]["in"] == "BSP 1/2 union"
+    assert graph.find_chains(source, target, max_length=1) == []
+
+
+def test_chains_are_ranked_and_unique(repository):
+    graph = AdapterGraph(repository)
+    chains = graph.find_chains(parse_port("BSP 1/2"), parse_port("JIC 3/4"))
+    # Тройник короче, но дороже одного переходника; два его выхода — одна цепочка
+    assert [[a["article"] for a in c["adapters"]] for c in chains] == [["T-1"], ["A-1", "A-2"]]
+    assert [c["cost"] for c in chains] == [1.5, 2.0]
+
+
+def test_rebuild_after_invalidate(repository):
+    graph = AdapterGraph(repository)
+    graph.find_chains(parse_port("BSP 1/2"), parse_port("JIC 1/2"))
+    assert len(graph) == 4
+
+    with repository._db.get_session() as session:
+        session.query(Adapter).filter(Adapter.id == 3).delete()
+        session.commit()
+    assert graph.find_chains(parse_port("BSP 1/2"), parse_port("JIC 1/2"))
+    graph.invalidate()
+    assert graph.find_chains(parse_port("BSP 1/2"), parse_port("JIC 1/2")) == []
+
+
+def test_chain_endpoint(repository, monkeypatch):
+    from backend.services import db_service
+
+    monkeypatch.setattr(db_service, "_db_service", None)
+    client = create_app(testing=True).test_client()
+
+    response = client.get("/api/adapters/chain", query_string={"from": "BSP 1/2 гайка", "to": "JIC 3/4 гайка"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["chain_count"] == 1
+    assert data["from"] == "BSP 1/2 nut"
+
+    assert client.get("/api/adapters/chain", query_string={"from": "BSP", "to": "JIC 3/4"}).status_code == 400
@@ -0,0 +1,58 @@
+# tests/test_services/test_article_index.py
+
+import pytest
+
+from hydro_find.database.article_index import ArticleIndex
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.models import Fitting, Plug
+from hydro_find.database.repository import ComponentRepository
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    with db.get_session() as session:
+        session.add_all([
+            Fitting(id=1, article="DKOL-12", name="Фитинг DKOL", standard_id=4),
+            Fitting(id=2, article="F-100", name="Фитинг BSP", standard_id=1),
+            Plug(id=1, article="P-38", name="Заглушка", standard_id=1),
+            # Тот же артикул в другой категории
+            Plug(id=2, article="F-100", name="Заглушка BSP", standard_id=1),
+        ])
+        session.commit()
+    return ComponentRepository(db)
+
+
+def test_lookup_across_tables(repository):
+    index = ArticleIndex(repository)
+    index.refresh()
+
+    assert len(index) == 3
+    assert index.lookup(" dkol-12 ") == [("fittings", 1)]
+    assert index.lookup("unknown") == []
+    assert sorted(index.lookup("F-100")) == [("fittings", 2), ("plugs", 2)]
+
+    [item] = index.find("P-38")
+    assert item["component_type"] == "plugs"
+    assert item["name"] == "Заглушка"
+
+
+def test_falls_back_to_tables_until_loaded(repository):
+    index = ArticleIndex(repository)
+    index.refresh_async = lambda: False  # без фоновой загрузки
+
+    [item] = index.find("DKOL-12")
+    assert not index.ready
+    assert item["component_type"] == "fittings"
+    assert repository.get_by_id("fittings", 1)["article"] == "DKOL-12"
+
+
+def test_fallback_ignores_case_like_index(repository):
+    index = ArticleIndex(repository)
+    index.refresh_async = lambda: False
+
+    [item] = index.find(" dkol-12 ")
+    assert item["article"] == "DKOL-12"
+    assert repository.find_by_article_any("p-38")["component_type"] == "plugs"
@@ -0,0 +1,88 @@
+# tests/test_services/test_autocomplete.py
+
+import time
+
+import pytest
+
+from hydro_find.database.autocomplete import AutocompleteIndex, fold
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.models import Banjo, Fitting, Plug
+from hydro_find.database.repository import ComponentRepository
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    with db.get_session() as session:
+        session.add_all([
+            Fitting(id=1, article="DKOL-12", name="Фитинг DKOL 12", s_key="F12", standard_id=4),
+            Fitting(id=2, article="DKOL-16", name="Фитинг DKOL 16", s_key="F16", standard_id=4),
+            Fitting(id=3, article="AB-100", name="Фитинг BSP", standard_id=1),
+            Plug(id=1, article="P-38", name="Заглушка BSP", s_key="PL38", standard_id=1),
+            Banjo(id=1, article="BJ-10", name="Банджо"),
+        ])
+        session.commit()
+    return db
+
+
+@pytest.fixture
+def index(db):
+    index = AutocompleteIndex(ComponentRepository(db))
+    index.rebuild()
+    index.refresh_async = lambda full=False: False  # без фоновых обновлений
+    return index
+
+
+def test_fold_latin_cyrillic():
+    # «АВ-100», набранное в русской раскладке, совпадает с латинским AB100
+    assert fold("АВ-100") == fold("ab 100") == "ab100"
+    assert fold("DKOL-12") == fold("dkol 12") == fold("DKOL_12")
+
+
+def test_prefix_over_article_name_and_s_key(index):
+    assert [s["article"] for s in index.suggest("dkol")] == ["DKOL-12", "DKOL-16"]
+    assert [s["article"] for s in index.suggest("DKOL 1", limit=1)] == ["DKOL-12"]
+
+    [by_s_key] = index.suggest("pl3")
+    assert (by_s_key["component_type"], by_s_key["field"]) == ("plugs", "s_key")
+
+    # Название — с начала любого слова, по одной подсказке на компонент
+    by_word = index.suggest("bsp")
+    assert sorted((s["component_type"], s["id"]) for s in by_word) == [("fittings", 3), ("plugs", 1)]
+    assert {s["field"] for s in by_word} == {"name"}
+
+    assert [s["article"] for s in index.suggest("ав-1")] == ["AB-100"]
+    assert index.suggest("zzz") == []
+    assert index.suggest(" - ") == []
+
+
+def test_limit_is_bounded(index):
+    index.max_limit = 2
+    assert len(index.suggest("ф", limit=100)) == 2
+
+
+def test_incremental_refresh(db, index):
+    with db.get_session() as session:
+        session.add(Fitting(id=4, article="DKOL-20", name="Фитинг DKOL 20", standard_id=4))
+        session.commit()
+
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+    assert [s["article"] for s in index.suggest("dkol-2")] == ["DKOL-20"]
+    assert len(index) == 6
+
+
+def test_prefix_lookup_is_fast(index):
+    rows = [("fittings", i, f"X{i:06d}", f"Фитинг X{i}", None) for i in range(1, 50001)]
+    index.repository.iter_search_fields = lambda after_ids=None: iter(rows)
+    index.rebuild()
+
+    started = time.perf_counter()
+    for _ in range(100):
+        suggestions = index.suggest("x0123", limit=10)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / 100
+
+    assert len(suggestions) == 10
+    assert elapsed_ms < 1.0
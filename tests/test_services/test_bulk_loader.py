@@ -0,0 +1,74 @@
+# tests/test_services/test_bulk_loader.py
+
+import io
+
+import pytest
+
+from hydro_find.database.bulk_loader import create_loader, generate_rows, load_file, write_csv
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.enums import Armature, Standard, Thread
+from hydro_find.database.models import Adapter
+
+CSV = (
+    "article,name,standard_1,thread_1,armature_1,standard_2_id,thread_2,angle,counter_nut\n"
+    "A-1,Переходник,BSP,1/2,гайка,5,3/4,90,да\n"
+    "A-2,Переходник,jic,1/2,штуцер,1,1/2,,0\n"
+    "A-3,Переходник,XXX,1/2,гайка,1,1/2,,0\n"
+    ",Без артикула,BSP,1/2,гайка,1,1/2,,0\n"
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    return db
+
+
+def _load(db, text):
+    return load_file(io.BytesIO(text.encode("utf-8")), "adapters.csv", "adapters", create_loader(db))
+
+
+def test_load_parses_enums_and_skips_bad_rows(db):
+    report = _load(db, CSV)
+
+    assert (report.rows_read, report.rows_loaded, report.skipped) == (4, 2, 2)
+    assert report.inserted == 2 and report.updated == 0
+    assert any("XXX" in error for error in report.errors)
+
+    with db.get_session() as session:
+        adapter = session.query(Adapter).filter_by(article="A-1").one()
+    assert adapter.standard_1_id == Standard.BSP and adapter.standard_2_id == 5
+    assert adapter.thread_1_id == Thread._1_2 and adapter.thread_2_id == Thread._3_4
+    assert adapter.armature_1_id == Armature.NUT and adapter.counter_nut is True
+    assert adapter.updated_at is not None
+
+
+def test_reload_updates_by_article(db):
+    _load(db, CSV)
+    report = _load(db, "article,name,standard_1\nA-1,Переходник новый,ORFS\nA-9,Новый,BSP\n")
+
+    assert report.inserted == 1 and report.updated == 1
+    with db.get_session() as session:
+        adapter = session.query(Adapter).filter_by(article="A-1").one()
+        assert adapter.name == "Переходник новый" and adapter.standard_1_id == Standard.ORFS
+        # Колонок, которых нет в файле, загрузка не меняет
+        assert adapter.thread_1_id == Thread._1_2
+        assert session.query(Adapter).count() == 3
+
+    # Строки без изменений не переписываются и не считаются обновлёнными
+    report = _load(db, "article,name,standard_1\nA-1,Переходник новый,ORFS\nA-2,Переходник,BSP\n")
+    assert report.inserted == 0 and report.updated == 1
+
+
+def test_generated_file_parses_without_errors(tmp_path):
+    path = tmp_path / "fittings.csv"
+    assert write_csv(str(path), generate_rows("fittings", 500)) == 500
+
+    with open(path, "rb") as f:
+        report = load_file(f, path.name, "fittings")
+    assert report.rows_loaded == 500 and report.skipped == 0
+
+    with pytest.raises(ValueError):
+        load_file(io.BytesIO(b"name\nx\n"), "x.csv", "fittings")
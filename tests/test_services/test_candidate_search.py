@@ -0,0 +1,66 @@
+# tests/test_services/test_candidate_search.py
+
+from unittest.mock import Mock
+
+from backend.messaging.worker import RMQWorker
+from backend.services.db_service import DBService
+from hydro_find.database.models import Adapter, AdapterTee
+
+
+def test_candidates_are_searched_and_merged(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db_service = DBService()
+    db_service._db.create_all_tables()
+    with db_service._db.get_session() as session:
+        session.add_all([
+            Adapter(id=1, article="A-1", name="Adapter JIC 1/2"),
+            Adapter(id=2, article="A-2", name="Adapter JIC 3/4"),
+            AdapterTee(id=1, article="T-1", name="Tee JIC 1/2"),
+        ])
+        session.commit()
+
+    matches = db_service.search_candidates([
+        ({"component_type": "adapters", "original_query": "JIC"}, 0.6),
+        ({"component_type": "adapter-tee", "original_query": "JIC"}, 0.4),
+    ])
+    # Совпадение с текстом одинаковое — решает оценка типа
+    assert [(m["component_type"], m["article"], m["score"]) for m in matches] == [
+        ("adapters", "A-1", 0.6), ("adapters", "A-2", 0.6), ("adapter-tee", "T-1", 0.4),
+    ]
+
+    matches = db_service.search_candidates([
+        ({"component_type": "adapters", "original_query": "JIC 1/2"}, 0.5),
+        ({"component_type": "adapter-tee", "original_query": "JIC 1/2"}, 0.45),
+    ])
+    # Полное совпадение менее вероятного типа выше частичного совпадения более вероятного
+    assert [(m["article"], m["relevance"], m["score"]) for m in matches] == [
+        ("A-1", 2, 0.5), ("T-1", 2, 0.45), ("A-2", 1, 0.3333),
+    ]
+    assert len(db_service.search_candidates([
+        ({"component_type": "adapters", "original_query": "JIC"}, 0.6),
+        ({"component_type": "adapter-tee", "original_query": "JIC"}, 0.4),
+    ], limit=1)) == 1
+
+
+def test_worker_searches_candidate_types():
+    ai_service = Mock()
+    ai_service.process_single.return_value = {
+        "success": True, "component_type": "adapters",
+        "extracted_data": {"thread_1": "1/2"}, "search_params": {"thread_1_id": 3},
+        "candidates": [
+            {"component_type": "adapters", "score": 0.55},
+            {"component_type": "adapter-tee", "score": 0.4},
+        ],
+    }
+    db_service = Mock()
+    db_service.search_candidates.return_value = [{"id": 1, "component_type": "adapter-tee", "score": 0.4}]
+    worker = RMQWorker(ai_service=ai_service, db_service=db_service, cache_service=Mock(), enable_cache=False)
+
+    result = worker.process_message({"task_id": "t-1", "query": "переходник JIC 1/2"})
+    assert result["result"]["match_count"] == 1
+    db_service.search_by_ai_params.assert_not_called()
+
+    [(primary, score), (other, other_score)] = db_service.search_candidates.call_args.args[0]
+    assert primary["component_type"] == "adapters" and primary["thread_1_id"] == 3 and score == 0.55
+    assert other["component_type"] == "adapter-tee" and other["original_query"] == "переходник JIC 1/2"
+    assert other_score == 0.4
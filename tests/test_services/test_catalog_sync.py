@@ -0,0 +1,166 @@
+# tests/test_services/test_catalog_sync.py
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from hydro_find.database.connection import Base, DatabaseConnection
+from hydro_find.database.generation import CatalogGeneration
+from hydro_find.database.models import Fitting, Plug
+from hydro_find.database.sync import CatalogSync
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+
+class DownRedis:
+    def get(self, key):
+        raise ConnectionError("redis down")
+
+    incr = get
+
+
+T1, T2, T3 = datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 11), datetime(2026, 1, 2, 9)
+
+
+@pytest.fixture
+def source(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([
+            Fitting(id=1, article="F-1", name="Fitting 1", standard_id=1, updated_at=T1),
+            # Одинаковое время изменения на границе пачек
+            Fitting(id=2, article="F-2", name="Fitting 2", updated_at=T2),
+            Fitting(id=3, article="F-3", name="Fitting 3", updated_at=T2),
+            Fitting(id=4, article="F-4", name="Без времени изменения"),
+            Plug(id=1, article="P-1", name="Plug 1", updated_at=T1),
+        ])
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def target(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    return db
+
+
+def test_sync_transfers_only_changes(source, target):
+    redis = FakeRedis()
+    sync = CatalogSync(source, target, batch_size=2, generation=CatalogGeneration(redis))
+
+    reports = sync.sync(["fittings", "plugs"])
+    assert reports["fittings"].rows_read == 3 and reports["fittings"].inserted == 3
+    assert reports["plugs"].inserted == 1
+    assert redis.values["catalog:generation"] == 1
+
+    # Без изменений в источнике перечитывается только окно перед знаком, поколение прежнее
+    report = sync.sync(["fittings", "plugs"])["fittings"]
+    assert (report.rows_read, report.inserted, report.updated) == (2, 0, 0)
+    assert redis.values["catalog:generation"] == 1
+
+    with Session(source) as session:
+        session.get(Fitting, 1).name, session.get(Fitting, 1).updated_at = "Fitting 1 new", T3
+        session.add(Fitting(id=5, article="F-5", name="Fitting 5", updated_at=T3))
+        session.commit()
+
+    report = sync.sync_category("fittings")
+    assert (report.rows_read, report.inserted, report.updated) == (4, 1, 1)
+    with target.get_session() as session:
+        assert session.query(Fitting).filter_by(article="F-1").one().name == "Fitting 1 new"
+        assert session.query(Fitting).filter_by(article="F-1").one().standard_id == 1
+        assert session.query(Fitting).count() == 4
+
+    # Транзакция источника началась до прохода, а закоммичена после: updated_at позади знака
+    with Session(source) as session:
+        session.add(Fitting(id=6, article="F-6", name="Fitting 6", updated_at=T3 - timedelta(minutes=2)))
+        session.commit()
+    report = sync.sync_category("fittings")
+    assert (report.inserted, report.updated) == (1, 0)
+    with target.engine.connect() as connection:
+        assert CatalogSync._state(connection, "fittings") == (T3, 5)
+
+
+def test_generation_falls_back_without_redis():
+    generation = CatalogGeneration(DownRedis())
+    assert generation.current() == 0
+    assert generation.bump() == 1
+    assert generation.current() == 1
+
+
+def test_db_service_invalidates_indexes_on_new_generation(target, monkeypatch):
+    from backend.services.db_service import DBService
+
+    monkeypatch.setenv("CATALOG_CHECK_INTERVAL", "0")
+    service = DBService()
+    redis = FakeRedis()
+    service._generation = CatalogGeneration(redis)
+
+    service.facets.get("fittings")
+    assert service.check_catalog() is False
+    assert "fittings" in service.facets._categories
+
+    CatalogGeneration(redis).bump()
+    assert service.check_catalog() is True
+    assert service.facets._categories == {}
+    assert service.check_catalog() is False
+
+
+def test_upgrade_adds_updated_at_to_existing_tables(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'old.db'}")
+    db = DatabaseConnection()
+    Base.metadata.create_all(db.engine)
+    # БД, созданная до появления updated_at и sync_state
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_fittings_updated_at")
+        connection.exec_driver_sql("ALTER TABLE fittings DROP COLUMN updated_at")
+        connection.exec_driver_sql("DROP TABLE sync_state")
+        connection.exec_driver_sql("INSERT INTO fittings (id, article, name) VALUES (1, 'F-1', 'Fitting 1')")
+
+    applied = db.upgrade_schema()
+    assert "fittings.updated_at" in applied and "ix_fittings_updated_at" in applied and "sync_state" in applied
+    assert db.upgrade_schema() == []
+
+    columns = {column["name"] for column in inspect(db.engine).get_columns("fittings")}
+    assert "updated_at" in columns
+    with db.get_session() as session:
+        assert session.query(Fitting).one().updated_at is None
+
+
+def test_search_cache_is_stamped_with_generation_in_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from backend.services import cache_service
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    # Скрипт уже загружен, как на работающем сервере (без повтора EVALSHA → EVAL)
+    client.script_load(cache_service._CACHE_SEARCH_SCRIPT)
+    monkeypatch.setattr(cache_service.redis, "Redis", lambda connection_pool: client)
+    cache = cache_service.CacheService()
+    generation = CatalogGeneration(client)
+
+    generation.bump()
+    assert cache.cache_search_result("q", [{"id": 1}], ttl=60)
+    assert json.loads(client.get("search:q"))["generation"] == 1
+    assert 0 < client.ttl("search:q") <= 60
+    assert cache.get_cached_search_result("q") == [{"id": 1}]
+
+    generation.bump()
+    assert cache.get_cached_search_result("q") is None
+    assert cache.cache_search_result("q", [], ttl=60)
+    assert cache.get_cached_search_result("q") == []
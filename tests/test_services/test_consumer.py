@@ -0,0 +1,54 @@
+# tests/test_services/test_consumer.py
+
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from backend.messaging.consumer import RMQConsumer
+from backend.services import ai_service, cache_service, db_service
+from hydro_find.ai.router import ModelRouter
+
+
+class FakeAIProcessingService:
+    instances = 0
+
+    def __init__(self):
+        FakeAIProcessingService.instances += 1
+        self.router = ModelRouter(task_models={"extract": ["model-a"]}, max_workers=1)
+
+    def process_single(self, query):
+        result, model = self.router.execute("extract", lambda model: {"thread_1": "1/2"})
+        return {
+            "success": True, "component_type": "fittings", "extracted_data": result,
+            "search_params": {"thread_id": 4}, "model": model,
+        }
+
+
+@pytest.fixture
+def consumer(monkeypatch):
+    FakeAIProcessingService.instances = 0
+    monkeypatch.setattr(ai_service, "AIProcessingService", FakeAIProcessingService)
+    monkeypatch.setattr(ai_service, "_ai_service", None)
+    monkeypatch.setattr(db_service, "get_db_service", lambda: Mock(search_by_ai_params=Mock(return_value=[])))
+    monkeypatch.setattr(cache_service, "CacheService", Mock(side_effect=ConnectionError("redis down")))
+    monkeypatch.setattr(RMQConsumer, "_connect", lambda self: True)
+    monkeypatch.setattr(RMQConsumer, "_setup_signal_handlers", lambda self: None)
+    return RMQConsumer()
+
+
+def _deliver(consumer, task_id):
+    channel = Mock()
+    body = json.dumps({"task_id": task_id, "query": "фитинг 1/2"}).encode()
+    consumer._handle_delivery(channel, SimpleNamespace(delivery_tag=1), SimpleNamespace(headers=None), body)
+    return channel
+
+
+def test_ai_service_and_router_stats_survive_messages(consumer):
+    assert _deliver(consumer, "t-1").basic_ack.called
+    assert _deliver(consumer, "t-2").basic_ack.called
+
+    # Один AI-сервис на процесс: статистика роутера копится по всем сообщениям
+    assert FakeAIProcessingService.instances == 1
+    assert ai_service.get_ai_service()._ai.router.stats("model-a").samples == 2
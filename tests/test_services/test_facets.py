@@ -0,0 +1,94 @@
+# tests/test_services/test_facets.py
+
+import pytest
+
+from backend.app import create_app
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.enums import Angle, Standard, Thread
+from hydro_find.database.facets import FacetIndex
+from hydro_find.database.models import Adapter, Fitting
+from hydro_find.database.repository import ComponentRepository
+
+BSP, JIC, DKOL = int(Standard.BSP), int(Standard.JIC), int(Standard.DKOL)
+HALF, THREE_QUARTERS = int(Thread._1_2), int(Thread._3_4)
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    with db.get_session() as session:
+        session.add_all([
+            Fitting(id=1, article="F-1", name="F", standard_id=BSP, thread_id=HALF, angle_id=0, Dy=10),
+            Fitting(id=2, article="F-2", name="F", standard_id=BSP, thread_id=THREE_QUARTERS, angle_id=90, Dy=12),
+            Fitting(id=3, article="F-3", name="F", standard_id=JIC, thread_id=HALF, angle_id=90, Dy=10),
+            Fitting(id=4, article="F-4", name="F", standard_id=DKOL),
+            Adapter(id=1, article="A-1", name="A", standard_1_id=BSP, standard_2_id=JIC),
+            Adapter(id=2, article="A-2", name="A", standard_1_id=JIC, standard_2_id=JIC),
+        ])
+        session.commit()
+    return ComponentRepository(db)
+
+
+def _values(result, facet):
+    return {item["value"]: item["count"] for item in result["facets"][facet]}
+
+
+def test_counts_without_filters(repository):
+    result = FacetIndex(repository).counts("fittings", {})
+    assert result["total"] == 4
+    assert _values(result, "standard") == {"BSP": 2, "JIC": 1, "DKOL": 1}
+    # Угол 0° — значение, а не пустая колонка
+    assert _values(result, "angle") == {90: 2, 0: 1}
+    assert _values(result, "Dy") == {10: 2, 12: 1}
+
+
+def test_counts_with_filters(repository):
+    index = FacetIndex(repository)
+    result = index.counts("fittings", {"standard": ["bsp"], "thread": ["1/2", "3/4"]})
+    assert result["total"] == 2
+    # Свой фильтр фасета не учитывается: видно, сколько даст другой стандарт
+    assert _values(result, "standard") == {"BSP": 2, "JIC": 1}
+    assert _values(result, "thread") == {"1/2": 1, "3/4": 1}
+    assert _values(result, "Dy") == {10: 1, 12: 1}
+
+    with pytest.raises(ValueError):
+        index.counts("fittings", {"standard": ["XYZ"]})
+    with pytest.raises(ValueError):
+        index.counts("fittings", {"dn": ["10"]})
+    with pytest.raises(KeyError):
+        index.counts("banjo-bolt", {})
+
+
+def test_numbered_columns_count_once(repository):
+    result = FacetIndex(repository).counts("adapters", {"standard": ["JIC"]})
+    assert result["total"] == 2
+    assert _values(result, "standard") == {"JIC": 2, "BSP": 1}
+
+
+def test_invalidate_rebuilds(repository):
+    index = FacetIndex(repository)
+    assert index.counts("fittings", {})["total"] == 4
+    with repository._db.get_session() as session:
+        session.add(Fitting(id=5, article="F-5", name="F", standard_id=BSP))
+        session.commit()
+    assert index.counts("fittings", {})["total"] == 4
+    index.invalidate("fittings")
+    assert index.counts("fittings", {})["total"] == 5
+
+
+def test_facets_endpoint(repository, monkeypatch):
+    from backend.services import db_service
+
+    monkeypatch.setattr(db_service, "_db_service", None)
+    client = create_app(testing=True).test_client()
+
+    response = client.get("/api/facets/fittings?standard=BSP&angle=90")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 1
+    assert data["filters"] == {"standard": ["BSP"], "angle": ["90"]}
+
+    assert client.get("/api/facets/fittings?standard=XYZ").status_code == 400
+    assert client.get("/api/facets/unknown").status_code == 404
@@ -0,0 +1,44 @@
+# tests/test_services/test_failed_queries.py
+
+import json
+
+from backend.services.failed_queries import FailedQuerySink, JsonlRotatingWriter, process_path
+from backend.utils.logging_setup import task_context
+from hydro_find.ai.classifier import load_examples
+
+
+def test_sink_writes_jsonl_usable_as_training_data(tmp_path):
+    path = tmp_path / "failed.jsonl"
+    sink = FailedQuerySink(JsonlRotatingWriter(str(path)), flush_interval=60)
+
+    with task_context("t-1"):
+        sink.submit("unclassified", "непонятный запрос", error="не удалось определить тип компонента")
+    sink.submit("low_confidence", "Заглушка BSP 3/8", component_type="plugs",
+                local_label="fitting", local_confidence=0.41)
+    sink.close()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["kind"] for r in records] == ["unclassified", "low_confidence"]
+    assert records[0]["task_id"] == "t-1"
+
+    # Записи с итоговым типом сразу подходят для обучения классификатора
+    assert load_examples(str(path)) == (["Заглушка BSP 3/8"], ["plugs"])
+
+
+def test_rotation_keeps_configured_number_of_backups(tmp_path):
+    path = tmp_path / "failed.jsonl"
+    writer = JsonlRotatingWriter(str(path), max_bytes=200, backups=2)
+    for i in range(20):
+        writer.write([{"query": "x" * 50, "n": i}])
+    writer.close()
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["failed.jsonl", "failed.jsonl.1", "failed.jsonl.2"]
+    assert all(p.stat().st_size < 400 for p in tmp_path.iterdir())
+
+
+def test_supervisor_workers_get_own_files(monkeypatch):
+    monkeypatch.delenv("WORKER_SLOT", raising=False)
+    assert process_path("logs/failed_queries.jsonl") == "logs/failed_queries.jsonl"
+    monkeypatch.setenv("WORKER_SLOT", "2")
+    assert process_path("logs/failed_queries.jsonl") == "logs/failed_queries.2.jsonl"
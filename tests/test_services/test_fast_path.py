@@ -0,0 +1,100 @@
+# tests/test_services/test_fast_path.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.fast_path import FastPathResolver, looks_like_article
+from hydro_find.database.connection import _statement_timeout
+
+
+class FakeRepository:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.searches = []
+
+    def find_by_article_any(self, article):
+        time.sleep(self.delay)
+        if article == "DKOL-12":
+            return {"id": 7, "article": article, "component_type": "fittings"}
+        return None
+
+    def search(self, params, limit=10):
+        time.sleep(self.delay)
+        self.searches.append(params)
+        if params.get("standard_id") == 1:
+            return [{"id": 1, "article": "F-1"}]
+        return []
+
+
+def test_article_resolved_inline():
+    result = FastPathResolver(FakeRepository()).resolve("DKOL-12")
+
+    assert result["resolved_by"] == "article"
+    assert result["ai_result"]["component_type"] == "fittings"
+    assert result["match_count"] == 1
+
+
+def test_parsed_query_searches_with_typed_params():
+    repository = FakeRepository()
+    result = FastPathResolver(repository).resolve("Фитинг BSP 1/2 5 шт")
+
+    assert result["resolved_by"] == "local_parser"
+    assert result["ai_result"]["quantity"] == 5
+    assert repository.searches[0]["component_type"] == "fittings"
+    assert repository.searches[0]["thread_id"] == 4
+
+
+def test_falls_back_to_queue():
+    repository = FakeRepository()
+    resolver = FastPathResolver(repository)
+    # Нужен AI
+    assert resolver.resolve("фитинг для трактора") is None
+    # Ничего не найдено — пусть AI попробует понять запрос иначе
+    assert resolver.resolve("Фитинг JIC 1/2") is None
+    # Бюджет исчерпан
+    slow = FastPathResolver(FakeRepository(delay=0.2), budget_ms=20)
+    started = time.monotonic()
+    assert slow.resolve("Фитинг BSP 1/2") is None
+    assert time.monotonic() - started < 0.15
+
+
+def test_article_detection():
+    assert looks_like_article("DKOL-12")
+    assert looks_like_article("10.0402")
+    assert not looks_like_article("1/2")
+    assert not looks_like_article("фитинг BSP")
+
+
+def test_slow_database_does_not_pile_up():
+    release = threading.Event()
+    timeouts = []
+
+    class StuckRepository(FakeRepository):
+        def find_by_article_any(self, article):
+            timeouts.append(_statement_timeout.get())
+            release.wait(1)
+            return None
+
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, fn, *args):
+            self.submitted += 1
+            return super().submit(fn, *args)
+
+    executor = CountingExecutor(max_workers=1)
+    resolver = FastPathResolver(StuckRepository(), budget_ms=20, executor=executor, max_pending=2)
+    try:
+        # Первый запрос занял поток, второй ждёт в очереди пула и снимается с неё по таймауту
+        assert resolver.resolve("DKOL-12") is None
+        assert resolver.resolve("DKOL-12") is None
+        # Место второго освободилось при отмене; когда занято и оно, запрос в пул не попадает
+        assert resolver._slots.acquire(blocking=False)
+        assert resolver.resolve("DKOL-12") is None
+        assert executor.submitted == 2
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    # Выполнен только первый запрос, с лимитом времени на стороне БД в пределах бюджета
+    assert len(timeouts) == 1 and 0 < timeouts[0] <= 20
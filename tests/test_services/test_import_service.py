@@ -0,0 +1,63 @@
+# tests/test_services/test_import_service.py
+
+import io
+from unittest.mock import Mock
+
+from backend.services.import_service import OrderImportService
+
+
+def _csv(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def test_import_deduplicates_and_chunks():
+    producer = Mock()
+    producer.send_message.return_value = True
+    service = OrderImportService(producer, chunk_size=2)
+
+    data = "Наименование;Количество\nФитинг DKOL 12;10\nфитинг  dkol 12;5\nАдаптер BSP 1/2;2\nЗаглушка JIC;1\n"
+    summary = service.import_file(_csv(data), "order.csv")
+
+    assert summary["rows_read"] == 5
+    assert summary["unique_lines"] == 3
+    assert summary["duplicate_lines"] == 1
+    assert summary["chunks_enqueued"] == 2
+
+    first = producer.send_message.call_args_list[0].args[0]
+    assert first["metadata"]["lines"] == ["Фитинг DKOL 12", "Адаптер BSP 1/2"]
+    # Повтор строки складывает количества
+    assert first["metadata"]["quantities"] == [15, 2]
+
+
+def test_import_reports_late_duplicates_and_fractional_quantities():
+    producer = Mock()
+    producer.send_message.return_value = True
+    cache_service = Mock()
+    service = OrderImportService(producer, cache_service, chunk_size=1)
+
+    data = ("Наименование;Количество\nФитинг DKOL 12;10\nАдаптер BSP 1/2;1.5\nФитинг DKOL 12;5 шт\n"
+            "Заглушка;2,0\nфитинг dkol 12;1\n")
+    summary = service.import_file(_csv(data), "order.csv")
+
+    assert summary["invalid_quantity_lines"] == 1
+    assert summary["unique_lines"] == 2
+    # Пакет с первой строкой уже отправлен — добавка количества в сводке
+    # Повторы одной строки сведены в одну добавку
+    assert summary["quantity_adjustments"] == [{"line": "Фитинг DKOL 12", "quantity": 6}]
+    quantities = [c.args[0]["metadata"]["quantities"] for c in producer.send_message.call_args_list]
+    assert quantities == [[10], [2]]
+    # Промежуточный статус — только число строк с добавками, список — в итоговой сводке
+    *progress, final = [c.args[1] for c in cache_service.set_import_status.call_args_list]
+    assert progress[-1]["quantity_adjustment_lines"] == 1 and "quantity_adjustments" not in progress[-1]
+    assert final["quantity_adjustments"] == summary["quantity_adjustments"]
+
+
+def test_import_without_header_joins_cells():
+    producer = Mock()
+    producer.send_message.return_value = True
+    service = OrderImportService(producer, chunk_size=10)
+
+    service.import_file(_csv("Фитинг,DKOL 12\n,\nАдаптер,BSP\n"), "order.csv")
+
+    message = producer.send_message.call_args.args[0]
+    assert message["metadata"]["lines"] == ["Фитинг DKOL 12", "Адаптер BSP"]
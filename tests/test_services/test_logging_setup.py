@@ -0,0 +1,63 @@
+# tests/test_services/test_logging_setup.py
+
+import json
+import logging
+import threading
+
+from backend.utils.logging_setup import JsonFormatter, TaskContextFilter, current_task_id, task_context
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(TaskContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_task_context_is_isolated_between_threads():
+    logger = logging.getLogger("test.logging_setup.threads")
+    handler = _ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    barrier = threading.Barrier(4)
+
+    def work(task_id):
+        with task_context(task_id):
+            barrier.wait()
+            for i in range(50):
+                logger.info("строка %s задачи %s", i, task_id)
+
+    threads = [threading.Thread(target=work, args=(f"task-{n}",)) for n in range(4)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        logger.removeHandler(handler)
+
+    assert len(handler.records) == 200
+    assert all(r.getMessage().endswith(r.task_id) for r in handler.records)
+    assert current_task_id() == "-"
+
+
+def test_json_formatter_and_explicit_extra():
+    logger = logging.getLogger("test.logging_setup.json")
+    handler = _ListHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    try:
+        with task_context("abc"):
+            logger.warning("найдено %d совпадений", 3, extra={"component_type": "fitting"})
+        logger.warning("вне задачи", extra={"task_id": "explicit"})
+    finally:
+        logger.removeHandler(handler)
+
+    first, second = (json.loads(handler.format(r)) for r in handler.records)
+    assert first["message"] == "найдено 3 совпадений"
+    assert first["task_id"] == "abc"
+    assert first["component_type"] == "fitting"
+    assert second["task_id"] == "explicit"
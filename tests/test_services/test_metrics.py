@@ -0,0 +1,48 @@
+# tests/test_services/test_metrics.py
+
+import urllib.request
+
+from hydro_find.instrumentation import collect, stage
+from hydro_find.instrumentation.metrics import Registry, STAGE_SECONDS, start_metrics_server
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    hits = registry.counter("test_cache_total", "Обращения", ("result",))
+    latency = registry.histogram("test_latency_seconds", "Задержка", ("stage",), buckets=(0.1, 1.0))
+
+    hits.inc(result="hit")
+    hits.inc(2, result="miss")
+    latency.observe(0.05, stage="db")
+    latency.observe(0.5, stage="db")
+    latency.observe(5, stage="db")
+
+    text = registry.render()
+    assert "# TYPE test_cache_total counter" in text
+    assert 'test_cache_total{result="miss"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="db",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="db",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="db",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{stage="db"} 3' in text
+
+
+def test_stage_feeds_histogram_and_collector():
+    before = STAGE_SECONDS.count(stage="test_stage")
+    with collect() as timings:
+        with stage("test_stage"):
+            pass
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 1
+    assert timings.counts["test_stage"] == 1
+
+
+def test_sidecar_server_serves_metrics():
+    registry = Registry()
+    registry.counter("test_sidecar_total", "Счётчик").inc()
+    server = start_metrics_server(0, host="127.0.0.1", registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+        assert "test_sidecar_total 1" in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,96 @@
+# tests/test_services/test_pagination.py
+
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+from backend.app import create_app
+from backend.messaging.worker import RMQWorker
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.enums import Standard
+from hydro_find.database.models import Fitting
+from hydro_find.database.repository import ComponentRepository, encode_cursor
+
+PARAMS = {"component_type": "fittings", "original_query": "fitting jic", "standard_id": int(Standard.JIC)}
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    with db.get_session() as session:
+        for i in range(1, 26):
+            # Каждая третья запись совпадает с обоими словами запроса
+            name = "Fitting JIC" if i % 3 == 0 else "Fitting"
+            session.add(Fitting(id=i, article=f"F-{i}", name=name, standard_id=int(Standard.JIC)))
+        session.add(Fitting(id=100, article="F-100", name="Fitting JIC", standard_id=int(Standard.BSP)))
+        session.commit()
+    return ComponentRepository(db)
+
+
+def test_keyset_pages_are_ordered_and_complete(repository):
+    seen, cursor, pages = [], None, 0
+    while True:
+        items, cursor = repository.search_page(PARAMS, limit=10, cursor=cursor)
+        seen.extend((item["score"], item["id"]) for item in items)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+    # По убыванию оценки, при равной — по id
+    assert seen == sorted(seen, key=lambda item: (-item[0], item[1]))
+    assert [component_id for _, component_id in seen[:8]] == [3, 6, 9, 12, 15, 18, 21, 24]
+
+    assert repository.search(PARAMS, limit=5) == repository.search_page(PARAMS, limit=5)[0]
+    with pytest.raises(ValueError):
+        repository.search_page(PARAMS, cursor="not-a-cursor")
+
+
+def test_worker_exposes_cursor_for_full_page(monkeypatch):
+    monkeypatch.setenv("SEARCH_PAGE_SIZE", "2")
+    ai_service = Mock()
+    ai_service.process_single.return_value = {
+        "success": True, "component_type": "fittings", "extracted_data": {}, "search_params": {"standard_id": 3},
+    }
+    db_service = Mock()
+    db_service.search_by_ai_params.return_value = [{"id": 3, "score": 9}, {"id": 6, "score": 9}]
+    worker = RMQWorker(ai_service=ai_service, db_service=db_service, cache_service=Mock(), enable_cache=False)
+
+    pagination = worker.process_message({"task_id": "t-1", "query": "fitting jic"})["result"]["pagination"]
+    assert pagination["params"] == {"component_type": "fittings", "original_query": "fitting jic", "standard_id": 3}
+    assert pagination["next_cursor"] == encode_cursor(9, 6)
+
+    # Поиск по артикулу и общий поиск не продолжаются по курсору
+    db_service.search_by_ai_params.return_value = [{"id": 3, "score": 9, "component_type": "fittings"}]
+    assert "pagination" not in worker.process_message({"task_id": "t-2", "query": "x"})["result"]
+
+
+def test_task_matches_endpoint(repository, monkeypatch):
+    from backend.routes import search
+    from backend.services import db_service
+
+    monkeypatch.setattr(db_service, "_db_service", None)
+    task_id = str(uuid.uuid4())
+    cache_service = Mock()
+    cache_service.get_task_status.return_value = {
+        "status": "completed",
+        "result": {"matches": [], "pagination": {"params": PARAMS, "next_cursor": None}},
+    }
+    monkeypatch.setattr(search, "get_cache_service", lambda: cache_service)
+    client = create_app(testing=True).test_client()
+
+    first = client.get(f"/api/task/{task_id}/matches?limit=20").get_json()
+    assert first["match_count"] == 20
+    second = client.get(f"/api/task/{task_id}/matches", query_string={"cursor": first["next_cursor"]}).get_json()
+    assert second["match_count"] == 5 and second["next_cursor"] is None
+
+    assert client.get(f"/api/task/{task_id}/matches?cursor=broken").status_code == 400
+
+    cache_service.get_task_status.return_value = {"status": "completed", "result": {"matches": [{"id": 1}]}}
+    assert client.get(f"/api/task/{task_id}/matches").get_json()["matches"] == [{"id": 1}]
+    cache_service.get_task_status.return_value = None
+    assert client.get(f"/api/task/{task_id}/matches").status_code == 404
@@ -0,0 +1,52 @@
+# tests/test_services/test_query_log.py
+
+import json
+import time
+from unittest.mock import Mock
+
+from backend.benchmark.replay import RecordedResponses, StubOpenAI
+from backend.messaging.worker import RMQWorker
+from hydro_find.ai.client import prompt_fingerprint
+
+
+def _worker():
+    ai_service = Mock()
+    ai_service.process_single.return_value = {
+        "success": True, "component_type": "fittings", "extracted_data": {"Dy": 12}, "search_params": {}
+    }
+    db_service = Mock()
+    db_service.search_by_ai_params.return_value = [{"id": 1}]
+    return RMQWorker(ai_service=ai_service, db_service=db_service, cache_service=Mock(), enable_cache=False)
+
+
+def test_worker_records_stage_timings(tmp_path, monkeypatch):
+    log_path = tmp_path / "queries.jsonl"
+    monkeypatch.setenv("QUERY_LOG_PATH", str(log_path))
+
+    result = _worker().process_message({"task_id": "t-1", "query": "Фитинг DKOL 12", "timestamp": time.time() - 0.5})
+    assert result["status"] == "completed"
+
+    record = json.loads(log_path.read_text(encoding="utf-8").splitlines()[-1])
+    assert record["source"] == "worker"
+    assert record["task_id"] == "t-1"
+    assert record["component_type"] == "fittings"
+    assert record["stages_ms"]["queue_wait"] >= 500
+    assert {"ai", "db_search"} <= set(record["stages_ms"])
+
+
+def test_stub_returns_recorded_responses():
+    prompt = "системный промпт"
+    responses = RecordedResponses([{"llm_calls": [
+        {"prompt": prompt_fingerprint(prompt), "input": "запрос", "output": "fittings", "ms": 5},
+    ]}])
+    stub = StubOpenAI(responses, latency="none")
+
+    messages = [{"role": "system", "content": prompt}, {"role": "user", "content": "запрос"}]
+    response = stub.chat.completions.create(messages=messages)
+    assert response.choices[0].message.content == "fittings"
+
+    stream = stub.chat.completions.create(messages=messages, stream=True)
+    assert "".join(chunk.choices[0].delta.content for chunk in stream) == "fittings"
+
+    stub.chat.completions.create(messages=[messages[0], {"role": "user", "content": "другой"}])
+    assert (responses.hits, responses.misses) == (2, 1)
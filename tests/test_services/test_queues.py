@@ -0,0 +1,118 @@
+# tests/test_services/test_queues.py
+
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pika
+import pytest
+
+from backend.messaging.queue_manager import QueueManager
+from backend.messaging.queues import MAX_PRIORITY, clamp_priority, declare_queue, queue_arguments
+
+
+class FakeChannel:
+    """Очереди в памяти: basic_get/basic_publish/ack/nack как у BlockingChannel"""
+
+    def __init__(self, queues, fail_publish_after=None):
+        self.queues = {name: list(messages) for name, messages in queues.items()}
+        self.arguments = {}
+        self.unacked = {}
+        self.confirming = False
+        self.fail_publish_after = fail_publish_after
+        self.published = 0
+        self._tag = 0
+
+    def confirm_delivery(self):
+        self.confirming = True
+
+    def queue_declare(self, queue, durable=True, arguments=None, passive=False):
+        self.queues.setdefault(queue, [])
+        self.arguments[queue] = arguments
+
+    def queue_delete(self, queue, if_empty=False):
+        assert not (if_empty and self.queues[queue])
+        del self.queues[queue]
+
+    def basic_get(self, queue, auto_ack=False):
+        if not self.queues[queue]:
+            return None, None, None
+        self._tag += 1
+        body = self.queues[queue].pop(0)
+        self.unacked[self._tag] = (queue, body)
+        return SimpleNamespace(delivery_tag=self._tag), SimpleNamespace(priority=1), body
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        assert self.confirming
+        if self.fail_publish_after is not None and self.published >= self.fail_publish_after:
+            raise pika.exceptions.NackError([])
+        self.published += 1
+        self.queues[routing_key].append(body)
+
+    def basic_ack(self, delivery_tag):
+        del self.unacked[delivery_tag]
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        queue, body = self.unacked.pop(delivery_tag)
+        if requeue:
+            self.queues[queue].insert(0, body)
+
+
+def _manager(channel):
+    manager = QueueManager()
+    manager.channel = channel
+    return manager
+
+
+def test_queue_arguments_and_clamp_priority():
+    assert queue_arguments() == {"x-max-priority": MAX_PRIORITY}
+    assert clamp_priority("3") == 3
+    assert clamp_priority(99) == MAX_PRIORITY
+    assert clamp_priority(-1) == 0
+    assert clamp_priority(None, default=7) == 7
+    assert clamp_priority("high") == 5
+
+
+def test_declare_queue_with_priority_and_recreate():
+    channel = Mock()
+    assert declare_queue(Mock(), channel, "q", recreate=True) is channel
+    channel.queue_delete.assert_called_once_with("q")
+    channel.queue_declare.assert_called_once_with(queue="q", durable=True, arguments=queue_arguments())
+
+
+def test_declare_queue_falls_back_for_existing_queue_without_priority():
+    channel = Mock()
+    channel.queue_declare.side_effect = pika.exceptions.ChannelClosedByBroker(406, "PRECONDITION_FAILED")
+    connection = Mock()
+
+    fresh = declare_queue(connection, channel, "q")
+    assert fresh is connection.channel.return_value
+    fresh.queue_declare.assert_called_once_with(queue="q", durable=True, passive=True)
+
+    channel.queue_declare.side_effect = pika.exceptions.ChannelClosedByBroker(404, "NOT_FOUND")
+    with pytest.raises(pika.exceptions.ChannelClosedByBroker):
+        declare_queue(connection, channel, "q")
+
+
+def test_migrate_keeps_messages_and_order():
+    channel = FakeChannel({"search_queue": [b"1", b"2", b"3"]})
+
+    assert _manager(channel).migrate_to_priority_queue() == 3
+    assert channel.queues == {"search_queue": [b"1", b"2", b"3"]}
+    assert channel.arguments["search_queue"] == queue_arguments()
+    assert channel.unacked == {}
+
+
+def test_migrate_stops_without_losing_messages_on_nack():
+    channel = FakeChannel({"search_queue": [b"1", b"2", b"3"]}, fail_publish_after=2)
+
+    with pytest.raises(pika.exceptions.NackError):
+        _manager(channel).migrate_to_priority_queue()
+    # Неподтверждённое сообщение вернулось в исходную очередь, исходная не удалена
+    assert channel.queues["search_queue"] == [b"3"]
+    assert channel.queues["search_queue_migrating"] == [b"1", b"2"]
+    assert channel.unacked == {}
+
+    # Повторный запуск продолжает с оставшимися сообщениями
+    channel.fail_publish_after = None
+    assert _manager(channel).migrate_to_priority_queue() == 3
+    assert sorted(channel.queues["search_queue"]) == [b"1", b"2", b"3"]
@@ -0,0 +1,142 @@
+# tests/test_services/test_supervisor.py
+
+from backend.messaging.supervisor import QueueSample, ScalingPolicy, WorkerSupervisor
+from hydro_find.instrumentation.metrics import Registry
+
+
+class FakeBroker:
+    """Очередь: сообщения поступают по расписанию, каждый живой воркер разбирает rate за шаг"""
+
+    def __init__(self):
+        self.depth = 0
+        self.processes = {}
+
+    def stats(self):
+        alive = [p for p in self.processes.values() if p.consuming]
+        return {"message_count": self.depth, "consumer_count": len(alive)}
+
+    def tick(self, arrivals, rate):
+        self.depth += arrivals
+        for process in self.processes.values():
+            if process.consuming:
+                taken = min(rate, self.depth)
+                self.depth -= taken
+                process.handled += taken
+            elif process.draining:
+                # Воркер доработал текущее сообщение и завершился
+                process.alive = False
+
+
+class FakeProcess:
+    def __init__(self, broker, slot):
+        self.broker, self.slot = broker, slot
+        self.alive = self.consuming = self.draining = False
+        self.handled = 0
+        self.exitcode = None
+
+    def start(self):
+        self.alive = self.consuming = True
+        self.broker.processes[id(self)] = self
+
+    def terminate(self):
+        self.consuming, self.draining = False, True
+
+    def kill(self):
+        self.alive = self.consuming = False
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _supervisor(broker, clock, policy, metrics_source=None, base_port=0):
+    return WorkerSupervisor(
+        policy, broker.stats,
+        process_factory=lambda slot, port: FakeProcess(broker, slot),
+        metrics_source=metrics_source, metrics_base_port=base_port, drain_timeout=30, clock=clock,
+    )
+
+
+def test_scales_with_backlog_and_drains_back_to_minimum():
+    broker, clock = FakeBroker(), Clock()
+    policy = ScalingPolicy(min_workers=1, max_workers=5, backlog_per_worker=20,
+                           scale_up_cooldown=10, scale_down_cooldown=30)
+    supervisor = _supervisor(broker, clock, policy)
+
+    history = []
+    for second in range(0, 600, 5):
+        clock.now = second
+        broker.tick(arrivals=60 if second < 120 else 0, rate=10)
+        supervisor.step()
+        history.append(len(supervisor.workers))
+
+    assert 1 <= history[0] <= policy.max_step
+    assert max(history) == 5
+    # Нарастание ограничено шагом и паузой
+    assert all(b - a <= policy.max_step for a, b in zip(history, history[1:]))
+    assert broker.depth == 0
+    assert history[-1] == 1
+    # Остановленные воркеры завершились, а не были убиты посреди сообщения
+    assert not supervisor._retiring
+    assert all(not p.alive for p in broker.processes.values() if p.draining)
+
+
+def test_restarts_crashed_worker_to_minimum():
+    broker, clock = FakeBroker(), Clock()
+    supervisor = _supervisor(broker, clock, ScalingPolicy(min_workers=2, max_workers=4))
+    supervisor.step()
+    assert len(supervisor.workers) == 2
+
+    crashed = supervisor.workers[0]
+    crashed.alive = crashed.consuming = False
+    clock.now = 1
+    supervisor.step()
+    assert len(supervisor.workers) == 2 and supervisor.workers[0] is not crashed
+
+
+def test_queue_wait_and_llm_latency_from_worker_metrics():
+    registries = {}
+
+    def metrics_source(ports):
+        return {slot: registries.setdefault(slot, Registry()).render() for slot in ports}
+
+    def observe(slot, stage, value):
+        registries.setdefault(slot, Registry()).histogram(
+            "hydrofind_stage_duration_seconds", "", ("stage",)).observe(value, stage=stage)
+
+    broker, clock = FakeBroker(), Clock()
+    policy = ScalingPolicy(min_workers=1, max_workers=4, max_queue_wait=5, llm_latency_ceiling=20,
+                           scale_up_cooldown=0)
+    supervisor = _supervisor(broker, clock, policy, metrics_source, base_port=9101)
+    supervisor.step()
+
+    # Неглубокая очередь, но сообщения ждут долго — добавляется воркер
+    broker.depth = 5
+    observe(0, "queue_wait", 12.0)
+    observe(0, "llm.extract", 3.0)
+    sample = supervisor.step()
+    assert sample.queue_wait == 12.0 and sample.llm_latency == 3.0
+    assert len(supervisor.workers) == 2
+
+    # AI перегружен — новые воркеры не помогут
+    observe(0, "queue_wait", 12.0)
+    observe(1, "llm.classify", 40.0)
+    supervisor.step()
+    assert len(supervisor.workers) == 2
+
+
+def test_policy_bounds():
+    policy = ScalingPolicy(min_workers=2, max_workers=3, backlog_per_worker=10)
+    assert policy.desired(2, QueueSample(depth=1000)) == 3
+    assert policy.desired(3, QueueSample(depth=0)) == 2
+    assert policy.desired(2, QueueSample(depth=0)) == 2
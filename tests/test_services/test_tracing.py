@@ -0,0 +1,56 @@
+# tests/test_services/test_tracing.py
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hydro_find.instrumentation import bind, stage, tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACING_EXPORTER", "file")
+    monkeypatch.setenv("TRACING_FILE", str(path))
+    tracer = tracing.configure("test")
+    yield path, tracer
+    monkeypatch.setenv("TRACING_EXPORTER", "off")
+    tracing.configure("test")
+
+
+def test_traceparent_roundtrip():
+    context = tracing.SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    assert tracing.SpanContext.from_traceparent(context.to_traceparent()) == context
+    assert tracing.SpanContext.from_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert tracing.extract({"traceparent": b"garbage"}) is None
+
+
+def _llm_call():
+    with tracing.start_span("llm.extract", kind="client"):
+        pass
+
+
+def test_trace_continues_across_headers_and_threads(trace_file):
+    path, tracer = trace_file
+
+    with tracing.start_span("POST /api/", kind="server") as api_span:
+        with stage("enqueue"):
+            headers = tracing.inject({})
+
+    # Consumer в другом процессе: контекст только из заголовков
+    parent = tracing.extract(headers)
+    with tracing.start_span("consume", kind="consumer", parent=parent):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(bind(_llm_call)).result()
+        with stage("db_search"):
+            pass
+
+    tracer.shutdown()
+    spans = {s["name"]: s for s in map(json.loads, path.read_text().splitlines())}
+
+    trace_id = api_span.context.trace_id
+    assert {s["trace_id"] for s in spans.values()} == {trace_id}
+    assert spans["consume"]["parent_id"] == spans["enqueue"]["span_id"]
+    assert spans["llm.extract"]["parent_id"] == spans["consume"]["span_id"]
+    assert spans["db_search"]["parent_id"] == spans["consume"]["span_id"]
@@ -0,0 +1,86 @@
+# tests/test_services/test_unified_search.py
+
+from unittest.mock import Mock
+
+import pytest
+
+from backend.messaging.worker import RMQWorker
+from hydro_find.database.connection import DatabaseConnection
+from hydro_find.database.models import Banjo, Coupling, Fitting, Plug
+from hydro_find.database.repository import ComponentRepository
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'catalog.db'}")
+    db = DatabaseConnection()
+    db.create_all_tables()
+    with db.get_session() as session:
+        session.add_all([
+            Fitting(id=1, article="DKOL-12", name="Fitting DKOL", s_key="S19", standard_id=4),
+            Plug(id=1, article="P-38", name="Plug DKOL", standard_id=1),
+            Banjo(id=1, article="BJ-10", name="Banjo M10"),
+            Coupling(id=1, article="dkol-12x", name="Coupling"),
+        ])
+        session.commit()
+    return ComponentRepository(db)
+
+
+def test_search_all_ranks_across_categories(repository):
+    results = repository.search_all("dkol-12")
+    # Точный артикул выше частичного совпадения в другой таблице
+    assert [(r["component_type"], r["article"]) for r in results] == [
+        ("fittings", "DKOL-12"), ("coupling", "dkol-12x"),
+    ]
+    assert results[0]["score"] > results[1]["score"]
+
+    assert {r["component_type"] for r in repository.search_all("dkol")} == {"fittings", "plugs", "coupling"}
+    assert [r["component_type"] for r in repository.search_all("m10 banjo")] == ["banjo"]
+    assert len(repository.search_all("dkol", limit=2)) == 2
+    assert repository.search_all("x") == []
+
+
+def _worker(ai_result, unified=None, typed=None):
+    ai_service = Mock()
+    ai_service.process_single.return_value = ai_result
+    db_service = Mock()
+    db_service.search_by_ai_params.return_value = typed or []
+    db_service.search_all.return_value = unified or []
+    worker = RMQWorker(ai_service=ai_service, db_service=db_service, cache_service=Mock(), enable_cache=False)
+    return worker, db_service
+
+
+def test_worker_falls_back_when_type_is_unknown():
+    worker, db_service = _worker({"success": False, "error": "Не удалось определить тип компонента"},
+                                 unified=[{"id": 1, "component_type": "plugs"}])
+
+    result = worker.process_message({"task_id": "t-1", "query": "P-38 заглушка"})
+    assert result["status"] == "completed"
+    assert result["result"]["resolved_by"] == "unified"
+    assert result["result"]["match_count"] == 1
+    db_service.search_all.assert_called_once_with("P-38 заглушка")
+
+
+def test_worker_reports_error_when_unified_search_is_empty():
+    worker, _ = _worker({"success": False, "error": "Не удалось определить тип компонента"})
+    assert worker.process_message({"task_id": "t-2", "query": "что-то"})["status"] == "error"
+
+
+def test_worker_uses_unified_search_for_types_without_table():
+    worker, db_service = _worker({"success": True, "component_type": "banjo-bolt", "extracted_data": {}},
+                                 unified=[{"id": 1, "component_type": "banjo"}])
+
+    result = worker.process_message({"task_id": "t-3", "query": "болт банджо M10"})
+    assert result["result"]["match_count"] == 1
+    db_service.search_by_ai_params.assert_not_called()
+
+
+def test_worker_uses_unified_search_when_uncertain_and_empty(monkeypatch):
+    monkeypatch.setattr("backend.messaging.worker.get_failed_query_sink", lambda: None)
+    ai_result = {"success": True, "component_type": "plugs", "extracted_data": {},
+                 "local_prediction": {"label": "fittings", "confidence": 0.4}}
+    worker, db_service = _worker(ai_result, unified=[{"id": 1, "component_type": "fittings"}])
+
+    result = worker.process_message({"task_id": "t-4", "query": "DKOL 12"})
+    assert result["result"]["match_count"] == 1
+    db_service.search_all.assert_called_once()